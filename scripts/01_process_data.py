@@ -3,114 +3,344 @@
 Step 1: Process raw CSV data from Google Sheets
 - Unmerge cells by forward-filling empty values
 - Clean numeric fields (remove commas, handle missing values)
+- Dictionary-encode the repetitive text columns (see intermediate_io.categorize)
 - Save processed data
+- Optional streaming mode (--chunksize) for exports larger than memory
+- Optional ingest of the source workbook (--xlsx): real merged ranges are
+  expanded instead of forward-filling (see xlsx_ingest.py)
+- Optional JSON run profile (--profile, see run_profile.py)
+- --quiet skips the summaries, --log-format json prints them as JSON events
 """
 
 import pandas as pd
 import numpy as np
 import argparse
+import sys
 from pathlib import Path
 
+from collections import Counter
+
+import console
+from intermediate_io import FORMATS, ChunkedWriter, categorize, intermediate_path, write_intermediate
+from run_profile import add_profile_arguments, profile_options, profiled, timed
+from xlsx_ingest import read_sheet, team_sheets
+
 # Setup paths
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 
-def clean_numeric_field(value):
-    """Remove commas and convert to numeric"""
-    if pd.isna(value) or value == '' or value == '-':
-        return np.nan
-    if isinstance(value, str):
-        # Remove commas and quotes
-        value = value.replace(',', '').replace('"', '').strip()
-        if value == '' or value == '-':
-            return np.nan
-        try:
-            return float(value)
-        except ValueError:
-            return np.nan
-    return float(value)
-
-def main(team):
+# Merged cells in the sheet export: blanks repeat the value above
+COLUMNS_TO_FILL = ['직무(업무명)', '업무세부내역', 'Analysis_name', 'Platfom', 'Pipeline Name', 'Pipeline Version', 'Group']
+NUMERIC_COLUMNS = ['CPUs', 'MEM(G)', 'TIME(hr)', 'nTask(병렬)', 'SIZE(MB)']
+
+# Distinct-value counts of the data summary
+SUMMARY_COLUMNS = {
+    'jobs': '직무(업무명)',
+    'task_details': '업무세부내역',
+    'groups': 'Group',
+    'steps': 'Step',
+    'tools': 'tools',
+}
+
+def render_data_summary(stats):
+    """Text of the data summary (total rows and distinct counts)"""
+    return "\n".join([
+        f"   - Total rows: {stats['total_rows']}",
+        f"   - Jobs (직무): {stats['jobs']} unique",
+        f"   - Task Details (업무세부내역): {stats['task_details']} unique",
+        f"   - Groups: {stats['groups']} unique",
+        f"   - Steps: {stats['steps']} unique",
+        f"   - Tools: {stats['tools']} unique",
+    ])
+
+def render_breakdown(counts):
+    """One line per job (or job / task detail) with its step count"""
+    return "\n".join(f"   - {' / '.join(map(str, key)) if isinstance(key, tuple) else key}: {count} steps"
+                     for key, count in counts.items())
+
+def clean_numeric_column(values):
+    """
+    Remove commas and quotes and convert a column to numeric.
+
+    Blank and '-' cells become NaN. Returns (numeric column, coerced) where
+    coerced counts the other cells that could not be parsed and became NaN.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(np.float64), 0
+
+    text = (values.astype('string')
+            .str.replace(',', '', regex=False)
+            .str.replace('"', '', regex=False)
+            .str.strip())
+    missing = text.isna() | text.isin(['', '-'])
+    numbers = pd.to_numeric(text.mask(missing).astype(object), errors='coerce').astype(np.float64)
+    coerced = int((numbers.isna() & ~missing).sum())
+    return numbers, coerced
+
+def unmerge_column(values):
+    """Forward-fill a merged-cell column: blank cells repeat the value above"""
+    return values.replace('', np.nan).ffill()
+
+def process_frame(df):
+    """
+    Unmerge cells and clean numeric fields of a raw sheet export DataFrame.
+
+    The DataFrame passed in is left unchanged; returns the processed copy
+    (same result as main without the file I/O and console output).
+    """
+    df = df.copy()
+    for col in COLUMNS_TO_FILL:
+        if col in df.columns:
+            with timed('ffill'):
+                df[col] = unmerge_column(df[col])
+    for col in NUMERIC_COLUMNS:
+        if col in df.columns:
+            with timed('numeric_clean'):
+                df[col], _ = clean_numeric_column(df[col])
+    with timed('categorize'):
+        return categorize(df)
+
+@timed('step1')
+def main(team, save=True, fmt='csv', xlsx=None, sheet=None):
+    """
+    Process the raw sheet export of a team.
+
+    With save=False the processed data is only returned (used by the
+    single-process runner, which hands it to stage 2 in memory). fmt selects
+    the format of analysis_processed (csv, parquet or feather). With xlsx the
+    team's sheet (sheet, or the one named after the team) is read from the
+    workbook instead of analysis_raw.csv, and its merged ranges are expanded
+    instead of forward-filling.
+    """
     # Setup file paths based on team number
     TEAM_DIR = DATA_DIR / f"team{team}"
     RAW_FILE = TEAM_DIR / "analysis_raw.csv"
-    PROCESSED_FILE = TEAM_DIR / "analysis_processed.csv"
+    PROCESSED_FILE = intermediate_path(TEAM_DIR, "analysis_processed", fmt)
 
-    print("=" * 80)
-    print(f"Step 1: Processing Team {team} Analysis Sheet Data")
-    print("=" * 80)
+    if xlsx and sheet is None:
+        sheets = team_sheets(xlsx)
+        if team not in sheets:
+            raise ValueError(f"No sheet for team {team} in {xlsx} (sheets with a team number: "
+                             f"{', '.join(sheets.values()) or 'none'})")
+        sheet = sheets[team]
 
-    # Read raw CSV
-    print(f"\n1. Reading raw data from: {RAW_FILE}")
-    df = pd.read_csv(RAW_FILE, encoding='utf-8')
-    print(f"   - Loaded {len(df)} rows, {len(df.columns)} columns")
-    print(f"   - Columns: {', '.join(df.columns.tolist())}")
+    console.banner(f"Step 1: Processing Team {team} Analysis Sheet Data", team=team, stage='step1')
 
-    # Forward fill merged cells for key columns
-    print("\n2. Unmerging cells (forward fill)...")
-    columns_to_fill = ['직무(업무명)', '업무세부내역', 'Analysis_name', 'Platfom', 'Pipeline Name', 'Pipeline Version', 'Group']
+    if xlsx:
+        # A team may exist only in the workbook so far
+        TEAM_DIR.mkdir(parents=True, exist_ok=True)
+        console.info(f"\n1. Reading sheet '{sheet}' from: {xlsx}")
+        with timed('read_xlsx') as mark:
+            df, merged = read_sheet(xlsx, sheet)
+            mark['rows'] = len(df)
+    else:
+        # Read raw CSV
+        console.info(f"\n1. Reading raw data from: {RAW_FILE}")
+        with timed('read_csv') as mark:
+            df = pd.read_csv(RAW_FILE, encoding='utf-8')
+            mark['rows'] = len(df)
+    console.info(f"   - Loaded {len(df)} rows, {len(df.columns)} columns", rows=len(df))
+    console.info(f"   - Columns: {', '.join(df.columns.tolist())}")
 
-    for col in columns_to_fill:
-        if col in df.columns:
-            # Count empty cells before
-            empty_before = df[col].isna().sum() + (df[col] == '').sum()
+    if xlsx:
+        # Merged cells already carry their value; cells outside merged ranges stay as they are
+        console.info("\n2. Unmerging cells (merged ranges of the sheet)...")
+        console.info(f"   - {merged} merged ranges expanded", merged=merged)
+    else:
+        # Forward fill merged cells for key columns
+        console.info("\n2. Unmerging cells (forward fill)...")
+        for col in COLUMNS_TO_FILL:
+            if col in df.columns:
+                with timed('ffill'):
+                    # Count empty cells before
+                    if console.enabled():
+                        empty_before = df[col].isna().sum() + (df[col] == '').sum()
 
-            # Forward fill
-            df[col] = df[col].replace('', np.nan)
-            df[col] = df[col].fillna(method='ffill')
+                    # Forward fill
+                    df[col] = unmerge_column(df[col])
 
-            # Count empty cells after
-            empty_after = df[col].isna().sum()
-            print(f"   - {col}: {empty_before} empty cells → {empty_after} empty cells")
+                    # Count empty cells after
+                    if console.enabled():
+                        empty_after = df[col].isna().sum()
+                        console.info(f"   - {col}: {empty_before} empty cells → {empty_after} empty cells",
+                                     column=col, empty_before=empty_before, empty_after=empty_after)
 
     # Clean numeric columns
-    print("\n3. Cleaning numeric fields...")
-    numeric_columns = ['CPUs', 'MEM(G)', 'TIME(hr)', 'nTask(병렬)', 'SIZE(MB)']
-
-    for col in numeric_columns:
+    console.info("\n3. Cleaning numeric fields...")
+    for col in NUMERIC_COLUMNS:
         if col in df.columns:
-            df[col] = df[col].apply(clean_numeric_field)
-            print(f"   - {col}: converted to numeric")
+            with timed('numeric_clean'):
+                df[col], coerced = clean_numeric_column(df[col])
+            console.info(f"   - {col}: converted to numeric ({coerced} unparseable cells → NaN)",
+                         column=col, coerced=coerced)
+
+    # Later stages group on the dictionary codes instead of the strings
+    with timed('categorize'):
+        categorize(df)
 
     # Display summary statistics
-    print("\n4. Data Summary:")
-    print(f"   - Total rows: {len(df)}")
-    print(f"   - Jobs (직무): {df['직무(업무명)'].nunique()} unique")
-    print(f"   - Task Details (업무세부내역): {df['업무세부내역'].nunique()} unique")
-    print(f"   - Groups: {df['Group'].nunique()} unique")
-    print(f"   - Steps: {df['Step'].nunique()} unique")
-    print(f"   - Tools: {df['tools'].nunique()} unique")
+    console.summary("\n4. Data Summary:", lambda: {
+        'total_rows': len(df),
+        **{key: df[col].nunique() for key, col in SUMMARY_COLUMNS.items()},
+    }, render=render_data_summary)
 
     # Show breakdown by job
-    print("\n5. Breakdown by Job (직무):")
-    job_counts = df.groupby('직무(업무명)').size()
-    for job, count in job_counts.items():
-        print(f"   - {job}: {count} steps")
+    console.summary("\n5. Breakdown by Job (직무):", lambda: df.groupby('직무(업무명)', observed=True).size().rename('steps'),
+                    render=render_breakdown)
 
     # Show breakdown by task detail
-    print("\n6. Breakdown by Task Detail (업무세부내역):")
-    task_counts = df.groupby(['직무(업무명)', '업무세부내역']).size()
-    for (job, task), count in task_counts.items():
-        print(f"   - {job} / {task}: {count} steps")
+    console.summary("\n6. Breakdown by Task Detail (업무세부내역):",
+                    lambda: df.groupby(['직무(업무명)', '업무세부내역'], observed=True).size().rename('steps'),
+                    render=render_breakdown)
 
     # Save processed data
-    print(f"\n7. Saving processed data to: {PROCESSED_FILE}")
-    df.to_csv(PROCESSED_FILE, index=False, encoding='utf-8')
-    print("   ✓ Data saved successfully")
+    if save:
+        console.info(f"\n7. Saving processed data to: {PROCESSED_FILE}")
+        with timed('write'):
+            write_intermediate(df, PROCESSED_FILE, fmt)
+        console.info("   ✓ Data saved successfully")
 
     # Display sample of processed data
-    print("\n8. Sample of processed data (first 5 rows):")
-    print(df.head().to_string(max_cols=10))
+    console.summary("\n8. Sample of processed data (first 5 rows):", lambda: df.head(), max_cols=10)
 
-    print("\n" + "=" * 80)
-    print("Step 1 Complete: Data processed and saved")
-    print("=" * 80)
+    console.banner("Step 1 Complete: Data processed" + (" and saved" if save else ""), leading_newline=True)
 
     return df
 
+@timed('step1')
+def main_streaming(team, chunksize, fmt='csv'):
+    """
+    Process the raw sheet export of a team in chunks of `chunksize` rows.
+
+    The last non-empty value of each merged-cell column is carried over from
+    one chunk to the next, so the forward fill matches the in-memory run.
+    Cleaned chunks are appended to analysis_processed as they are produced,
+    so peak memory depends on the chunk size rather than the catalogue size.
+    All non-numeric columns are kept as text. Returns the processed file path.
+    """
+    # Setup file paths based on team number
+    TEAM_DIR = DATA_DIR / f"team{team}"
+    RAW_FILE = TEAM_DIR / "analysis_raw.csv"
+    PROCESSED_FILE = intermediate_path(TEAM_DIR, "analysis_processed", fmt)
+
+    console.banner(f"Step 1: Processing Team {team} Analysis Sheet Data (streaming, {chunksize} rows per chunk)",
+                   team=team, stage='step1')
+
+    console.info(f"\n1. Streaming raw data from: {RAW_FILE}")
+    console.info(f"   Writing processed data to: {PROCESSED_FILE}")
+
+    # Running statistics are only kept when they will be shown
+    stats = console.enabled()
+
+    carry = {}
+    empty_before = Counter()
+    empty_after = Counter()
+    coerced = Counter()
+    unique_values = {col: set() for col in SUMMARY_COLUMNS.values()}
+    job_counts = Counter()
+    task_counts = Counter()
+    sample = None
+    n_chunks = 0
+
+    with ChunkedWriter(PROCESSED_FILE, fmt) as writer:
+        chunks = pd.read_csv(RAW_FILE, encoding='utf-8', chunksize=chunksize, dtype=str)
+        while True:
+            with timed('read_csv'):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            n_chunks += 1
+
+            # Forward fill merged cells, continuing from the previous chunk
+            with timed('ffill'):
+                for col in COLUMNS_TO_FILL:
+                    if col in chunk.columns:
+                        if stats:
+                            empty_before[col] += chunk[col].isna().sum() + (chunk[col] == '').sum()
+                        # Position of the last filled cell at or above each row (-1: none in this chunk)
+                        values = chunk[col].to_numpy(dtype=object)
+                        filled = chunk[col].notna().to_numpy() & (values != '')
+                        last = np.maximum.accumulate(np.where(filled, np.arange(len(values)), -1))
+                        values = np.append(values, carry.get(col, np.nan))
+                        chunk[col] = values[last]
+                        carry[col] = chunk[col].iloc[-1]
+                        if stats:
+                            empty_after[col] += chunk[col].isna().sum()
+
+            with timed('numeric_clean'):
+                for col in NUMERIC_COLUMNS:
+                    if col in chunk.columns:
+                        chunk[col], n = clean_numeric_column(chunk[col])
+                        coerced[col] += n
+
+            # Running summary statistics
+            if stats:
+                for col, values in unique_values.items():
+                    values.update(chunk[col].dropna())
+                job_counts.update(chunk['직무(업무명)'].dropna())
+                tasks = chunk[['직무(업무명)', '업무세부내역']].dropna()
+                task_counts.update(zip(tasks['직무(업무명)'], tasks['업무세부내역']))
+                if sample is None:
+                    sample = chunk.head()
+
+            with timed('write'):
+                writer.write(chunk)
+
+    console.info(f"   - Processed {writer.rows} rows in {n_chunks} chunks", rows=writer.rows, chunks=n_chunks)
+
+    console.summary("\n2. Unmerged cells (forward fill):",
+                    lambda: {col: {'empty_before': int(empty_before[col]), 'empty_after': int(empty_after[col])}
+                             for col in COLUMNS_TO_FILL if col in empty_before},
+                    render=lambda cells: "\n".join(f"   - {col}: {n['empty_before']} empty cells → "
+                                                   f"{n['empty_after']} empty cells" for col, n in cells.items()))
+
+    console.summary("\n3. Cleaned numeric fields:",
+                    lambda: {col: coerced[col] for col in NUMERIC_COLUMNS if col in coerced},
+                    render=lambda cells: "\n".join(f"   - {col}: converted to numeric ({n} unparseable cells → NaN)"
+                                                   for col, n in cells.items()))
+
+    console.summary("\n4. Data Summary:", lambda: {
+        'total_rows': writer.rows,
+        **{key: len(unique_values[col]) for key, col in SUMMARY_COLUMNS.items()},
+    }, render=render_data_summary)
+
+    console.summary("\n5. Breakdown by Job (직무):", lambda: pd.Series(dict(sorted(job_counts.items())), name='steps'),
+                    render=render_breakdown)
+
+    console.summary("\n6. Breakdown by Task Detail (업무세부내역):",
+                    lambda: pd.Series(dict(sorted(task_counts.items())), name='steps', dtype=np.int64),
+                    render=render_breakdown)
+
+    if sample is not None:
+        console.summary("\n7. Sample of processed data (first 5 rows):", lambda: sample, max_cols=10)
+
+    console.banner("Step 1 Complete: Data processed and saved", leading_newline=True)
+
+    return PROCESSED_FILE
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Process raw analysis data for a team')
     parser.add_argument('team', type=int, help='Team number (1, 2, or 3)')
+    parser.add_argument('--format', choices=FORMATS, default='csv',
+                        help='Format of the processed data file (default: csv)')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='Stream the raw export in chunks of this many rows instead of loading it whole')
+    parser.add_argument('--xlsx', default=None, metavar='WORKBOOK',
+                        help='Read the team sheet of the source workbook instead of analysis_raw.csv')
+    parser.add_argument('--sheet', default=None,
+                        help='Sheet of --xlsx to read (default: the sheet named after the team, e.g. 3팀_분석)')
+    add_profile_arguments(parser)
+    console.add_log_arguments(parser)
     args = parser.parse_args()
+    console.configure_from_args(args)
+    if args.xlsx and args.chunksize:
+        parser.error('--chunksize applies to the CSV export; --xlsx already streams the sheet')
 
-    df = main(args.team)
+    with profiled(args.team, 'step1', **profile_options(args)):
+        if args.chunksize:
+            processed_file = main_streaming(args.team, args.chunksize, fmt=args.format)
+        else:
+            try:
+                df = main(args.team, fmt=args.format, xlsx=args.xlsx, sheet=args.sheet)
+            except ValueError as e:
+                sys.exit(str(e))
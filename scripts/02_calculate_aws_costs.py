@@ -3,47 +3,66 @@
 Step 2: Calculate AWS Batch costs for bioinformatics pipelines
 - Apply AWS EC2 pricing for compute resources
 - Consider CPU, memory, time, and parallel tasks
-- Use us-east-1 pricing (most common region for genomics)
+- Use us-east-1 On-Demand pricing (most common region for genomics) by
+  default; other catalogues (Spot, Graviton, other regions) via --pricing, and
+  extra cost columns per scenario via --scenarios
+- Optional instance plan (--plan group|pipeline) that co-locates concurrent
+  tasks on shared instances, next to the per-step baseline; concurrency
+  follows the wall-clock model's step dependencies (--dependency)
+- Optional sample-count sweep (--sweep 10 100 ...) projecting costs to batch sizes
+- Optional persistent cost cache (--cost-cache) reusing steps with the same
+  resource signature across runs and teams
+- Processed data is validated first (--validate warn|fail|strict|off, see validation.py)
+- Optional cross-team query store (--query-store, see query_store.py)
+- Optional JSON run profile (--profile, see run_profile.py)
+- --quiet skips the summaries, --log-format json prints them as JSON events
 """
 
 import pandas as pd
 import numpy as np
 import argparse
+import sys
 from pathlib import Path
 
+import console
+from cost_cache import DEFAULT_MAX_ENTRIES, CostCache
+from instance_planner import PLAN_SCOPES, plan_instances
+from intermediate_io import FORMATS, intermediate_path, read_intermediate, write_intermediate
+from pricing import DEFAULT_SCENARIO, describe_families, load_pricing, load_scenarios, region_label
+from query_store import DEFAULT_QUERY_STORE, QueryStore
+from run_profile import add_profile_arguments, profile_options, profiled, timed
+from scheduling import DEFAULT_DEPENDENCY, DEPENDENCY_RULES
+from validation import DEFAULT_POLICY, VALIDATION_POLICIES, ValidationError, run_validation
+from sample_sweep import DEFAULT_CHROMOSOMES, load_scaling_rules, sweep_costs
+
 # Setup paths
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
+DEFAULT_COST_CACHE = DATA_DIR / "cost_cache.sqlite"
+
+# Default pricing scenario, from the catalogue files in pricing/ (see pricing.py):
+# us-east-1 On-Demand, Linux, January 2026, C6i (compute-optimized) and
+# R6i (memory-optimized) instances, gp3 EBS at $0.08 per GB-month
+DEFAULT_PRICING = load_pricing(DEFAULT_SCENARIO)
+EC2_PRICING = DEFAULT_PRICING['ec2']
+EBS_PRICE_PER_GB_HOUR = DEFAULT_PRICING['ebs_price_per_gb_hour']
+PRICING_TABLE = DEFAULT_PRICING['table']
 
-# AWS EC2 Pricing for us-east-1 (On-Demand, Linux, January 2026)
-# Source: https://www.economize.cloud/resources/aws/pricing/ec2/
-# Compute-optimized (C6i) - Best for CPU-intensive genomics workloads
-EC2_PRICING = {
-    # Instance Type: (vCPU, Memory GB, Hourly Rate USD)
-    'c6i.large': (2, 4, 0.085),
-    'c6i.xlarge': (4, 8, 0.17),
-    'c6i.2xlarge': (8, 16, 0.34),
-    'c6i.4xlarge': (16, 32, 0.68),
-    'c6i.8xlarge': (32, 64, 1.36),
-    'c6i.12xlarge': (48, 96, 2.04),
-    'c6i.16xlarge': (64, 128, 2.72),
-    'c6i.24xlarge': (96, 192, 4.08),
-
-    # Memory-optimized (R6i) - For memory-intensive workloads
-    'r6i.large': (2, 16, 0.126),
-    'r6i.xlarge': (4, 32, 0.252),
-    'r6i.2xlarge': (8, 64, 0.504),
-    'r6i.4xlarge': (16, 128, 1.008),
-    'r6i.8xlarge': (32, 256, 2.016),
-    'r6i.12xlarge': (48, 384, 3.024),
-    'r6i.16xlarge': (64, 512, 4.032),
-}
-
-# EBS Storage pricing (gp3 volumes, us-east-1)
-# $0.08 per GB-month = $0.00011 per GB-hour
-EBS_PRICE_PER_GB_HOUR = 0.08 / (30 * 24)
-
-def select_instance_type(cpu, mem_gb):
+def lookup_instances(cpu_req, mem_req, table=PRICING_TABLE):
+    """
+    Resolve normalized (CPU, MEM) requirement arrays to positions in the pricing
+    table with O(log n) binary searches on the selection frontier.
+
+    Returns -1 where no instance is large enough.
+    """
+    j = np.searchsorted(table['cpu_levels'], cpu_req, side='left')
+    k = np.searchsorted(table['mem_levels'], mem_req, side='left')
+    in_range = (j < len(table['cpu_levels'])) & (k < len(table['mem_levels']))
+    positions = np.full(len(j), -1, dtype=np.int64)
+    positions[in_range] = table['frontier'][j[in_range], k[in_range]]
+    return positions
+
+def select_instance_type(cpu, mem_gb, table=PRICING_TABLE):
     """
     Select the most cost-effective EC2 instance type based on CPU and memory requirements.
 
@@ -52,6 +71,9 @@ def select_instance_type(cpu, mem_gb):
     2. Among those, choose the cheapest option
     3. Prefer compute-optimized (C6i) for CPU-heavy workloads
     4. Use memory-optimized (R6i) only when memory requirements demand it
+
+    Choices are memoized per distinct requirement, so the "no suitable
+    instance" warning is printed once per requirement rather than per row.
     """
     # Handle edge cases
     if pd.isna(cpu) or pd.isna(mem_gb):
@@ -60,165 +82,404 @@ def select_instance_type(cpu, mem_gb):
     cpu = max(1, int(cpu))
     mem_gb = max(1, int(mem_gb))
 
-    # Find suitable instances
-    suitable_instances = []
-    for instance_type, (inst_cpu, inst_mem, hourly_rate) in EC2_PRICING.items():
-        if inst_cpu >= cpu and inst_mem >= mem_gb:
-            # Calculate cost efficiency (lower is better)
-            cost_per_cpu = hourly_rate / inst_cpu
-            cost_per_mem = hourly_rate / inst_mem
-            efficiency_score = (cost_per_cpu + cost_per_mem) / 2
-
-            suitable_instances.append({
-                'type': instance_type,
-                'cpu': inst_cpu,
-                'mem': inst_mem,
-                'rate': hourly_rate,
-                'efficiency': efficiency_score,
-                'waste_cpu': inst_cpu - cpu,
-                'waste_mem': inst_mem - mem_gb,
-            })
-
-    if not suitable_instances:
-        # No suitable instance found - need larger than available
-        print(f"⚠ Warning: No instance found for CPU={cpu}, MEM={mem_gb}GB. Using largest available.")
-        # Use the largest instance available
-        largest = max(EC2_PRICING.items(), key=lambda x: (x[1][0], x[1][1]))
-        return largest[0], largest[1][0], largest[1][2]
-
-    # Sort by efficiency (prefer less wasted resources and lower cost)
-    suitable_instances.sort(key=lambda x: (x['efficiency'], x['waste_cpu'] + x['waste_mem']))
-    best = suitable_instances[0]
-
-    return best['type'], best['cpu'], best['rate']
-
-def calculate_costs(df, team):
-    """Calculate AWS costs for each pipeline step"""
-
-    print("=" * 80)
-    print(f"Step 2: Calculating AWS Batch Costs for Team {team}")
-    print("=" * 80)
-
-    print("\n1. AWS Pricing Model:")
-    print("   - Region: us-east-1 (N. Virginia)")
-    print("   - Instance families:")
-    print("     * C6i (Compute-optimized): CPU-intensive workloads")
-    print("     * R6i (Memory-optimized): Memory-intensive workloads")
-    print(f"   - EBS Storage: ${EBS_PRICE_PER_GB_HOUR:.6f} per GB-hour")
+    memo = table['memo']
+    if (cpu, mem_gb) not in memo:
+        pos = lookup_instances(np.array([cpu]), np.array([mem_gb]), table)[0]
+        if pos < 0:
+            # No suitable instance found - need larger than available
+            console.warning(f"⚠ Warning: No instance found for CPU={cpu}, MEM={mem_gb}GB. Using largest available.",
+                            cpu=cpu, mem_gb=mem_gb)
+            memo[(cpu, mem_gb)] = table['largest']
+        else:
+            memo[(cpu, mem_gb)] = (table['type'][pos], int(table['cpu'][pos]), table['rate'][pos])
+
+    return memo[(cpu, mem_gb)]
+
+def select_instance_types(cpus, mems, table=PRICING_TABLE):
+    """
+    Vectorized select_instance_type over arrays of CPU and memory requirements.
+
+    Returns (instance_type, instance_vcpu, hourly_rate) arrays with the same
+    values select_instance_type gives row by row, except that rows with a
+    missing CPU or memory requirement get NaN / NaN / 0.0 (NaN rather than
+    None, so the column reads the same in memory as after a CSV round-trip). Requirements larger than every
+    instance fall back to the largest one (see warn_oversized).
+    """
+    cpus = np.asarray(cpus, dtype=float)
+    mems = np.asarray(mems, dtype=float)
+
+    valid = ~(np.isnan(cpus) | np.isnan(mems))
+    cpu_req = np.maximum(1, np.trunc(np.where(valid, cpus, 1)))
+    mem_req = np.maximum(1, np.trunc(np.where(valid, mems, 1)))
+
+    positions = lookup_instances(cpu_req, mem_req, table)
+    found = positions >= 0
+    best = np.where(found, positions, 0)
+
+    instance_type = np.where(valid, table['type'][best], np.nan)
+    instance_vcpu = np.where(valid, table['cpu'][best], np.nan)
+    hourly_rate = np.where(valid, table['rate'][best], 0.0)
+
+    unmatched = valid & ~found
+    if unmatched.any():
+        largest_type, largest_cpu, largest_rate = table['largest']
+        instance_type[unmatched] = largest_type
+        instance_vcpu[unmatched] = largest_cpu
+        hourly_rate[unmatched] = largest_rate
+
+    return instance_type, instance_vcpu, hourly_rate
+
+def warn_oversized(df, costs, pricing):
+    """
+    Warn once about the steps whose requirements exceed their chosen instance.
+
+    Those are the steps no instance was large enough for (they got the largest
+    one). It is judged from the priced columns, so the warning is the same
+    whether the costs were computed or taken from the cost cache.
+    """
+    cpu_req = np.maximum(1, np.trunc(df['CPUs'].to_numpy(dtype=float)))
+    mem_req = np.maximum(1, np.trunc(df['MEM(G)'].to_numpy(dtype=float)))
+    instance_mem = pd.Series(costs['instance_type']).map(
+        {instance: mem for instance, (_, mem, _) in pricing['ec2'].items()}).to_numpy(dtype=float)
+    with np.errstate(invalid='ignore'):
+        oversized = (cpu_req > costs['instance_vcpu']) | (mem_req > instance_mem)
+    if oversized.any():
+        largest_type = pricing['table']['largest'][0]
+        shapes = np.unique(np.column_stack([cpu_req[oversized], mem_req[oversized]]), axis=0)
+        shape_list = ', '.join(f"CPU={int(c)}/MEM={int(m)}GB" for c, m in shapes[:5])
+        console.warning(f"⚠ Warning: No instance found for {oversized.sum()} steps "
+                        f"({len(shapes)} requirements: {shape_list}{', ...' if len(shapes) > 5 else ''}). "
+                        f"Using largest available ({largest_type}).",
+                        steps=int(oversized.sum()), fallback=largest_type)
+
+def price_steps(df, pricing):
+    """
+    Instance choice and costs of every step under one pricing scenario.
+
+    Returns a dict of column arrays: instance_type, instance_vcpu,
+    instance_hourly_rate, compute_cost_usd, storage_cost_usd, total_cost_usd.
+    """
+    # Select instance types for all rows at once
+    instance_type, instance_vcpu, hourly_rate = select_instance_types(
+        df['CPUs'].to_numpy(dtype=float), df['MEM(G)'].to_numpy(dtype=float), pricing['table'])
+
+    # Handle missing values
+    time_hr = df['TIME(hr)'].fillna(0.0).to_numpy(dtype=float)
+    n_task = df['nTask(병렬)'].fillna(1).to_numpy(dtype=float)
+    size_mb = df['SIZE(MB)'].fillna(0.0).to_numpy(dtype=float)
+
+    # Calculate compute cost
+    # Cost = hourly_rate * time * n_parallel_tasks
+    compute_cost = np.where(pd.notna(instance_type), hourly_rate * time_hr * n_task, 0.0)
+
+    # Calculate storage cost
+    # Cost = GB * time * price_per_gb_hour
+    storage_gb = size_mb / 1024
+    storage_cost = np.where(size_mb > 0, storage_gb * time_hr * pricing['ebs_price_per_gb_hour'], 0.0)
+
+    # Integer vCPU column unless some rows had no instance (matches row-wise output)
+    if not np.isnan(instance_vcpu).any():
+        instance_vcpu = instance_vcpu.astype(np.int64)
+
+    return {
+        'instance_type': instance_type,
+        'instance_vcpu': instance_vcpu,
+        'instance_hourly_rate': hourly_rate,
+        'compute_cost_usd': compute_cost,
+        'storage_cost_usd': storage_cost,
+        'total_cost_usd': compute_cost + storage_cost,
+    }
+
+def calculate_costs(df, team, pricing=None, scenarios=(), cache=None):
+    """
+    Calculate AWS costs for each pipeline step.
+
+    pricing is a compiled scenario from pricing.load_pricing (default: the
+    on-demand catalogue). Every scenario in scenarios (a name, or a compiled
+    scenario to skip loading it again) adds its own instance and cost columns,
+    suffixed with [name], from the same pass over the rows.
+    With a CostCache, only resource signatures not priced before are computed.
+    """
+    pricing = pricing or DEFAULT_PRICING
+
+    console.banner(f"Step 2: Calculating AWS Batch Costs for Team {team}", team=team, stage='step2')
+
+    console.info("\n1. AWS Pricing Model:")
+    if pricing['name'] != DEFAULT_SCENARIO:
+        console.info(f"   - Scenario: {pricing['name']} ({pricing['description']})", scenario=pricing['name'])
+    console.info(f"   - Region: {region_label(pricing['region'])}", region=pricing['region'])
+    console.summary("   - Instance families:", lambda: describe_families(pricing['ec2']),
+                    render=lambda lines: "\n".join(f"     * {line}" for line in lines))
+    console.info(f"   - EBS Storage: ${pricing['ebs_price_per_gb_hour']:.6f} per GB-hour")
 
     # Apply instance selection
-    print("\n2. Selecting optimal EC2 instances for each step...")
-
-    results = []
-    for idx, row in df.iterrows():
-        cpu = row['CPUs']
-        mem_gb = row['MEM(G)']
-        time_hr = row['TIME(hr)']
-        n_task = row['nTask(병렬)']
-        size_mb = row['SIZE(MB)']
-
-        # Select instance type
-        instance_type, instance_cpu, hourly_rate = select_instance_type(cpu, mem_gb)
-
-        # Handle missing values
-        if pd.isna(time_hr):
-            time_hr = 0.0
-        if pd.isna(n_task):
-            n_task = 1
-        if pd.isna(size_mb):
-            size_mb = 0.0
-
-        # Calculate compute cost
-        # Cost = hourly_rate * time * n_parallel_tasks
-        compute_cost = hourly_rate * time_hr * n_task if instance_type else 0.0
-
-        # Calculate storage cost
-        # Cost = GB * time * price_per_gb_hour
-        storage_gb = size_mb / 1024
-        storage_cost = storage_gb * time_hr * EBS_PRICE_PER_GB_HOUR if size_mb > 0 else 0.0
-
-        # Total cost
-        total_cost = compute_cost + storage_cost
-
-        results.append({
-            'instance_type': instance_type,
-            'instance_vcpu': instance_cpu,
-            'instance_hourly_rate': hourly_rate,
-            'compute_cost_usd': compute_cost,
-            'storage_cost_usd': storage_cost,
-            'total_cost_usd': total_cost,
-        })
+    console.info("\n2. Selecting optimal EC2 instances for each step...")
+    with timed('instance_selection') as mark:
+        costs = cache.price(df, pricing, price_steps) if cache else price_steps(df, pricing)
+        mark['rows'] = len(df)
+    warn_oversized(df, costs, pricing)
+
+    # Extra scenarios: same rows, other catalogues
+    scenario_columns = {}
+    for scenario in scenarios:
+        name = scenario['name'] if isinstance(scenario, dict) else scenario
+        if name == pricing['name']:
+            continue
+        with timed('scenarios'):
+            if not isinstance(scenario, dict):
+                scenario = load_pricing(name)
+            scenario_costs = cache.price(df, scenario, price_steps) if cache else price_steps(df, scenario)
+        warn_oversized(df, scenario_costs, scenario)
+        for col, values in scenario_costs.items():
+            if col != 'instance_vcpu':
+                scenario_columns[f"{col}[{name}]"] = values
 
     # Add cost columns to dataframe
-    results_df = pd.DataFrame(results)
+    results_df = pd.DataFrame({**costs, **scenario_columns}, index=df.index)
     df_with_costs = pd.concat([df, results_df], axis=1)
 
     # Summary statistics
-    print(f"   - Total steps processed: {len(df)}")
-    print(f"   - Steps with costs: {(df_with_costs['total_cost_usd'] > 0).sum()}")
-
-    print("\n3. Cost Summary by Instance Type:")
-    instance_summary = df_with_costs.groupby('instance_type').agg({
-        'total_cost_usd': ['count', 'sum', 'mean'],
-        'compute_cost_usd': 'sum',
-        'storage_cost_usd': 'sum',
-    }).round(4)
-    print(instance_summary.to_string())
-
-    print("\n4. Cost Summary by Job (직무):")
-    job_summary = df_with_costs.groupby('직무(업무명)').agg({
-        'total_cost_usd': ['sum', 'mean'],
-        'compute_cost_usd': 'sum',
-        'storage_cost_usd': 'sum',
-    }).round(4)
-    print(job_summary.to_string())
-
-    print("\n5. Cost Summary by Task Detail (업무세부내역):")
-    task_summary = df_with_costs.groupby(['직무(업무명)', '업무세부내역']).agg({
-        'total_cost_usd': 'sum',
-        'compute_cost_usd': 'sum',
-        'storage_cost_usd': 'sum',
-    }).round(4)
-    print(task_summary.to_string())
-
-    # Top 10 most expensive steps
-    print("\n6. Top 10 Most Expensive Pipeline Steps:")
-    top_10 = df_with_costs.nlargest(10, 'total_cost_usd')[
-        ['직무(업무명)', '업무세부내역', 'Group', 'Step', 'tools',
-         'CPUs', 'MEM(G)', 'TIME(hr)', 'nTask(병렬)',
-         'instance_type', 'total_cost_usd']
-    ]
-    print(top_10.to_string(index=False, max_colwidth=30))
+    if cache:
+        console.info(f"   - Cost cache: {cache.hits} signatures reused, {cache.misses} computed ({cache.path.name})",
+                     cache_hits=cache.hits, cache_misses=cache.misses)
+    console.info(f"   - Total steps processed: {len(df)}", steps=len(df))
+    if console.enabled():
+        n_costed = (df_with_costs['total_cost_usd'] > 0).sum()
+        console.info(f"   - Steps with costs: {n_costed}", steps_with_costs=n_costed)
+
+    # Summaries are only built when they are shown
+    with timed('aggregation'):
+        console.summary("\n3. Cost Summary by Instance Type:", lambda: df_with_costs.groupby('instance_type').agg({
+            'total_cost_usd': ['count', 'sum', 'mean'],
+            'compute_cost_usd': 'sum',
+            'storage_cost_usd': 'sum',
+        }).round(4))
+
+        console.summary("\n4. Cost Summary by Job (직무):", lambda: df_with_costs.groupby('직무(업무명)', observed=True).agg({
+            'total_cost_usd': ['sum', 'mean'],
+            'compute_cost_usd': 'sum',
+            'storage_cost_usd': 'sum',
+        }).round(4))
+
+        console.summary("\n5. Cost Summary by Task Detail (업무세부내역):",
+                        lambda: df_with_costs.groupby(['직무(업무명)', '업무세부내역'], observed=True).agg({
+                            'total_cost_usd': 'sum',
+                            'compute_cost_usd': 'sum',
+                            'storage_cost_usd': 'sum',
+                        }).round(4))
+
+        # Top 10 most expensive steps
+        console.summary("\n6. Top 10 Most Expensive Pipeline Steps:", lambda: df_with_costs.nlargest(10, 'total_cost_usd')[
+            ['직무(업무명)', '업무세부내역', 'Group', 'Step', 'tools',
+             'CPUs', 'MEM(G)', 'TIME(hr)', 'nTask(병렬)',
+             'instance_type', 'total_cost_usd']
+        ], index=False, max_colwidth=30)
 
     return df_with_costs
 
-def main(team):
+def report_pricing_scenarios(df_with_costs, pricing, scenarios):
+    """Compare the total cost per job under the primary pricing and every extra scenario"""
+    names = [pricing['name']] + [name for name in scenarios if name != pricing['name']]
+    title = f"\nPricing scenarios ({', '.join(names)}):"
+    columns = {name: 'total_cost_usd' if name == pricing['name'] else f"total_cost_usd[{name}]" for name in names}
+
+    totals = df_with_costs.groupby('직무(업무명)', observed=True)[list(columns.values())].sum()
+    totals.columns = names
+    totals.loc['TOTAL'] = totals.sum()
+    console.summary(title, lambda: totals, float_format='{:.2f}'.format)
+
+    baseline = totals.loc['TOTAL', pricing['name']]
+    for name in names[1:]:
+        change = (totals.loc['TOTAL', name] - baseline) / baseline * 100 if baseline else 0
+        console.info(f"   - {name}: ${totals.loc['TOTAL', name]:.2f} ({change:+.1f}% vs {pricing['name']})",
+                     scenario=name, total_cost_usd=totals.loc['TOTAL', name], change_pct=round(change, 1))
+
+    return totals
+
+def report_instance_plan(df_with_costs, team_dir, scope='group', exact=False, save=True, pricing=None,
+                         dependency=DEFAULT_DEPENDENCY):
+    """Plan shared instances for the costed steps and compare with the per-step baseline"""
+    pricing = pricing or DEFAULT_PRICING
+    console.info(f"\nInstance plan (co-locating concurrent tasks per {scope}, {dependency} dependencies"
+                 f"{', exact for small scopes' if exact else ''}):")
+    plan, comparison = plan_instances(df_with_costs, pricing['table'], scope=scope, exact=exact, dependency=dependency)
+
+    baseline = comparison['baseline_cost_usd'].sum()
+    planned = comparison['planned_cost_usd'].sum()
+    if console.enabled():
+        console.info(f"   - Tasks: {comparison['n_tasks'].sum()} on {len(plan)} instances "
+                     f"({comparison['method'].value_counts().to_dict()})",
+                     tasks=comparison['n_tasks'].sum(), instances=len(plan))
+    console.info(f"   - Baseline compute cost (one instance per task): ${baseline:.2f}", baseline_cost_usd=baseline)
+    console.info(f"   - Planned compute cost: ${planned:.2f} "
+                 f"(saves ${baseline - planned:.2f}, {(baseline - planned) / baseline * 100 if baseline else 0:.1f}%)",
+                 planned_cost_usd=planned)
+
+    console.summary('', lambda: comparison.nlargest(10, 'savings_usd').round(2), name='Top 10 plan savings',
+                    index=False, max_colwidth=30)
+
+    if save:
+        plan_file = team_dir / f"placement_plan_{scope}.csv"
+        summary_file = team_dir / f"placement_summary_{scope}.csv"
+        plan.to_csv(plan_file, index=False, encoding='utf-8')
+        comparison.to_csv(summary_file, index=False, encoding='utf-8')
+        console.info(f"   ✓ Saved placement plan: {plan_file}", path=plan_file)
+        console.info(f"   ✓ Saved plan vs baseline: {summary_file}", path=summary_file)
+
+    return plan, comparison
+
+def report_sample_sweep(df_with_costs, team_dir, sample_counts, rules_file=None,
+                        chromosomes=DEFAULT_CHROMOSOMES, save=True, pricing=None):
+    """Project the costs of every pipeline to the given sample counts"""
+    pricing = pricing or DEFAULT_PRICING
+    console.info(f"\nSample-count sweep ({', '.join(str(n) for n in sample_counts)} samples):")
+    rules = load_scaling_rules(rules_file) if rules_file else None
+    sweep = sweep_costs(df_with_costs, sample_counts, pricing['ebs_price_per_gb_hour'],
+                        rules=rules, chromosomes=chromosomes)
+
+    console.summary('', lambda: sweep.pivot_table(index=['직무(업무명)', 'Analysis_name'], columns='samples',
+                                                  values='total_cost_usd', aggfunc='sum', observed=True),
+                    name='Total cost by sample count', max_colwidth=40, float_format='{:.2f}'.format)
+
+    if save:
+        sweep_file = team_dir / "sample_sweep.csv"
+        sweep.to_csv(sweep_file, index=False, encoding='utf-8')
+        console.info(f"   ✓ Saved sample sweep: {sweep_file}", path=sweep_file)
+
+    return sweep
+
+@timed('query_store')
+def load_query_store(path, team, df_with_costs, pricing, pipelines=None):
+    """Replace the costed steps of a team (or of the given pipelines only) in the query store"""
+    store = QueryStore(path)
+    try:
+        n_rows = store.load_steps(team, df_with_costs, pricing=pricing, pipelines=pipelines)
+    finally:
+        store.close()
+    console.info(f"   ✓ Loaded {n_rows} steps into query store: {path}", rows=n_rows, path=path)
+
+@timed('step2')
+def main(team, df=None, save=True, fmt='csv', plan=None, exact=False, sweep=None, scaling_rules=None,
+         chromosomes=DEFAULT_CHROMOSOMES, pricing=DEFAULT_SCENARIO, scenarios=(), cost_cache=None,
+         cache_max_entries=DEFAULT_MAX_ENTRIES, query_store=None, validate=DEFAULT_POLICY,
+         dependency=DEFAULT_DEPENDENCY):
+    """
+    Calculate costs for a team.
+
+    df is the processed data from stage 1; when omitted it is loaded from
+    analysis_processed in format fmt (csv, parquet or feather). With
+    save=False the costed data is only returned. plan ('group' or
+    'pipeline') additionally builds a shared-instance placement plan, with
+    concurrent tasks found by the dependency rule (see scheduling.py), and
+    sweep (a list of sample counts) projects the costs to those batch sizes
+    using the scaling_rules CSV. pricing names the scenario in pricing/ used
+    for the cost columns; every name in scenarios ('all' for every scenario)
+    adds its own cost columns and a comparison. cost_cache is the path of a
+    persistent cost cache (None to price every row). query_store is the path
+    of the cross-team query store to load the costed steps into. validate
+    is the validation policy applied to df before costing (see validation.py).
+    """
     # Setup file paths based on team number
     TEAM_DIR = DATA_DIR / f"team{team}"
-    PROCESSED_FILE = TEAM_DIR / "analysis_processed.csv"
-    COSTED_FILE = TEAM_DIR / "analysis_with_costs.csv"
+    PROCESSED_FILE = intermediate_path(TEAM_DIR, "analysis_processed", fmt)
+    COSTED_FILE = intermediate_path(TEAM_DIR, "analysis_with_costs", fmt)
 
     # Load processed data
-    print(f"Loading processed data from: {PROCESSED_FILE}\n")
-    df = pd.read_csv(PROCESSED_FILE, encoding='utf-8')
+    if df is None:
+        console.info(f"Loading processed data from: {PROCESSED_FILE}\n")
+        with timed('read_intermediate'):
+            df = read_intermediate(PROCESSED_FILE, fmt)
+
+    catalogue = DEFAULT_PRICING if pricing == DEFAULT_SCENARIO else load_pricing(pricing)
+
+    # Validate before costing; raises ValidationError when the policy rejects the data
+    if validate != 'off':
+        run_validation(df, team, policy=validate, pricing=catalogue, save=save)
 
     # Calculate costs
-    df_with_costs = calculate_costs(df, team)
+    if 'all' in scenarios:
+        scenarios = list(load_scenarios())
+    cache = CostCache(Path(cost_cache), max_entries=cache_max_entries) if cost_cache else None
+    try:
+        df_with_costs = calculate_costs(df, team, pricing=catalogue, scenarios=scenarios, cache=cache)
+    finally:
+        if cache:
+            cache.close()
 
     # Save results
-    print(f"\n7. Saving cost analysis to: {COSTED_FILE}")
-    df_with_costs.to_csv(COSTED_FILE, index=False, encoding='utf-8')
-    print("   ✓ Data saved successfully")
+    if save:
+        console.info(f"\n7. Saving cost analysis to: {COSTED_FILE}")
+        with timed('write'):
+            write_intermediate(df_with_costs, COSTED_FILE, fmt)
+        console.info("   ✓ Data saved successfully", path=COSTED_FILE)
+
+    if query_store:
+        load_query_store(query_store, team, df_with_costs, catalogue['name'])
 
-    print("\n" + "=" * 80)
-    print("Step 2 Complete: AWS costs calculated")
-    print("=" * 80)
+    if scenarios:
+        report_pricing_scenarios(df_with_costs, catalogue, scenarios)
+
+    if plan:
+        with timed('instance_plan'):
+            report_instance_plan(df_with_costs, TEAM_DIR, scope=plan, exact=exact, save=save, pricing=catalogue,
+                                 dependency=dependency)
+
+    if sweep:
+        with timed('sample_sweep'):
+            report_sample_sweep(df_with_costs, TEAM_DIR, sweep, rules_file=scaling_rules,
+                                chromosomes=chromosomes, save=save, pricing=catalogue)
+
+    console.banner("Step 2 Complete: AWS costs calculated", leading_newline=True)
 
     return df_with_costs
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Calculate AWS costs for a team')
     parser.add_argument('team', type=int, help='Team number (1, 2, or 3)')
+    parser.add_argument('--format', choices=FORMATS, default='csv',
+                        help='Format of the processed and costed data files (default: csv)')
+    parser.add_argument('--plan', choices=list(PLAN_SCOPES), default=None,
+                        help='Also plan shared instances for the concurrent tasks of each group or pipeline')
+    parser.add_argument('--exact', action='store_true',
+                        help='Solve small scopes of the instance plan exactly (branch and bound)')
+    parser.add_argument('--dependency', choices=DEPENDENCY_RULES, default=DEFAULT_DEPENDENCY,
+                        help='Step dependencies that decide which tasks of --plan run concurrently: chain '
+                             '(steps of a group in sheet order, groups in parallel; default) or layered')
+    parser.add_argument('--sweep', type=int, nargs='+', default=None, metavar='N',
+                        help='Project pipeline costs to these sample counts (e.g. --sweep 10 100 1000 10000)')
+    parser.add_argument('--scaling-rules', default=None,
+                        help='CSV of per-step scaling rules for --sweep (default: every step scales linearly)')
+    parser.add_argument('--chromosomes', type=int, default=DEFAULT_CHROMOSOMES,
+                        help=f'Fan-out of per_chromosome steps in --sweep (default: {DEFAULT_CHROMOSOMES})')
+    parser.add_argument('--pricing', choices=list(load_scenarios()), default=DEFAULT_SCENARIO,
+                        help=f'Pricing scenario from pricing/scenarios.json for the cost columns (default: {DEFAULT_SCENARIO})')
+    parser.add_argument('--scenarios', nargs='+', default=(), metavar='NAME',
+                        choices=list(load_scenarios()) + ['all'],
+                        help="Also price every step under these scenarios ('all' for every scenario)")
+    parser.add_argument('--cost-cache', nargs='?', const=DEFAULT_COST_CACHE, default=None, metavar='PATH',
+                        help=f'Reuse costs of steps with the same resources from a SQLite cache (default path: {DEFAULT_COST_CACHE.relative_to(PROJECT_ROOT)})')
+    parser.add_argument('--cache-max-entries', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help=f'Evict least recently used cache entries beyond this many (default: {DEFAULT_MAX_ENTRIES})')
+    parser.add_argument('--validate', choices=VALIDATION_POLICIES, default=DEFAULT_POLICY,
+                        help='Validation of the processed data before costing: warn (default), fail on errors, '
+                             'strict (fail on any issue) or off')
+    parser.add_argument('--query-store', nargs='?', const=DEFAULT_QUERY_STORE, default=None, metavar='PATH',
+                        help=f'Also load the costed steps into the cross-team query store (default path: {DEFAULT_QUERY_STORE.relative_to(PROJECT_ROOT)})')
+    add_profile_arguments(parser)
+    console.add_log_arguments(parser)
     args = parser.parse_args()
-
-    df_with_costs = main(args.team)
+    if args.sweep and min(args.sweep) < 1:
+        parser.error('--sweep sample counts must be at least 1')
+    if args.chromosomes < 1:
+        parser.error('--chromosomes must be at least 1')
+    console.configure_from_args(args)
+
+    with profiled(args.team, 'step2', **profile_options(args)):
+        try:
+            df_with_costs = main(args.team, fmt=args.format, plan=args.plan, exact=args.exact, sweep=args.sweep,
+                                 scaling_rules=args.scaling_rules, chromosomes=args.chromosomes,
+                                 pricing=args.pricing, scenarios=args.scenarios, cost_cache=args.cost_cache,
+                                 cache_max_entries=args.cache_max_entries, query_store=args.query_store,
+                                 validate=args.validate, dependency=args.dependency)
+        except ValidationError as e:
+            sys.exit(str(e))
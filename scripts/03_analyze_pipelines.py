@@ -4,6 +4,9 @@ Step 3 & 4: Analyze pipeline structure and calculate costs per analysis pipeline
 - Group steps by pipeline (직무 + 업무세부내역)
 - Calculate total costs, time, and resources per pipeline
 - Generate detailed reports
+- Optional cross-team query store (--query-store, see query_store.py)
+- Optional JSON run profile (--profile, see run_profile.py)
+- --quiet skips the summaries, --log-format json prints them as JSON events
 """
 
 import pandas as pd
@@ -11,357 +14,318 @@ import numpy as np
 import argparse
 from pathlib import Path
 import json
+from concurrent.futures import ProcessPoolExecutor
+
+import console
+from incremental import pipeline_key, pipeline_positions
+from intermediate_io import FORMATS, intermediate_path, read_intermediate
+from query_store import DEFAULT_QUERY_STORE, QueryStore
+from run_profile import add_profile_arguments, profile_options, profiled, timed
+from scheduling import DEFAULT_DEPENDENCY, DEFAULT_MAX_VCPUS, DEPENDENCY_RULES, schedule_pipelines
+from report_render import (REPORT_FORMATS, key_label, pipeline_report_data, render_pipeline_report,
+                           render_summary_report, summary_report_data, write_report)
 
 # Setup paths
 PROJECT_ROOT = Path(__file__).parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 REPORTS_DIR = PROJECT_ROOT / "reports"
 
-def analyze_pipeline_structure(df):
-    """Analyze the structure of each pipeline"""
-
-    print("=" * 80)
-    print("Step 3: Analyzing Pipeline Structure")
-    print("=" * 80)
-
-    # Group by 직무(업무명) and Analysis_name only
-    # Pipeline Name differences within the same Analysis_name are not counted separately
-    def get_pipeline_key(row):
-        job = row['직무(업무명)']
-        analysis_name = row['Analysis_name']
+# Columns of the costed data used by the analysis and reports
+ANALYSIS_COLUMNS = ['직무(업무명)', 'Analysis_name', 'Platfom', 'Pipeline Name', 'Pipeline Version',
+                    'Group', 'Step', 'tools', 'version', 'CPUs', 'MEM(G)', 'TIME(hr)', 'nTask(병렬)',
+                    'SIZE(MB)', 'instance_type', 'instance_hourly_rate',
+                    'compute_cost_usd', 'storage_cost_usd', 'total_cost_usd']
 
-        return (job, analysis_name)
+# A pipeline is one (직무, Analysis_name) pair
+PIPELINE_KEY = ['직무(업무명)', 'Analysis_name']
 
-    df['pipeline_key'] = df.apply(get_pipeline_key, axis=1)
-    pipelines = df.groupby('pipeline_key')
+def _distinct_values(df, keys, col):
+    """Non-null values of col for each key (blank key cells as None), in order of first appearance"""
+    distinct = df[keys + [col]].dropna(subset=[col]).drop_duplicates()
+    values = distinct.groupby(keys, sort=False, observed=True, dropna=False)[col].agg(list)
+    return {pipeline_key(*key): names for key, names in values.items()}
 
-    pipeline_summary = []
-
-    for (job, analysis_name), group in pipelines:
-        # Count groups and steps
-        n_groups = group['Group'].nunique()
-        n_steps = len(group)
-
-        # Get unique tools
-        tools_list = group['tools'].dropna().unique().tolist()
-        n_tools = len(tools_list)
+@timed('aggregation')
+def analyze_pipeline_structure(df, max_vcpus=DEFAULT_MAX_VCPUS, dependency=DEFAULT_DEPENDENCY):
+    """
+    Analyze the structure of each pipeline
 
-        # Get pipeline names (may be multiple)
-        pipeline_names = group['Pipeline Name'].dropna().unique()
-        pipeline_name = ', '.join(pipeline_names) if len(pipeline_names) > 1 else pipeline_names[0]
+    All per-pipeline totals come from one aggregation over (직무, Analysis_name)
+    and the group breakdowns from one over (직무, Analysis_name, Group).
+    Wall-clock time is modelled by scheduling.py on a compute environment of
+    max_vcpus vCPUs, with the step dependencies of the dependency rule.
+    """
 
-        # Get platforms and versions (may be multiple)
-        platforms = group['Platfom'].dropna().unique()
-        platform_str = ', '.join(sorted(set(platforms)))
+    console.banner("Step 3: Analyzing Pipeline Structure", stage='step3')
 
-        versions = group['Pipeline Version'].dropna().unique()
-        version = versions[0] if len(versions) > 0 else 'N/A'
+    # Group by 직무(업무명) and Analysis_name only
+    # Pipeline Name differences within the same Analysis_name are not counted separately
 
-        # Resource summary
-        total_cpu = group['CPUs'].sum()  # Sum of all CPUs used
-        total_mem = group['MEM(G)'].sum()  # Sum of all memory used
-        total_time = group['TIME(hr)'].sum()
-        total_storage = group['SIZE(MB)'].sum() / 1024  # Convert to GB
+    totals = df.groupby(PIPELINE_KEY, observed=True, dropna=False).agg(
+        n_groups=('Group', 'nunique'),
+        n_steps=('Group', 'size'),
+        total_cpu=('CPUs', 'sum'),  # Sum of all CPUs used
+        total_mem_gb=('MEM(G)', 'sum'),  # Sum of all memory used
+        total_time_hr=('TIME(hr)', 'sum'),
+        total_storage_mb=('SIZE(MB)', 'sum'),
+        total_cost_usd=('total_cost_usd', 'sum'),
+        compute_cost_usd=('compute_cost_usd', 'sum'),
+        storage_cost_usd=('storage_cost_usd', 'sum'),
+    )
+
+    # Group breakdown of every pipeline
+    groups_breakdown = {pipeline_key(*key): {} for key in totals.index}
+    breakdown = df.dropna(subset=['Group']).groupby(PIPELINE_KEY + ['Group'], observed=True, dropna=False).agg({
+        'Step': 'count',
+        'total_cost_usd': 'sum',
+        'TIME(hr)': 'sum',
+    })
+    group_tools = _distinct_values(df, PIPELINE_KEY + ['Group'], 'tools')
+    for key, info in breakdown.to_dict('index').items():
+        job, analysis_name, group = pipeline_key(*key)
+        info['tools'] = ', '.join(group_tools.get((job, analysis_name, group), []))
+        groups_breakdown[(job, analysis_name)][group] = info
+
+    tools = _distinct_values(df, PIPELINE_KEY, 'tools')
+    pipeline_names = _distinct_values(df, PIPELINE_KEY, 'Pipeline Name')
+    platforms = _distinct_values(df, PIPELINE_KEY, 'Platfom')
+    versions = _distinct_values(df, PIPELINE_KEY, 'Pipeline Version')
+    with timed('schedule'):
+        schedules = schedule_pipelines(df, PIPELINE_KEY, max_vcpus, dependency)
+    schedules = {pipeline_key(*key): schedule for key, schedule in schedules.items()}
 
-        # Cost summary
-        total_cost = group['total_cost_usd'].sum()
-        compute_cost = group['compute_cost_usd'].sum()
-        storage_cost = group['storage_cost_usd'].sum()
+    pipeline_summary = []
+    keys = [pipeline_key(*key) for key in totals.index]
+    for key, row in zip(keys, totals.itertuples(index=False)):
+        tools_list = tools.get(key, [])
+        n_tools = len(tools_list)
 
-        # Group breakdown
-        groups_info = group.groupby('Group').agg({
-            'Step': 'count',
-            'total_cost_usd': 'sum',
-            'TIME(hr)': 'sum',
-        }).to_dict('index')
+        # Pipeline names, platforms and versions may be multiple
+        names = pipeline_names[key]
+        pipeline_name = ', '.join(names) if len(names) > 1 else names[0]
+        platform_str = ', '.join(sorted(set(platforms.get(key, []))))
+        version = versions[key][0] if key in versions else 'N/A'
 
+        total_time = row.total_time_hr
         pipeline_summary.append({
-            '직무(업무명)': job,
-            'Analysis_name': analysis_name,
+            '직무(업무명)': key[0],
+            'Analysis_name': key[1],
             'Platform': platform_str,
             'Pipeline Name': pipeline_name,
             'Pipeline Version': version,
-            'n_groups': n_groups,
-            'n_steps': n_steps,
+            'n_groups': row.n_groups,
+            'n_steps': row.n_steps,
             'n_tools': n_tools,
             'tools_list': ', '.join(tools_list[:10]) + ('...' if n_tools > 10 else ''),
-            'total_cpu': total_cpu,
-            'total_mem_gb': total_mem,
+            'total_cpu': row.total_cpu,
+            'total_mem_gb': row.total_mem_gb,
             'total_time_hr': total_time,
-            'total_storage_gb': total_storage,
-            'total_cost_usd': total_cost,
-            'compute_cost_usd': compute_cost,
-            'storage_cost_usd': storage_cost,
-            'cost_per_hour': total_cost / total_time if total_time > 0 else 0,
-            'groups_breakdown': groups_info,
+            'total_storage_gb': row.total_storage_mb / 1024,  # Convert to GB
+            'total_cost_usd': row.total_cost_usd,
+            'compute_cost_usd': row.compute_cost_usd,
+            'storage_cost_usd': row.storage_cost_usd,
+            'cost_per_hour': row.total_cost_usd / total_time if total_time > 0 else 0,
+            **schedules[key],
+            'max_vcpus': max_vcpus,
+            'groups_breakdown': groups_breakdown[key],
         })
 
     pipeline_df = pd.DataFrame(pipeline_summary)
 
-    print(f"\n1. Total Pipelines Analyzed: {len(pipeline_df)}")
+    console.info(f"\n1. Total Pipelines Analyzed: {len(pipeline_df)}", pipelines=len(pipeline_df))
 
-    print("\n2. Pipeline Overview:")
-    overview = pipeline_df[['직무(업무명)', 'Analysis_name', 'Platform', 'n_groups', 'n_steps',
+    def overview():
+        table = pipeline_df[['직무(업무명)', 'Analysis_name', 'Platform', 'n_groups', 'n_steps',
                              'total_time_hr', 'total_cost_usd']].copy()
-    overview['total_cost_usd'] = overview['total_cost_usd'].round(2)
-    overview['total_time_hr'] = overview['total_time_hr'].round(2)
-    print(overview.to_string(index=False, max_colwidth=40))
+        table['total_cost_usd'] = table['total_cost_usd'].round(2)
+        table['total_time_hr'] = table['total_time_hr'].round(2)
+        return table
+
+    def schedule():
+        table = pipeline_df[['직무(업무명)', 'Analysis_name', 'total_time_hr', 'critical_path_hr',
+                             'makespan_hr', 'peak_vcpus', 'utilization']].copy()
+        table[['total_time_hr', 'critical_path_hr', 'makespan_hr']] = \
+            table[['total_time_hr', 'critical_path_hr', 'makespan_hr']].round(2)
+        table['utilization'] = (table['utilization'] * 100).round(1)
+        return table
+
+    def resources():
+        table = pipeline_df[['직무(업무명)', 'Analysis_name', 'total_cpu', 'total_mem_gb',
+                             'total_storage_gb']].copy()
+        table['total_storage_gb'] = table['total_storage_gb'].round(2)
+        return table
+
+    console.summary("\n2. Pipeline Overview:", overview, index=False, max_colwidth=40)
+    console.summary(f"\n3. Wall-clock Model (AWS Batch, max {max_vcpus} vCPUs):", schedule,
+                    index=False, max_colwidth=40)
+    console.summary("\n4. Resource Requirements by Pipeline:", resources, index=False, max_colwidth=40)
+
+    return pipeline_df
+
+def pipeline_report_filename(job, analysis_name, report_format='txt'):
+    """Build the *_report.{txt,md,json} file name for a pipeline"""
+    filename = f"{key_label(job)}_{key_label(analysis_name)}".replace(' ', '_').replace(',', '').replace('(', '').replace(')', '')
+    filename = filename.replace('/', '_')[:100]  # Limit length
+    return f"{filename}_report.{report_format}"
+
+def write_pipeline_report(pipeline, pipeline_data, report_file, report_format='txt'):
+    """Render and write the detailed cost report of a single pipeline"""
+    data = pipeline_report_data(pipeline, pipeline_data)
+    return write_report(report_file, render_pipeline_report(data, report_format))
 
-    print("\n3. Resource Requirements by Pipeline:")
-    resources = pipeline_df[['직무(업무명)', 'Analysis_name', 'total_cpu', 'total_mem_gb',
-                              'total_storage_gb']].copy()
-    resources['total_storage_gb'] = resources['total_storage_gb'].round(2)
-    print(resources.to_string(index=False, max_colwidth=40))
+def generate_detailed_reports(df, pipeline_df, team, jobs=1, report_format='txt'):
+    """
+    Generate detailed cost reports for each pipeline
+
+    With jobs > 1 the per-pipeline reports are rendered by a pool of worker
+    processes; file contents are identical to the serial run. report_format
+    is txt, md or json (see report_render.py).
+    """
+
+    console.banner(f"Step 4: Generating Detailed Cost Reports for Team {team}", leading_newline=True,
+                   team=team, stage='step4')
+
+    generate_pipeline_reports(df, pipeline_df, team, jobs=jobs, report_format=report_format)
+    generate_summary_reports(pipeline_df, team, report_format=report_format)
 
     return pipeline_df
 
-def generate_detailed_reports(df, pipeline_df, team):
-    """Generate detailed cost reports for each pipeline"""
+@timed('report_write')
+def generate_pipeline_reports(df, pipeline_df, team, jobs=1, report_format='txt'):
+    """Write the report file of every pipeline in pipeline_df"""
 
     # Setup team-specific reports directory
     TEAM_REPORTS_DIR = REPORTS_DIR / f"team{team}"
     TEAM_REPORTS_DIR.mkdir(exist_ok=True)
 
-    print("\n" + "=" * 80)
-    print(f"Step 4: Generating Detailed Cost Reports for Team {team}")
-    print("=" * 80)
-
-    # Group by pipeline
+    # Reorder rows once so every pipeline is a contiguous block (row order
+    # within a pipeline is kept); each report then gets a slice of it
+    positions = pipeline_positions(df)
+    blocks = df.take(np.concatenate(list(positions.values()))) if positions else df
+    bounds = {}
+    start = 0
+    for key, rows in positions.items():
+        bounds[key] = (start, start + len(rows))
+        start += len(rows)
+
+    report_tasks = []
     for idx, pipeline in pipeline_df.iterrows():
         job = pipeline['직무(업무명)']
         analysis_name = pipeline['Analysis_name']
 
-        # Filter data for this pipeline
-        pipeline_data = df[
-            (df['직무(업무명)'] == job) &
-            (df['Analysis_name'] == analysis_name)
-        ].copy()
+        start, stop = bounds.get(pipeline_key(job, analysis_name), (0, 0))
+        pipeline_data = blocks.iloc[start:stop]
 
         # Generate report filename
-        filename = f"{job}_{analysis_name}".replace(' ', '_').replace(',', '').replace('(', '').replace(')', '')
-        filename = filename.replace('/', '_')[:100]  # Limit length
-        report_file = TEAM_REPORTS_DIR / f"{filename}_report.txt"
-
-        # Create report
-        with open(report_file, 'w', encoding='utf-8') as f:
-            f.write("=" * 80 + "\n")
-            f.write(f"PIPELINE COST ANALYSIS REPORT\n")
-            f.write("=" * 80 + "\n\n")
-
-            f.write(f"직무 (Job): {job}\n")
-            f.write(f"Analysis Name: {analysis_name}\n")
-            f.write(f"Platform: {pipeline['Platform']}\n")
-            f.write(f"Pipeline: {pipeline['Pipeline Name']} v{pipeline['Pipeline Version']}\n")
-            f.write(f"\n")
-
-            # Overview
-            f.write("-" * 80 + "\n")
-            f.write("OVERVIEW\n")
-            f.write("-" * 80 + "\n")
-            f.write(f"Number of Groups: {pipeline['n_groups']}\n")
-            f.write(f"Number of Steps: {pipeline['n_steps']}\n")
-            f.write(f"Number of Tools: {pipeline['n_tools']}\n")
-            f.write(f"\n")
-
-            # Resource summary
-            f.write("-" * 80 + "\n")
-            f.write("RESOURCE REQUIREMENTS\n")
-            f.write("-" * 80 + "\n")
-            f.write(f"Total CPUs: {pipeline['total_cpu']:.0f}\n")
-            f.write(f"Total Memory: {pipeline['total_mem_gb']:.0f} GB\n")
-            f.write(f"Total Compute Time: {pipeline['total_time_hr']:.2f} hours\n")
-            f.write(f"Total Storage: {pipeline['total_storage_gb']:.2f} GB\n")
-            f.write(f"\n")
-
-            # Cost summary
-            f.write("-" * 80 + "\n")
-            f.write("COST SUMMARY\n")
-            f.write("-" * 80 + "\n")
-            f.write(f"Total Cost: ${pipeline['total_cost_usd']:.2f}\n")
-            f.write(f"  - Compute Cost: ${pipeline['compute_cost_usd']:.2f} ({pipeline['compute_cost_usd']/pipeline['total_cost_usd']*100:.1f}%)\n")
-            f.write(f"  - Storage Cost: ${pipeline['storage_cost_usd']:.2f} ({pipeline['storage_cost_usd']/pipeline['total_cost_usd']*100:.1f}%)\n")
-            f.write(f"Cost per Hour: ${pipeline['cost_per_hour']:.2f}\n")
-            f.write(f"\n")
-
-            # Group breakdown
-            f.write("-" * 80 + "\n")
-            f.write("COST BREAKDOWN BY GROUP\n")
-            f.write("-" * 80 + "\n")
-
-            group_summary = pipeline_data.groupby('Group').agg({
-                'Step': 'count',
-                'tools': lambda x: ', '.join(x.unique()),
-                'TIME(hr)': 'sum',
-                'total_cost_usd': 'sum',
-            }).reset_index()
-            group_summary.columns = ['Group', 'Steps', 'Tools', 'Time (hr)', 'Cost (USD)']
-            group_summary = group_summary.sort_values('Cost (USD)', ascending=False)
-
-            for _, row in group_summary.iterrows():
-                f.write(f"\n{row['Group']}:\n")
-                f.write(f"  Steps: {row['Steps']}\n")
-                f.write(f"  Time: {row['Time (hr)']:.2f} hours\n")
-                f.write(f"  Cost: ${row['Cost (USD)']:.2f}\n")
-                f.write(f"  Tools: {row['Tools']}\n")
-
-            # Detailed step breakdown
-            f.write("\n" + "-" * 80 + "\n")
-            f.write("DETAILED STEP-BY-STEP BREAKDOWN\n")
-            f.write("-" * 80 + "\n\n")
-
-            for _, row in pipeline_data.iterrows():
-                f.write(f"Group: {row['Group']}\n")
-                f.write(f"Step: {row['Step']}\n")
-                f.write(f"Tool: {row['tools']} v{row['version']}\n")
-                f.write(f"Resources: {row['CPUs']:.0f} CPUs, {row['MEM(G)']:.0f} GB RAM, "
-                       f"{row['SIZE(MB)']:.0f} MB storage\n")
-                f.write(f"Runtime: {row['TIME(hr)']:.2f} hours × {row['nTask(병렬)']:.0f} parallel tasks\n")
-                f.write(f"Instance: {row['instance_type']} @ ${row['instance_hourly_rate']:.4f}/hr\n")
-                f.write(f"Cost: ${row['total_cost_usd']:.4f} "
-                       f"(compute: ${row['compute_cost_usd']:.4f}, storage: ${row['storage_cost_usd']:.4f})\n")
-                f.write(f"\n")
-
-            f.write("=" * 80 + "\n")
-            f.write("END OF REPORT\n")
-            f.write("=" * 80 + "\n")
-
-        print(f"   ✓ Generated: {report_file.name}")
+        report_file = TEAM_REPORTS_DIR / pipeline_report_filename(job, analysis_name, report_format)
+        report_tasks.append((pipeline, pipeline_data, report_file, report_format))
+
+    if jobs > 1 and len(report_tasks) > 1:
+        workers = min(jobs, len(report_tasks))
+        chunksize = max(1, len(report_tasks) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            report_files = list(executor.map(write_pipeline_report, *zip(*report_tasks), chunksize=chunksize))
+    else:
+        report_files = [write_pipeline_report(*task) for task in report_tasks]
+
+    console.summary('', lambda: [report_file.name for report_file in report_files],
+                    render=lambda names: "\n".join(f"   ✓ Generated: {name}" for name in names), name='Generated reports')
+
+    return report_files
+
+@timed('summary_write')
+def generate_summary_reports(pipeline_df, team, report_format='txt'):
+    """Write 00_SUMMARY_ALL_PIPELINES and pipeline_summary.csv from the pipeline summaries"""
+
+    TEAM_REPORTS_DIR = REPORTS_DIR / f"team{team}"
+    TEAM_REPORTS_DIR.mkdir(exist_ok=True)
 
     # Generate summary report
-    summary_file = TEAM_REPORTS_DIR / "00_SUMMARY_ALL_PIPELINES.txt"
-    with open(summary_file, 'w', encoding='utf-8') as f:
-        f.write("=" * 80 + "\n")
-        f.write("BIOINFORMATICS PIPELINE COST SUMMARY\n")
-        f.write(f"Team {team} Analysis - AWS Batch Cost Analysis\n")
-        f.write("=" * 80 + "\n\n")
-
-        f.write("OVERVIEW\n")
-        f.write("-" * 80 + "\n")
-        f.write(f"Total Pipelines: {len(pipeline_df)}\n")
-        f.write(f"Total Groups: {pipeline_df['n_groups'].sum()}\n")
-        f.write(f"Total Steps: {pipeline_df['n_steps'].sum()}\n")
-        f.write(f"Total Cost: ${pipeline_df['total_cost_usd'].sum():.2f}\n")
-        f.write(f"  - Compute Cost: ${pipeline_df['compute_cost_usd'].sum():.2f}\n")
-        f.write(f"  - Storage Cost: ${pipeline_df['storage_cost_usd'].sum():.2f}\n")
-        f.write(f"Total Compute Time: {pipeline_df['total_time_hr'].sum():.2f} hours\n")
-        f.write(f"Total Storage: {pipeline_df['total_storage_gb'].sum():.2f} GB\n")
-        f.write(f"Total CPUs: {int(pipeline_df['total_cpu'].sum())}\n")
-        f.write(f"Total Memory: {int(pipeline_df['total_mem_gb'].sum())} GB\n")
-        f.write(f"\n")
-
-        f.write("COST BY JOB TYPE\n")
-        f.write("-" * 80 + "\n")
-        job_summary = pipeline_df.groupby('직무(업무명)').agg({
-            'total_cost_usd': 'sum',
-            'compute_cost_usd': 'sum',
-            'storage_cost_usd': 'sum',
-            'n_groups': 'sum',
-            'n_steps': 'sum',
-            'total_time_hr': 'sum',
-            'total_storage_gb': 'sum',
-        }).round(2)
-        f.write(job_summary.to_string())
-        f.write("\n\n")
-
-        f.write("ALL PIPELINES RANKED BY COST\n")
-        f.write("-" * 80 + "\n")
-        f.write("Rank | Job | Analysis Name | Cost (USD) | Time (hr) | Groups | Steps | Total CPU | Total Mem (GB) | Storage (GB)\n")
-        f.write("-" * 80 + "\n")
-        ranked = pipeline_df.sort_values('total_cost_usd', ascending=False)
-        for idx, (_, row) in enumerate(ranked.iterrows(), 1):
-            job = row['직무(업무명)'][:10]
-            analysis_name = row['Analysis_name'][:25]
-            cost = row['total_cost_usd']
-            time_hr = row['total_time_hr']
-            n_groups = int(row['n_groups'])
-            n_steps = int(row['n_steps'])
-            total_cpu = int(row['total_cpu'])
-            total_mem = int(row['total_mem_gb'])
-            storage = row['total_storage_gb']
-            f.write(f"{idx:4} | {job:10} | {analysis_name:25} | ${cost:9.2f} | {time_hr:9.1f} | {n_groups:6} | {n_steps:5} | {total_cpu:9} | {total_mem:14} | {storage:11.1f}\n")
-        f.write("\n")
-
-        f.write("DETAILED PIPELINE INFORMATION\n")
-        f.write("=" * 80 + "\n\n")
-
-        for idx, row in ranked.iterrows():
-            f.write(f"[{ranked.index.get_loc(idx) + 1}] {row['직무(업무명)']} - {row['Analysis_name']}\n")
-            f.write("-" * 80 + "\n")
-            f.write(f"Pipeline: {row['Pipeline Name']} v{row['Pipeline Version']}\n")
-            f.write(f"Platform: {row['Platform']}\n")
-            f.write(f"\n")
-            f.write(f"Structure:\n")
-            f.write(f"  Groups: {int(row['n_groups'])}\n")
-            f.write(f"  Steps:  {int(row['n_steps'])}\n")
-            f.write(f"  Tools:  {int(row['n_tools'])}\n")
-            f.write(f"\n")
-            f.write(f"Resources:\n")
-            f.write(f"  Total CPU:      {int(row['total_cpu'])} cores\n")
-            f.write(f"  Total Memory:   {int(row['total_mem_gb'])} GB\n")
-            f.write(f"  Total Time:     {row['total_time_hr']:.1f} hours\n")
-            f.write(f"  Total Storage:  {row['total_storage_gb']:.1f} GB\n")
-            f.write(f"\n")
-            f.write(f"Cost:\n")
-            f.write(f"  Total:   ${row['total_cost_usd']:.2f}\n")
-            f.write(f"  Compute: ${row['compute_cost_usd']:.2f} ({row['compute_cost_usd']/row['total_cost_usd']*100:.1f}%)\n")
-            f.write(f"  Storage: ${row['storage_cost_usd']:.2f} ({row['storage_cost_usd']/row['total_cost_usd']*100:.1f}%)\n")
-            f.write(f"  Per Hour: ${row['cost_per_hour']:.2f}/hr\n")
-            f.write(f"\n")
-
-            # Group breakdown
-            if row['groups_breakdown']:
-                f.write(f"Group Breakdown:\n")
-                groups_sorted = sorted(row['groups_breakdown'].items(),
-                                      key=lambda x: x[1]['total_cost_usd'],
-                                      reverse=True)
-                for group_name, group_info in groups_sorted:
-                    f.write(f"  {group_name}:\n")
-                    f.write(f"    Steps: {group_info['Step']}, ")
-                    f.write(f"Time: {group_info['TIME(hr)']:.1f}h, ")
-                    f.write(f"Cost: ${group_info['total_cost_usd']:.2f}\n")
-
-            f.write("\n")
-
-        f.write("=" * 80 + "\n")
-
-    print(f"\n   ✓ Generated summary: {summary_file.name}")
+    summary_file = TEAM_REPORTS_DIR / f"00_SUMMARY_ALL_PIPELINES.{report_format}"
+    data = summary_report_data(pipeline_df, team)
+    write_report(summary_file, render_summary_report(data, report_format))
+
+    console.info(f"\n   ✓ Generated summary: {summary_file.name}", path=summary_file)
 
     # Save pipeline summary as CSV
     pipeline_csv = TEAM_REPORTS_DIR / "pipeline_summary.csv"
     pipeline_df.drop('groups_breakdown', axis=1).to_csv(pipeline_csv, index=False, encoding='utf-8')
-    print(f"   ✓ Saved pipeline summary: {pipeline_csv.name}")
-
-    return pipeline_df
-
-def main(team):
+    console.info(f"   ✓ Saved pipeline summary: {pipeline_csv.name}", path=pipeline_csv)
+
+@timed('query_store')
+def load_query_store(path, team, pipeline_df):
+    """Replace the pipeline summaries of a team in the query store"""
+    store = QueryStore(path)
+    try:
+        n_rows = store.load_pipelines(team, pipeline_df)
+    finally:
+        store.close()
+    console.info(f"   ✓ Loaded {n_rows} pipelines into query store: {path}", rows=n_rows, path=path)
+
+@timed('step3')
+def main(team, df=None, jobs=1, fmt='csv', report_format='txt', max_vcpus=DEFAULT_MAX_VCPUS, query_store=None,
+         dependency=DEFAULT_DEPENDENCY):
+    """
+    Analyze pipelines and write reports for a team.
+
+    df is the costed data from stage 2; when omitted only the columns the
+    reports need are loaded from analysis_with_costs in format fmt (csv,
+    parquet or feather). jobs sets the number of report worker processes and
+    report_format the format of the report files (txt, md or json).
+    max_vcpus is the compute environment size used for the wall-clock model
+    and dependency its step dependency rule (see scheduling.py).
+    query_store is the path of the cross-team query store to load the
+    pipeline summaries into.
+    """
     # Setup file paths based on team number
     TEAM_DIR = DATA_DIR / f"team{team}"
     TEAM_REPORTS_DIR = REPORTS_DIR / f"team{team}"
-    COSTED_FILE = TEAM_DIR / "analysis_with_costs.csv"
+    COSTED_FILE = intermediate_path(TEAM_DIR, "analysis_with_costs", fmt)
 
-    print(f"Loading cost data from: {COSTED_FILE}\n")
-    df = pd.read_csv(COSTED_FILE, encoding='utf-8')
+    if df is None:
+        console.info(f"Loading cost data from: {COSTED_FILE}\n")
+        with timed('read_intermediate'):
+            df = read_intermediate(COSTED_FILE, fmt, columns=ANALYSIS_COLUMNS)
 
     # Analyze pipeline structure
-    pipeline_df = analyze_pipeline_structure(df)
+    pipeline_df = analyze_pipeline_structure(df, max_vcpus=max_vcpus, dependency=dependency)
 
     # Generate detailed reports
-    generate_detailed_reports(df, pipeline_df, team)
+    generate_detailed_reports(df, pipeline_df, team, jobs=jobs, report_format=report_format)
+
+    if query_store:
+        load_query_store(query_store, team, pipeline_df)
 
-    print("\n" + "=" * 80)
-    print("Analysis Complete!")
-    print("=" * 80)
-    print(f"\nReports saved to: {TEAM_REPORTS_DIR}")
-    print("\nKey files:")
-    print("  - 00_SUMMARY_ALL_PIPELINES.txt: Overall summary")
-    print("  - pipeline_summary.csv: Pipeline data in CSV format")
-    print("  - *_report.txt: Detailed reports for each pipeline")
+    console.banner("Analysis Complete!", leading_newline=True, team=team)
+    console.info(f"\nReports saved to: {TEAM_REPORTS_DIR}", path=TEAM_REPORTS_DIR)
+    console.info("\nKey files:")
+    console.info(f"  - 00_SUMMARY_ALL_PIPELINES.{report_format}: Overall summary")
+    console.info("  - pipeline_summary.csv: Pipeline data in CSV format")
+    console.info(f"  - *_report.{report_format}: Detailed reports for each pipeline")
 
     return df, pipeline_df
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Analyze pipelines and generate reports for a team')
     parser.add_argument('team', type=int, help='Team number (1, 2, or 3)')
+    parser.add_argument('--jobs', type=int, default=1, help='Worker processes for report generation (default: 1)')
+    parser.add_argument('--format', choices=FORMATS, default='csv',
+                        help='Format of the costed data file (default: csv)')
+    parser.add_argument('--report-format', choices=REPORT_FORMATS, default='txt',
+                        help='Format of the report files (default: txt)')
+    parser.add_argument('--max-vcpus', type=int, default=DEFAULT_MAX_VCPUS,
+                        help=f'vCPUs of the AWS Batch compute environment for the wall-clock model (default: {DEFAULT_MAX_VCPUS})')
+    parser.add_argument('--dependency', choices=DEPENDENCY_RULES, default=DEFAULT_DEPENDENCY,
+                        help='Step dependencies of the wall-clock model: chain (steps of a group in sheet order, '
+                             'groups in parallel; default) or layered (steps of a group together, groups in sheet order)')
+    parser.add_argument('--query-store', nargs='?', const=DEFAULT_QUERY_STORE, default=None, metavar='PATH',
+                        help=f'Also load the pipeline summaries into the cross-team query store (default path: {DEFAULT_QUERY_STORE.relative_to(PROJECT_ROOT)})')
+    add_profile_arguments(parser)
+    console.add_log_arguments(parser)
     args = parser.parse_args()
+    console.configure_from_args(args)
 
-    df, pipeline_df = main(args.team)
+    with profiled(args.team, 'step3', **profile_options(args)):
+        df, pipeline_df = main(args.team, jobs=args.jobs, fmt=args.format, report_format=args.report_format,
+                               max_vcpus=args.max_vcpus, query_store=args.query_store,
+                               dependency=args.dependency)
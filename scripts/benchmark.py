@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Benchmark the three pipeline stages on synthetic catalogues
+- For every size, a synthetic analysis_raw.csv is generated (see
+  synthetic_catalogue.py) in a scratch directory; nothing under data/ or
+  reports/ is touched and no network access is needed
+- Stage functions timed: process (01 main: read, ffill, numeric cleaning),
+  costs (02 calculate_costs), analyze (03 analyze_pipeline_structure) and
+  reports (03 generate_detailed_reports)
+- Each measurement runs in a fresh process, so peak RSS belongs to that
+  stage alone; inputs come from the previous stage's pickled output
+- With --quiet the stages run with console output off (see console.py), so
+  the console summaries are not built; otherwise their text goes to /dev/null
+- Results: seconds, rows per second and peak RSS per (rows, stage), printed
+  as a table and optionally saved as JSON for comparison across commits
+"""
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from synthetic_catalogue import DEFAULT_STEPS_PER_PIPELINE, write_catalogue
+
+SCRIPTS_DIR = Path(__file__).parent
+
+STAGES = ['process', 'costs', 'analyze', 'reports']
+DEFAULT_ROWS = [1_000, 10_000, 100_000]
+
+# Team number used inside the scratch directory
+BENCH_TEAM = 0
+
+# Pickled output of each stage, input of the next one
+STAGE_OUTPUTS = {'process': 'processed.pkl', 'costs': 'costed.pkl', 'analyze': 'pipelines.pkl'}
+
+def _rss_mb():
+    """Current resident set size of this process"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+
+def _max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def measure_stage(workdir, stage, quiet=False):
+    """Run one stage function in this (fresh) process; returns its time and memory"""
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    # Deprecation warnings would repeat once per size and stage
+    warnings.simplefilter('ignore', FutureWarning)
+    process_data = importlib.import_module('01_process_data')
+    calculate_aws_costs = importlib.import_module('02_calculate_aws_costs')
+    analyze_pipelines = importlib.import_module('03_analyze_pipelines')
+    console = importlib.import_module('console')
+    console.configure(quiet=quiet)
+
+    # Point the stages at the scratch directory
+    workdir = Path(workdir)
+    process_data.DATA_DIR = calculate_aws_costs.DATA_DIR = analyze_pipelines.DATA_DIR = workdir / "data"
+    analyze_pipelines.REPORTS_DIR = workdir / "reports"
+
+    df = pd.read_pickle(workdir / STAGE_OUTPUTS['process']) if stage == 'costs' else None
+    if stage in ('analyze', 'reports'):
+        df = pd.read_pickle(workdir / STAGE_OUTPUTS['costs'])
+    pipeline_df = pd.read_pickle(workdir / STAGE_OUTPUTS['analyze']) if stage == 'reports' else None
+
+    input_rss = _rss_mb()
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        start = time.perf_counter()
+        if stage == 'process':
+            result = process_data.main(BENCH_TEAM, save=False)
+        elif stage == 'costs':
+            result = calculate_aws_costs.calculate_costs(df, BENCH_TEAM)
+        elif stage == 'analyze':
+            result = analyze_pipelines.analyze_pipeline_structure(df)
+        else:
+            result = analyze_pipelines.generate_detailed_reports(df, pipeline_df, BENCH_TEAM)
+        seconds = time.perf_counter() - start
+    max_rss = _max_rss_mb()
+
+    if stage in STAGE_OUTPUTS:
+        result.to_pickle(workdir / STAGE_OUTPUTS[stage])
+    return {'seconds': seconds, 'max_rss_mb': max_rss, 'input_rss_mb': input_rss}
+
+def benchmark_size(rows, workdir, stages=STAGES, repeat=1, seed=0, steps_per_pipeline=DEFAULT_STEPS_PER_PIPELINE,
+                   quiet=False):
+    """Generate a catalogue of rows rows and measure every stage on it (best of repeat runs)"""
+    workdir = Path(workdir)
+    team_dir = workdir / "data" / f"team{BENCH_TEAM}"
+    team_dir.mkdir(parents=True, exist_ok=True)
+    (workdir / "reports").mkdir(exist_ok=True)
+
+    start = time.perf_counter()
+    n_pipelines = write_catalogue(team_dir / "analysis_raw.csv", rows, seed=seed,
+                                  steps_per_pipeline=steps_per_pipeline)
+    print(f"   - {rows} rows, {n_pipelines} pipelines generated in {time.perf_counter() - start:.1f}s")
+
+    # Later stages need the earlier outputs even when they are not measured
+    needed = STAGES[:max(STAGES.index(stage) for stage in stages) + 1]
+    results = []
+    context = multiprocessing.get_context('spawn')
+    for stage in needed:
+        runs = []
+        for _ in range(repeat if stage in stages else 1):
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                runs.append(executor.submit(measure_stage, str(workdir), stage, quiet).result())
+        if stage not in stages:
+            continue
+        best = min(runs, key=lambda run: run['seconds'])
+        results.append({
+            'rows': rows,
+            'pipelines': n_pipelines,
+            'stage': stage,
+            'seconds': round(best['seconds'], 6),
+            'rows_per_second': round(rows / best['seconds'], 1) if best['seconds'] > 0 else None,
+            'max_rss_mb': round(best['max_rss_mb'], 1),
+            'input_rss_mb': round(best['input_rss_mb'], 1),
+            'runs': [round(run['seconds'], 6) for run in runs],
+        })
+        print(f"     {stage:<8} {best['seconds']:10.3f}s  {rows / max(best['seconds'], 1e-9):14,.0f} rows/s  "
+              f"peak RSS {best['max_rss_mb']:8.1f} MB")
+    return results
+
+def main(sizes=DEFAULT_ROWS, stages=STAGES, repeat=1, seed=0, output=None, workdir=None,
+         steps_per_pipeline=DEFAULT_STEPS_PER_PIPELINE, quiet=False):
+    """Benchmark every stage at every size; returns the results as a DataFrame"""
+    print("=" * 80)
+    print(f"Benchmark: {', '.join(stages)} at {', '.join(f'{n:,}' for n in sizes)} rows (best of {repeat}"
+          f"{', quiet' if quiet else ''})")
+    print("=" * 80)
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='pipeline-bench-') as scratch:
+        for rows in sizes:
+            size_dir = Path(workdir or scratch) / f"rows_{rows}"
+            results.extend(benchmark_size(rows, size_dir, stages=stages, repeat=repeat, seed=seed,
+                                          steps_per_pipeline=steps_per_pipeline, quiet=quiet))
+
+    table = pd.DataFrame(results)
+    print("\nResults:")
+    print(table.drop(columns='runs').to_string(index=False))
+
+    if output:
+        report = {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': seed,
+            'repeat': repeat,
+            'quiet': quiet,
+            'results': results,
+        }
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n✓ Saved benchmark results: {output}")
+
+    return table
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the pipeline stages on synthetic catalogues')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, metavar='N',
+                        help='Catalogue sizes to benchmark (default: 1000 10000 100000; up to 10000000)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES,
+                        help='Stages to measure (default: all)')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per measurement; the fastest is kept (default: 1)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic catalogues (default: 0)')
+    parser.add_argument('--steps-per-pipeline', type=int, default=DEFAULT_STEPS_PER_PIPELINE,
+                        help=f'Mean steps per synthetic pipeline (default: {DEFAULT_STEPS_PER_PIPELINE})')
+    parser.add_argument('--output', default=None, help='Also save the results as JSON to this path')
+    parser.add_argument('--workdir', default=None,
+                        help='Keep the generated catalogues and outputs here instead of a temporary directory')
+    parser.add_argument('--quiet', action='store_true',
+                        help='Run the stages with console output off (summaries are not built)')
+    args = parser.parse_args()
+
+    main(args.rows, stages=args.stages, repeat=args.repeat, seed=args.seed, output=args.output,
+         workdir=args.workdir, steps_per_pipeline=args.steps_per_pipeline, quiet=args.quiet)
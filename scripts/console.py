@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Console output of the stage scripts
+- Progress lines go through the 'pipeline_price' logger: info() for banners
+  and progress, warning() for problems
+- summary(title, build) prints a table; build() is only called when the
+  output is wanted, so quiet runs skip computing and rendering summaries
+- Modes (--quiet, --log-format): text (default, plain lines on stdout),
+  quiet (warnings only) and json (one JSON event per line, summaries as records)
+- Embedded use (use_logging): nothing is printed; warnings propagate to the
+  standard logging setup of the host process
+"""
+
+import json
+import logging
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+LOG_FORMATS = ('text', 'json')
+
+logger = logging.getLogger('pipeline_price')
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to the current sys.stdout, so redirect_stdout and pipes keep working"""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+def _json_default(value):
+    """numpy scalars as Python numbers, paths and the rest as text"""
+    return value.item() if hasattr(value, 'item') else str(value)
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record):
+        event = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'message': record.getMessage().strip(),
+        }
+        event.update(getattr(record, 'fields', {}))
+        return json.dumps(event, ensure_ascii=False, default=_json_default)
+
+_format = 'text'
+
+def configure(quiet=False, log_format='text'):
+    """Set the output mode of this process"""
+    global _format
+    _format = log_format
+    handler = _StdoutHandler()
+    handler.setFormatter(_JsonFormatter() if log_format == 'json' else logging.Formatter('%(message)s'))
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.WARNING if quiet else logging.INFO)
+
+def use_logging():
+    """Print nothing: warnings propagate to the host's logging handlers (none set up: dropped)"""
+    global _format
+    _format = 'text'
+    logger.handlers = [logging.NullHandler()]
+    logger.propagate = True
+    logger.setLevel(logging.WARNING)
+
+def settings():
+    """configure() arguments of the current mode, for worker process initializers"""
+    return not enabled(), _format
+
+def enabled():
+    """Whether info output (progress and summaries) is shown"""
+    return logger.isEnabledFor(logging.INFO)
+
+def info(message='', **fields):
+    logger.info(message, extra={'fields': fields})
+
+def warning(message, **fields):
+    logger.warning(message, extra={'fields': fields})
+
+def banner(title, leading_newline=False, **fields):
+    """A title between two rules; a single event in json mode"""
+    if not enabled():
+        return
+    if _format == 'json':
+        info(title, event='banner', **fields)
+        return
+    info(("\n" if leading_newline else "") + "=" * 80)
+    info(title)
+    info("=" * 80)
+
+def _records(table):
+    """JSON-friendly form of a summary: list of row dicts, a dict or text"""
+    if isinstance(table, pd.Series):
+        table = table.to_frame(table.name or 'value')
+    if isinstance(table, pd.DataFrame):
+        table = table.reset_index() if not isinstance(table.index, pd.RangeIndex) else table
+        table.columns = ['_'.join(str(level) for level in col if level != '') if isinstance(col, tuple) else str(col)
+                         for col in table.columns]
+        return table.to_dict('records')
+    return table
+
+def summary(title, build, render=None, name=None, **to_string_kwargs):
+    """
+    Show a summary table under title (no title line when empty).
+
+    build() returns a DataFrame, Series, dict or text and is only called when
+    info output is enabled. render(table) gives the text form; by default
+    DataFrames and Series use to_string(**to_string_kwargs). name labels
+    the JSON event of an untitled table.
+    """
+    if not enabled():
+        return
+    table = build()
+    if _format == 'json':
+        info(title or name or '', event='summary', data=_records(table))
+        return
+    if title:
+        info(title)
+    if render is not None:
+        text = render(table)
+    elif isinstance(table, (pd.DataFrame, pd.Series)):
+        text = table.to_string(**to_string_kwargs)
+    else:
+        text = str(table)
+    if text:
+        info(text)
+
+def add_log_arguments(parser):
+    """The --quiet and --log-format options shared by the scripts"""
+    parser.add_argument('--quiet', action='store_true',
+                        help='Only print warnings; summaries are not computed')
+    parser.add_argument('--log-format', choices=LOG_FORMATS, default='text',
+                        help='Console output as plain text (default) or one JSON event per line')
+
+def configure_from_args(args):
+    configure(quiet=args.quiet, log_format=args.log_format)
+
+# Plain text on stdout unless a script configures otherwise
+configure()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of costed steps for stage 2
+- Key: the pricing catalogue hash and CACHE_VERSION plus the resource
+  signature of a step (CPUs, MEM(G), TIME(hr), nTask(병렬), SIZE(MB)); value:
+  the instance choice and costs from calculate_costs
+- Stored in SQLite (data/cost_cache.sqlite by default) so that repeat runs and
+  other teams reuse the rows already priced
+- A scenario whose catalogue changed drops its old entries; the least recently
+  used entries are evicted beyond max_entries
+"""
+
+import sqlite3
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from incremental import pricing_fingerprint
+
+SIGNATURE_COLUMNS = ['CPUs', 'MEM(G)', 'TIME(hr)', 'nTask(병렬)', 'SIZE(MB)']
+CACHED_COLUMNS = ['instance_type', 'instance_vcpu', 'instance_hourly_rate',
+                  'compute_cost_usd', 'storage_cost_usd', 'total_cost_usd']
+
+DEFAULT_MAX_ENTRIES = 100_000
+
+# Part of the cache key; bump when price_steps or the instance selection changes its results
+CACHE_VERSION = 1
+
+# SQLite limits the number of bound parameters per statement
+LOOKUP_BATCH = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS steps (
+    catalogue TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    instance_type TEXT,
+    instance_vcpu REAL,
+    instance_hourly_rate REAL,
+    compute_cost_usd REAL,
+    storage_cost_usd REAL,
+    total_cost_usd REAL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (catalogue, signature)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS steps_last_used ON steps (last_used);
+CREATE TABLE IF NOT EXISTS catalogues (
+    name TEXT PRIMARY KEY,
+    hash TEXT NOT NULL
+);
+"""
+
+def step_signatures(df):
+    """Signature string of every row; missing values are spelled 'nan'"""
+    values = df[SIGNATURE_COLUMNS].astype(float)
+    signature = values.iloc[:, 0].astype(str)
+    for col in SIGNATURE_COLUMNS[1:]:
+        signature = signature + '|' + values[col].astype(str)
+    return signature.to_numpy(dtype=object)
+
+class CostCache:
+    """SQLite-backed memo of price_steps results, shared by all teams and runs"""
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        # Teams running in parallel share the file; wait for their writes
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.executescript(SCHEMA)
+
+    def catalogue_key(self, pricing):
+        """Hash of a scenario's prices and CACHE_VERSION; entries of an older version of either are dropped"""
+        key = f"v{CACHE_VERSION}-{pricing_fingerprint(pricing['ec2'], pricing['ebs_price_per_gb_hour'])}"
+        row = self.conn.execute("SELECT hash FROM catalogues WHERE name = ?", (pricing['name'],)).fetchone()
+        if row is None or row[0] != key:
+            with self.conn:
+                if row is not None and not self.conn.execute(
+                        "SELECT 1 FROM catalogues WHERE hash = ? AND name != ?", (row[0], pricing['name'])).fetchone():
+                    self.conn.execute("DELETE FROM steps WHERE catalogue = ?", (row[0],))
+                self.conn.execute("INSERT OR REPLACE INTO catalogues (name, hash) VALUES (?, ?)",
+                                  (pricing['name'], key))
+        return key
+
+    def _lookup(self, catalogue, signatures):
+        found = {}
+        for start in range(0, len(signatures), LOOKUP_BATCH):
+            batch = list(signatures[start:start + LOOKUP_BATCH])
+            rows = self.conn.execute(
+                f"SELECT signature, {', '.join(CACHED_COLUMNS)} FROM steps "
+                f"WHERE catalogue = ? AND signature IN ({', '.join('?' * len(batch))})",
+                [catalogue] + batch)
+            for signature, *values in rows:
+                found[signature] = values
+        return found
+
+    def price(self, df, pricing, pricer):
+        """
+        Costs of every row of df under pricing, as pricer(df, pricing) would return.
+
+        Only one row per distinct signature missing from the cache is passed to
+        pricer; the results are stored, and all hits get their last-used time
+        refreshed.
+        """
+        catalogue = self.catalogue_key(pricing)
+        codes, signatures = pd.factorize(step_signatures(df))
+        _, first_rows = np.unique(codes, return_index=True)
+
+        found = self._lookup(catalogue, signatures)
+        missing = np.array([s not in found for s in signatures], dtype=bool)
+        self.hits += int((~missing).sum())
+        self.misses += int(missing.sum())
+
+        # Per-signature columns, filled from the cache and from the pricer
+        columns = {col: np.empty(len(signatures), dtype=object if col == 'instance_type' else float)
+                   for col in CACHED_COLUMNS}
+        for i in np.flatnonzero(~missing):
+            for col, value in zip(CACHED_COLUMNS, found[signatures[i]]):
+                columns[col][i] = np.nan if value is None else value
+
+        now = time.time()
+        if missing.any():
+            computed = pricer(df.iloc[first_rows[missing]], pricing)
+            for col in CACHED_COLUMNS:
+                columns[col][missing] = computed[col]
+            records = [(catalogue, signatures[i],
+                        *(None if pd.isna(columns[col][i]) else columns[col][i] for col in CACHED_COLUMNS), now)
+                       for i in np.flatnonzero(missing)]
+            with self.conn:
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO steps (catalogue, signature, {', '.join(CACHED_COLUMNS)}, last_used) "
+                    f"VALUES ({', '.join('?' * (len(CACHED_COLUMNS) + 3))})", records)
+
+        with self.conn:
+            self.conn.executemany("UPDATE steps SET last_used = ? WHERE catalogue = ? AND signature = ?",
+                                  [(now, catalogue, signatures[i]) for i in np.flatnonzero(~missing)])
+            self.evict()
+
+        costs = {col: values[codes] for col, values in columns.items()}
+        # Same vCPU dtype rule as price_steps: integers unless a row has no instance
+        if not np.isnan(costs['instance_vcpu']).any():
+            costs['instance_vcpu'] = costs['instance_vcpu'].astype(np.int64)
+        return costs
+
+    def evict(self):
+        """Drop the least recently used entries beyond max_entries"""
+        count = self.conn.execute("SELECT COUNT(*) FROM steps").fetchone()[0]
+        if count > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM steps WHERE (catalogue, signature) IN "
+                "(SELECT catalogue, signature FROM steps ORDER BY last_used LIMIT ?)",
+                (count - self.max_entries,))
+
+    def close(self):
+        self.conn.close()
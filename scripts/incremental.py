@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Content-hash manifest for incremental runs
+- One hash per (직무(업무명), Analysis_name) pipeline block of the processed data
+- Cached per-pipeline summaries (one pipeline_df row each) so the team summary
+  and pipeline_summary.csv can be rebuilt without re-analyzing clean pipelines
+- Stored per team in data/team{N}/pipeline_manifest.json
+"""
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+MANIFEST_NAME = "pipeline_manifest.json"
+MANIFEST_VERSION = 1
+
+PIPELINE_COLUMNS = ['직무(업무명)', 'Analysis_name']
+COST_COLUMNS = ['instance_type', 'instance_vcpu', 'instance_hourly_rate',
+                'compute_cost_usd', 'storage_cost_usd', 'total_cost_usd']
+
+def pricing_fingerprint(ec2_pricing, ebs_price_per_gb_hour):
+    """Hash of the pricing inputs; a change invalidates every cached pipeline"""
+    payload = json.dumps([sorted(ec2_pricing.items()), ebs_price_per_gb_hour])
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def pipeline_key(*values):
+    """
+    Hashable key of a pipeline, (job, analysis_name) or with more key cells.
+
+    A blank cell becomes None: NaN never equals itself, so a blank key would
+    match nothing in a dict or set.
+    """
+    return tuple(None if pd.isna(value) else value for value in values)
+
+def pipeline_positions(df):
+    """Row positions of every pipeline block, blank keys included, in order of first appearance"""
+    positions = df.groupby(PIPELINE_COLUMNS, sort=False, observed=True, dropna=False).indices
+    return {pipeline_key(*key): rows for key, rows in positions.items()}
+
+def _sort_key(key):
+    """Order of groupby(sort=True): blank keys after the named ones"""
+    return tuple((value is None, '' if value is None else value) for value in key)
+
+def hash_pipelines(df):
+    """
+    Hash every pipeline block of the processed data.
+
+    Returns {pipeline_key: hex digest}. Row order inside a block and the
+    column layout are part of the hash.
+    """
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    header = '\x1f'.join(map(str, df.columns)).encode('utf-8')
+
+    hashes = {}
+    for key, positions in pipeline_positions(df).items():
+        digest = hashlib.sha1(header)
+        digest.update(row_hashes[positions].tobytes())
+        hashes[key] = digest.hexdigest()
+    return hashes
+
+def load_manifest(team_dir):
+    """Load a team's manifest, or an empty one if missing or from another format version"""
+    manifest_file = team_dir / MANIFEST_NAME
+    if manifest_file.exists():
+        with open(manifest_file, encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') == MANIFEST_VERSION:
+            return manifest
+    return {'version': MANIFEST_VERSION, 'pricing': None, 'pipelines': []}
+
+def save_manifest(team_dir, manifest):
+    manifest_file = team_dir / MANIFEST_NAME
+    with open(manifest_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+
+def diff_manifest(manifest, hashes, pricing, settings=None):
+    """
+    Compare current pipeline hashes against the manifest.
+
+    Returns (dirty_keys, removed_entries): pipelines that are new or changed
+    (all of them when the pricing or the run settings, such as the report
+    format, changed), and manifest entries whose pipeline no longer exists.
+    """
+    cached = {(e['job'], e['analysis_name']): e for e in manifest['pipelines']}
+    if manifest['pricing'] != pricing or manifest.get('settings') != settings:
+        dirty = set(hashes)
+    else:
+        dirty = {key for key, digest in hashes.items()
+                 if key not in cached or cached[key]['hash'] != digest}
+    removed = [entry for key, entry in cached.items() if key not in hashes]
+    return dirty, removed
+
+def _to_json(value):
+    """Convert numpy scalars (also inside groups_breakdown) to plain Python values"""
+    if isinstance(value, dict):
+        return {str(k): _to_json(v) for k, v in value.items()}
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+def update_manifest(manifest, hashes, pricing, pipeline_df, report_files, settings=None):
+    """
+    Merge freshly analyzed pipelines into the manifest.
+
+    pipeline_df holds the re-analyzed (dirty) pipelines and report_files their
+    report paths in the same order; clean entries are kept as they are.
+    Returns the updated manifest and the full pipeline summary DataFrame in
+    the order analyze_pipeline_structure produces for the whole team.
+    """
+    cached = {(e['job'], e['analysis_name']): e for e in manifest['pipelines']}
+
+    for (_, row), report_file in zip(pipeline_df.iterrows(), report_files):
+        key = pipeline_key(row['직무(업무명)'], row['Analysis_name'])
+        cached[key] = {
+            'job': key[0],
+            'analysis_name': key[1],
+            'hash': hashes[key],
+            'report_file': report_file.name,
+            'summary': {col: _to_json(row[col]) for col in pipeline_df.columns},
+        }
+
+    entries = [cached[key] for key in sorted(hashes, key=_sort_key)]
+    manifest = {'version': MANIFEST_VERSION, 'pricing': pricing, 'settings': settings,
+                'pipelines': entries}
+    full_pipeline_df = pd.DataFrame([entry['summary'] for entry in entries])
+    return manifest, full_pipeline_df
+
+def merge_costed_rows(df, costed_dirty, previous_costed, dirty_keys):
+    """
+    Rebuild the full costed table in processed-row order.
+
+    Rows of dirty pipelines come from costed_dirty (in the order they appear in
+    df); cost columns of clean pipelines are taken from the previous
+    analysis_with_costs.csv, whose blocks are unchanged by definition.
+    """
+    current = pipeline_positions(df)
+    previous = pipeline_positions(previous_costed)
+
+    pieces = []
+    positions = []
+    dirty_positions = [current[key] for key in current if key in dirty_keys]
+    if dirty_positions:
+        pieces.append(costed_dirty[list(df.columns) + COST_COLUMNS])
+        positions.append(np.sort(np.concatenate(dirty_positions)))
+
+    for key, rows in current.items():
+        if key in dirty_keys:
+            continue
+        clean = df.iloc[rows].reset_index(drop=True)
+        costs = previous_costed.iloc[previous[key]][COST_COLUMNS].reset_index(drop=True)
+        pieces.append(pd.concat([clean, costs], axis=1))
+        positions.append(rows)
+
+    merged = pd.concat(pieces, ignore_index=True)
+    order = np.argsort(np.concatenate(positions), kind='stable')
+    merged = merged.iloc[order].reset_index(drop=True)
+
+    # Same vCPU dtype rule as calculate_costs: integers unless a row has no instance
+    if merged['instance_vcpu'].notna().all():
+        merged['instance_vcpu'] = merged['instance_vcpu'].astype(np.int64)
+    return merged
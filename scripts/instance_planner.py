@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Instance planner: co-locate concurrent tasks on shared EC2 instances
+- Every nTask(병렬) task of a step is an item needing (CPUs, MEM(G)) for TIME(hr) hours
+- Concurrency follows the wall-clock model (scheduling.py, --dependency): the
+  items of one scope (a Group, or a whole pipeline) that start at the same
+  time in the dependency DAG are packed onto instances from the EC2_PRICING
+  catalogue (vector bin packing over vCPU and memory)
+- An instance is billed for the runtime of its longest task
+- Heuristic: first-fit decreasing by runtime; a new instance gets the type with
+  the lowest cost per baseline-dollar of the tasks it could take next
+- Exact mode (branch and bound) for scopes with few tasks
+- A scope whose packing would cost more than the baseline keeps the baseline
+  placement (one instance per task)
+"""
+
+import numpy as np
+import pandas as pd
+
+from scheduling import DEFAULT_DEPENDENCY, step_start_times
+
+PLAN_SCOPES = {
+    'group': ['직무(업무명)', 'Analysis_name', 'Group'],
+    'pipeline': ['직무(업무명)', 'Analysis_name'],
+}
+
+# Scopes with at most this many tasks are solved exactly with --exact
+EXACT_MAX_TASKS = 10
+
+# How many upcoming tasks are considered when choosing the type of a new instance
+LOOKAHEAD = 256
+
+def expand_tasks(df):
+    """
+    One item per parallel task of every costed step.
+
+    Requirements are normalized like select_instance_types (at least 1 vCPU /
+    1 GB, truncated); rows without an instance in the baseline are skipped.
+    baseline is the per-task compute cost from calculate_costs.
+    """
+    costed = df[df['instance_type'].notna()]
+    n_tasks = np.ceil(costed['nTask(병렬)'].fillna(1).to_numpy(dtype=float)).astype(np.int64)
+    rows = np.repeat(np.arange(len(costed)), n_tasks)
+
+    time_hr = costed['TIME(hr)'].fillna(0.0).to_numpy(dtype=float)
+    return pd.DataFrame({
+        'row': costed.index.to_numpy()[rows],
+        'instance_type': costed['instance_type'].to_numpy(dtype=object)[rows],
+        'cpu': np.maximum(1, np.trunc(costed['CPUs'].to_numpy(dtype=float)))[rows],
+        'mem': np.maximum(1, np.trunc(costed['MEM(G)'].to_numpy(dtype=float)))[rows],
+        'hours': time_hr[rows],
+        'baseline': (costed['instance_hourly_rate'].to_numpy(dtype=float) * time_hr)[rows],
+    })
+
+def cheapest_instance(cpu, mem, table):
+    """Position of the cheapest instance with at least cpu vCPUs and mem GB, -1 if none"""
+    feasible = (table['cpu'] >= cpu) & (table['mem'] >= mem)
+    if not feasible.any():
+        return -1
+    return int(np.flatnonzero(feasible)[np.argmin(table['rate'][feasible])])
+
+def pack_heuristic(cpu, mem, hours, baseline, table):
+    """
+    Pack items onto instances; returns (bin of each item, instance position of each bin).
+
+    Items are taken longest first and go to the first open instance with room.
+    When none has room, the new instance type is chosen by looking at the next
+    items in order: for each type, the run of items that would fit on it is
+    found with prefix sums, and the type with the lowest rate × runtime per
+    baseline dollar of that run wins. Items larger than every instance get the
+    largest instance of their own, as in the per-step baseline.
+    """
+    n = len(cpu)
+    order = np.lexsort((-cpu - mem, -hours))
+    cpu, mem, hours, baseline = cpu[order], mem[order], hours[order], baseline[order]
+
+    largest = int(np.lexsort((table['mem'], table['cpu']))[-1])
+    assignment = np.empty(n, dtype=np.int64)
+    bin_types = []
+    free_cpu = np.empty(n)
+    free_mem = np.empty(n)
+    n_bins = 0
+
+    for i in range(n):
+        room = np.flatnonzero((free_cpu[:n_bins] >= cpu[i]) & (free_mem[:n_bins] >= mem[i]))
+        if len(room):
+            b = room[0]
+        else:
+            window = slice(i, min(n, i + LOOKAHEAD))
+            cum_cpu = np.cumsum(cpu[window])
+            cum_mem = np.cumsum(mem[window])
+            cum_base = np.cumsum(baseline[window])
+            fits = np.minimum(np.searchsorted(cum_cpu, table['cpu'], side='right'),
+                              np.searchsorted(cum_mem, table['mem'], side='right'))
+            candidates = np.flatnonzero(fits > 0)
+            if len(candidates):
+                covered = cum_base[fits[candidates] - 1]
+                cost = table['rate'][candidates] * hours[i]
+                score = np.where(covered > 0, cost / np.where(covered > 0, covered, 1), cost)
+                t = int(candidates[np.lexsort((table['rate'][candidates], score))[0]])
+            else:
+                t = largest
+            b = n_bins
+            bin_types.append(t)
+            free_cpu[b] = table['cpu'][t]
+            free_mem[b] = table['mem'][t]
+            n_bins += 1
+        assignment[i] = b
+        free_cpu[b] -= cpu[i]
+        free_mem[b] -= mem[i]
+
+    result = np.empty(n, dtype=np.int64)
+    result[order] = assignment
+    return result, np.array(bin_types, dtype=np.int64)
+
+def pack_exact(cpu, mem, hours, table):
+    """
+    Minimum-cost packing by branch and bound over set partitions (small inputs only).
+
+    Each block of the partition runs on its cheapest feasible instance for
+    the longest runtime in the block. Returns the same as pack_heuristic.
+    """
+    n = len(cpu)
+    order = np.argsort(-hours, kind='stable')
+    best = {'cost': np.inf, 'assignment': None, 'types': None}
+    assignment = np.empty(n, dtype=np.int64)
+    blocks = []  # [cpu, mem, hours, type, cost]
+
+    def block_cost(c, m, h):
+        t = cheapest_instance(c, m, table)
+        return (t, table['rate'][t] * h) if t >= 0 else (-1, np.inf)
+
+    def search(k, total):
+        if total >= best['cost']:
+            return
+        if k == n:
+            best.update(cost=total, assignment=assignment.copy(), types=[b[3] for b in blocks])
+            return
+        i = order[k]
+        for b, block in enumerate(blocks):
+            t, cost = block_cost(block[0] + cpu[i], block[1] + mem[i], max(block[2], hours[i]))
+            if t < 0:
+                continue
+            saved = list(block)
+            blocks[b] = [block[0] + cpu[i], block[1] + mem[i], max(block[2], hours[i]), t, cost]
+            assignment[i] = b
+            search(k + 1, total - saved[4] + cost)
+            blocks[b] = saved
+        t, cost = block_cost(cpu[i], mem[i], hours[i])
+        if t >= 0:
+            blocks.append([cpu[i], mem[i], hours[i], t, cost])
+            assignment[i] = len(blocks) - 1
+            search(k + 1, total + cost)
+            blocks.pop()
+
+    search(0, 0.0)
+    if best['assignment'] is None:
+        return None
+    return best['assignment'], np.array(best['types'], dtype=np.int64)
+
+def _bin_hours(assignment, hours, n_bins):
+    """Billed runtime of every bin: the longest task on it"""
+    bin_hours = np.zeros(n_bins)
+    np.maximum.at(bin_hours, assignment, hours)
+    return bin_hours
+
+def plan_instances(df, table, scope='group', exact=False, dependency=DEFAULT_DEPENDENCY):
+    """
+    Build a placement plan for the costed steps in df.
+
+    Tasks are co-located within a scope when their steps start at the same
+    time (start_hr) under the dependency rule. Returns (plan, comparison):
+    - plan: one row per planned instance with its scope keys, start time,
+      type, runtime, cost, packed tasks and used vCPU/memory
+    - comparison: per scope and start time, the per-step baseline compute
+      cost from calculate_costs next to the planned cost
+    """
+    # Rounded so that steps released by the same finish time share a key
+    starts = pd.Series(step_start_times(df, PLAN_SCOPES['pipeline'], dependency).round(6), index=df.index)
+    keys = PLAN_SCOPES[scope] + ['start_hr']
+    tasks = expand_tasks(df)
+    tasks[PLAN_SCOPES[scope]] = df.loc[tasks['row'], PLAN_SCOPES[scope]].to_numpy()
+    tasks['start_hr'] = starts.loc[tasks['row']].to_numpy()
+    tasks['step'] = df.loc[tasks['row'], 'Step'].astype(str).to_numpy()
+
+    # Pack every scope; bins are numbered across scopes
+    task_bin = np.empty(len(tasks), dtype=np.int64)
+    bin_types = []
+    bin_scope = []
+    comparison = []
+    for key, rows in tasks.groupby(keys, sort=False, observed=True, dropna=False).indices.items():
+        cpu = tasks['cpu'].to_numpy()[rows]
+        mem = tasks['mem'].to_numpy()[rows]
+        hours = tasks['hours'].to_numpy()[rows]
+        baseline = tasks['baseline'].to_numpy()[rows]
+
+        packed = pack_exact(cpu, mem, hours, table) if exact and len(rows) <= EXACT_MAX_TASKS else None
+        method = 'exact' if packed is not None else 'heuristic'
+        if packed is None:
+            packed = pack_heuristic(cpu, mem, hours, baseline, table)
+        assignment, types = packed
+        planned_cost = table['rate'][types] @ _bin_hours(assignment, hours, len(types))
+        if planned_cost > baseline.sum():
+            method = 'baseline'
+            assignment = np.arange(len(rows))
+            types = pd.Index(table['type']).get_indexer(tasks['instance_type'].to_numpy()[rows])
+            planned_cost = table['rate'][types] @ hours
+
+        task_bin[rows] = len(bin_types) + assignment
+        bin_types.extend(types)
+        bin_scope.extend([key] * len(types))
+        comparison.append(dict(zip(keys, key), n_tasks=len(rows), n_instances=len(types), method=method,
+                               baseline_cost_usd=baseline.sum(), planned_cost_usd=planned_cost))
+
+    tasks['bin'] = task_bin
+    plan = tasks.groupby('bin').agg(used_vcpu=('cpu', 'sum'), used_mem_gb=('mem', 'sum'),
+                                    hours=('hours', 'max'), n_tasks=('cpu', 'size'))
+    step_counts = tasks.groupby(['bin', 'step'], sort=False).size()
+    plan['steps'] = pd.Series([f"{step}×{count}" if count > 1 else step
+                               for (_, step), count in step_counts.items()],
+                              index=step_counts.index.get_level_values('bin')).groupby(level=0, sort=False).agg(', '.join)
+
+    types = np.array(bin_types, dtype=np.int64)[plan.index.to_numpy()]
+    scope_keys = pd.DataFrame([bin_scope[b] for b in plan.index], columns=keys)
+    plan = pd.concat([scope_keys, pd.DataFrame({
+        'instance_type': table['type'][types],
+        'instance_vcpu': table['cpu'][types].astype(np.int64),
+        'instance_mem_gb': table['mem'][types].astype(np.int64),
+        'hourly_rate': table['rate'][types],
+    }), plan.reset_index(drop=True)], axis=1)
+    plan['cost_usd'] = plan['hourly_rate'] * plan['hours']
+
+    comparison = pd.DataFrame(comparison)
+    if len(comparison):
+        comparison['savings_usd'] = comparison['baseline_cost_usd'] - comparison['planned_cost_usd']
+    return plan, comparison
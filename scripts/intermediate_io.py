@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Reading and writing the stage hand-off files (analysis_processed, analysis_with_costs)
+- csv: UTF-8 CSV, the default and the format used for exports
+- parquet / feather: columnar files with an explicit schema, read with column
+  projection and memory mapping (requires pyarrow)
+- Repetitive text columns are dictionary-encoded (categorical) in memory with
+  one sorted dictionary per column shared by every team of the process
+"""
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ('csv', 'parquet', 'feather')
+
+# Typed schema: text columns repeated on every row of a pipeline or group
+# (after the forward fill) are categorical in memory and in the columnar formats
+CATEGORICAL_COLUMNS = ['직무(업무명)', '업무세부내역', 'Analysis_name', 'Platfom', 'Pipeline Name', 'Group',
+                       'tools', 'version', 'USER', '비고']
+FLOAT32_COLUMNS = ['CPUs', 'MEM(G)', 'TIME(hr)', 'nTask(병렬)', 'SIZE(MB)']
+
+# Dictionary (CategoricalDtype) of every categorical column, shared by all frames of the process
+_dictionaries = {}
+
+def intermediate_path(team_dir, name, fmt='csv'):
+    """Path of an intermediate file, e.g. intermediate_path(TEAM_DIR, 'analysis_processed', 'parquet')"""
+    return team_dir / f"{name}.{fmt}"
+
+def shared_dtype(col, values):
+    """
+    Shared CategoricalDtype of col, extended with the values not seen before.
+
+    Categories are kept sorted, so groupby on the codes returns groups in the
+    same order as on the text.
+    """
+    dtype = _dictionaries.get(col)
+    new = values.cat.categories if isinstance(values.dtype, pd.CategoricalDtype) else pd.Index(values.dropna().unique())
+    if dtype is None or not new.isin(dtype.categories).all():
+        known = dtype.categories if dtype is not None else pd.Index([], dtype=object)
+        dtype = pd.CategoricalDtype(sorted(known.union(new, sort=False)))
+        _dictionaries[col] = dtype
+    return dtype
+
+def categorize(df):
+    """
+    Dictionary-encode the CATEGORICAL_COLUMNS of a stage DataFrame in place.
+
+    Frames of every team use the same dictionaries, so they concatenate
+    without falling back to text. Columns holding anything but strings (e.g.
+    a version column read as numbers) are left as they are. Returns df.
+    """
+    for col in CATEGORICAL_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            if pd.api.types.infer_dtype(values, skipna=True) not in ('string', 'empty'):
+                continue
+        elif pd.api.types.infer_dtype(values.cat.categories) not in ('string', 'empty'):
+            continue
+        dtype = shared_dtype(col, values)
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            df[col] = values.astype(dtype)
+        elif not values.cat.categories.equals(dtype.categories):
+            # astype() keeps the codes of an unordered dtype with the same categories in another order
+            df[col] = values.cat.set_categories(dtype.categories)
+    return df
+
+def concat_frames(frames):
+    """
+    Concatenate stage DataFrames (e.g. of several teams) keeping the categorical columns.
+
+    A frame encoded before the shared dictionaries grew has an older dtype;
+    it is brought to the current dictionaries first (only the codes change).
+    """
+    return categorize(pd.concat([categorize(df.copy(deep=False)) for df in frames], ignore_index=True))
+
+def apply_schema(df):
+    """
+    Cast a stage DataFrame to the columnar schema.
+
+    Resource columns are stored as float32 only when that is lossless; values
+    such as 0.1 hours are not exact in float32 and would shift the costs, so
+    those columns stay float64.
+    """
+    df = categorize(df.copy())
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns:
+            values = df[col].astype(np.float64)
+            narrow = values.astype(np.float32)
+            if np.array_equal(narrow.astype(np.float64), values, equal_nan=True):
+                df[col] = narrow
+            else:
+                df[col] = values
+    return df
+
+def write_intermediate(df, path, fmt='csv'):
+    """Write a stage hand-off file in the given format"""
+    if fmt == 'csv':
+        df.to_csv(path, index=False, encoding='utf-8')
+    elif fmt == 'parquet':
+        apply_schema(df).to_parquet(path, index=False)
+    elif fmt == 'feather':
+        apply_schema(df).reset_index(drop=True).to_feather(path)
+    else:
+        raise ValueError(f"Unknown intermediate format: {fmt} (expected one of {', '.join(FORMATS)})")
+
+def read_intermediate(path, fmt='csv', columns=None):
+    """
+    Read a stage hand-off file.
+
+    columns limits the read to the listed columns. Columnar files are memory
+    mapped and keep their float32 columns; the text columns of every format
+    come back dictionary-encoded (see categorize).
+    """
+    if fmt == 'csv':
+        return categorize(pd.read_csv(path, encoding='utf-8', usecols=columns, float_precision='round_trip'))
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        # Files written chunk by chunk store text as plain strings; restore the categoricals
+        table = pq.read_table(path, columns=columns, memory_map=True,
+                              read_dictionary=[c for c in CATEGORICAL_COLUMNS if columns is None or c in columns])
+    elif fmt == 'feather':
+        import pyarrow.feather as feather
+        table = feather.read_table(path, columns=columns, memory_map=True)
+    else:
+        raise ValueError(f"Unknown intermediate format: {fmt} (expected one of {', '.join(FORMATS)})")
+
+    df = table.to_pandas()
+    for col in df.columns:
+        if df[col].dtype == object:
+            # Arrow gives None for missing strings; use NaN like the CSV reader
+            df[col] = df[col].where(df[col].notna(), np.nan)
+    return categorize(df)
+
+class ChunkedWriter:
+    """
+    Append DataFrame chunks to a single intermediate file (streaming ingest).
+
+    The schema is fixed when the first chunk arrives: resource columns are
+    float64 and every other column is text, so chunks whose values would be
+    inferred differently still line up. Feather/parquet chunks are written as
+    record batches / row groups; CSV chunks are appended with one header.
+    """
+
+    def __init__(self, path, fmt='csv'):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown intermediate format: {fmt} (expected one of {', '.join(FORMATS)})")
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self._schema = None
+        self._writer = None
+
+    def _arrow_table(self, df):
+        import pyarrow as pa
+        if self._schema is None:
+            self._schema = pa.schema([
+                (col, pa.float64() if col in FLOAT32_COLUMNS else pa.string()) for col in df.columns
+            ])
+        text = {col: df[col].astype(object).where(df[col].notna(), None).map(
+                    lambda v: v if v is None or isinstance(v, str) else str(v))
+                for col in df.columns if col not in FLOAT32_COLUMNS}
+        return pa.Table.from_pandas(df.assign(**text), schema=self._schema, preserve_index=False)
+
+    def write(self, df):
+        if self.fmt == 'csv':
+            df.to_csv(self.path, index=False, encoding='utf-8',
+                      mode='w' if self.rows == 0 else 'a', header=self.rows == 0)
+        else:
+            table = self._arrow_table(df)
+            if self._writer is None:
+                if self.fmt == 'parquet':
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.path, self._schema)
+                else:
+                    import pyarrow as pa
+                    self._writer = pa.ipc.new_file(str(self.path), self._schema)
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,34 @@
+"""
+Library API of the pipeline cost stages, for embedding in long-running services
+- process(raw): unmerge cells and clean numeric fields of a raw sheet export
+- concat(frames): processed steps of several teams as one DataFrame
+- cost(df, pricing=...): instance choice and cost columns of every step
+- analyze(df_with_costs): per-pipeline summary (costs, time, wall-clock model)
+- quote(cpus, mem_gb, time_hr, ...): cost of a single step, for cost queries
+- All functions take and return DataFrames (or dicts); nothing is read from
+  or written to data/ or reports/
+- Importing the package is cheap: pandas, numpy, the stage modules and the
+  pricing catalogues are loaded on first use (warm() loads them up front),
+  and compiled pricing scenarios stay in memory for later calls
+- Nothing is printed unless console.configure() was called before first use:
+  warnings of the stages (logger 'pipeline_price') go to the host's logging
+  setup, and progress output and summaries are skipped
+
+    import sys; sys.path.insert(0, 'scripts')
+    import pipeline_price
+    pipeline_price.warm()
+    pipeline_price.quote(cpus=8, mem_gb=30, time_hr=2.5, n_tasks=24)
+"""
+
+import importlib
+
+__all__ = ['process', 'concat', 'cost', 'analyze', 'quote', 'pricing_catalogue', 'scenario_names', 'warm']
+
+def __getattr__(name):
+    if name in __all__:
+        api = importlib.import_module('.api', __name__)
+        return getattr(api, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,100 @@
+"""
+Functions behind pipeline_price, loaded on first use (see __init__.py)
+- The stage scripts are imported from the scripts directory, as run_pipeline does
+- Compiled pricing scenarios are kept per process, so repeated calls in a warm
+  worker skip reading the catalogue files
+"""
+
+import importlib
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+# Stage output goes to standard logging unless the embedding process set up the console first
+_console_configured = 'console' in sys.modules
+
+import numpy as np
+import pandas as pd
+
+import console
+from intermediate_io import concat_frames
+from pricing import DEFAULT_SCENARIO, load_pricing, load_scenarios
+from scheduling import DEFAULT_DEPENDENCY, DEFAULT_MAX_VCPUS
+
+process_data = importlib.import_module('01_process_data')
+calculate_aws_costs = importlib.import_module('02_calculate_aws_costs')
+analyze_pipelines = importlib.import_module('03_analyze_pipelines')
+
+if not _console_configured:
+    console.use_logging()
+
+# Compiled pricing scenarios loaded in this process, by name
+_catalogues = {}
+
+def pricing_catalogue(name=DEFAULT_SCENARIO):
+    """Compiled pricing scenario (see pricing.load_pricing), loaded once per process"""
+    if name not in _catalogues:
+        _catalogues[name] = load_pricing(name)
+    return _catalogues[name]
+
+def scenario_names():
+    """Names of the pricing scenarios in pricing/scenarios.json"""
+    return list(load_scenarios())
+
+def warm(*pricing):
+    """Load the stage modules and the given pricing scenarios (default: on-demand) ahead of the first query"""
+    for name in pricing or (DEFAULT_SCENARIO,):
+        pricing_catalogue(name)
+
+def process(raw):
+    """
+    Processed steps of a raw sheet export.
+
+    raw is a DataFrame as read from analysis_raw.csv, or the path of such a
+    CSV file. Returns a new DataFrame with merged cells filled and numeric
+    columns cleaned, the same data as 01_process_data.py writes.
+    """
+    if not isinstance(raw, pd.DataFrame):
+        raw = pd.read_csv(raw, encoding='utf-8')
+    return process_data.process_frame(raw)
+
+def concat(frames):
+    """
+    Processed (or costed) steps of several teams as one DataFrame.
+
+    The text columns stay dictionary-encoded with the dictionaries shared by
+    every frame of the process, where pd.concat would fall back to strings.
+    """
+    return concat_frames(frames)
+
+def cost(df, pricing=DEFAULT_SCENARIO, scenarios=(), cache=None, team=None):
+    """
+    Processed steps with instance and cost columns added.
+
+    pricing names the scenario for the cost columns; every name in scenarios
+    adds its own columns suffixed with [name]. cache is an open
+    cost_cache.CostCache to reuse costs of known resource signatures.
+    """
+    return calculate_aws_costs.calculate_costs(df, team, pricing=pricing_catalogue(pricing),
+                                               scenarios=[pricing_catalogue(name) for name in scenarios], cache=cache)
+
+def analyze(df_with_costs, max_vcpus=DEFAULT_MAX_VCPUS, dependency=DEFAULT_DEPENDENCY):
+    """One row per pipeline with its costs, resources and wall-clock model (see 03_analyze_pipelines.py)"""
+    return analyze_pipelines.analyze_pipeline_structure(df_with_costs, max_vcpus=max_vcpus, dependency=dependency)
+
+def quote(cpus, mem_gb, time_hr, n_tasks=1, size_mb=0.0, pricing=DEFAULT_SCENARIO):
+    """
+    Instance choice and cost of a single step, as a dict.
+
+    Arguments follow the sheet columns: CPUs, MEM(G), TIME(hr), nTask(병렬)
+    and SIZE(MB). The result has the cost columns of cost() as scalars.
+    """
+    step = pd.DataFrame({'CPUs': [cpus], 'MEM(G)': [mem_gb], 'TIME(hr)': [time_hr],
+                         'nTask(병렬)': [n_tasks], 'SIZE(MB)': [size_mb]}, dtype=np.float64)
+    catalogue = pricing_catalogue(pricing)
+    costs = calculate_aws_costs.price_steps(step, catalogue)
+    calculate_aws_costs.warn_oversized(step, costs, catalogue)
+    return {col: values[0].item() if hasattr(values[0], 'item') else values[0] for col, values in costs.items()}
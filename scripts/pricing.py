@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Pricing catalogues for the cost calculation
+- EC2 instance prices come from pricing/ec2_*.csv|json (region, instance_type,
+  vcpu, memory_gb, hourly_usd) and EBS prices from pricing/ebs_*.csv|json
+  (region, volume_type, usd_per_gb_month)
+- pricing/scenarios.json names the scenarios: region, instance families, EBS
+  volume type and optional Spot discounts per family
+- Each scenario is compiled once into a selection index (build_pricing_table)
+  and cached on disk in the user cache directory ($XDG_CACHE_HOME or
+  ~/.cache, never the source tree), keyed by the price files' content
+"""
+
+import hashlib
+import json
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = Path(__file__).parent.parent
+PRICING_DIR = PROJECT_ROOT / "pricing"
+CACHE_DIR = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / ".cache") / "pipeline-cost-analysis" / "pricing"
+
+DEFAULT_SCENARIO = 'on-demand'
+
+# Part of the cache key; bump when the compiled layout or build_pricing_table changes
+CACHE_VERSION = 1
+
+REGION_NAMES = {
+    'us-east-1': 'N. Virginia',
+    'us-west-2': 'Oregon',
+    'eu-west-1': 'Ireland',
+    'ap-northeast-2': 'Seoul',
+}
+
+FAMILY_NOTES = {
+    'c6i': 'C6i (Compute-optimized): CPU-intensive workloads',
+    'c7g': 'C7g (Graviton3, compute-optimized): CPU-intensive workloads on ARM',
+    'm6i': 'M6i (General purpose): balanced CPU/memory workloads',
+    'r6i': 'R6i (Memory-optimized): Memory-intensive workloads',
+    'r7i': 'R7i (Memory-optimized): Memory-intensive workloads',
+}
+
+def build_pricing_table(pricing):
+    """
+    Compile the EC2 pricing catalogue into a selection index, once.
+
+    Instances are ordered by the preference used in select_instance_type:
+    efficiency score first, then total instance size (the per-row waste only
+    differs by the instance size), then catalogue order for ties. The first
+    feasible instance in this order is the best choice for any requirement.
+
+    The index also holds the selection frontier: the distinct instance vCPU and
+    memory sizes split the requirement space into rectangles that share one
+    best instance, so any (CPU, MEM) requirement resolves with two binary
+    searches into a precomputed grid.
+    """
+    types = np.array(list(pricing.keys()), dtype=object)
+    specs = np.array(list(pricing.values()), dtype=float)
+    inst_cpu, inst_mem, rate = specs[:, 0], specs[:, 1], specs[:, 2]
+
+    # Rounded so that prices proportional to size tie exactly despite float division
+    efficiency = np.round((rate / inst_cpu + rate / inst_mem) / 2, 12)
+    order = np.lexsort((np.arange(len(types)), inst_cpu + inst_mem, efficiency))
+    inst_cpu, inst_mem = inst_cpu[order], inst_mem[order]
+
+    # frontier[j, k]: best instance with vCPU >= cpu_levels[j] and memory >= mem_levels[k], -1 if none
+    cpu_levels = np.unique(inst_cpu)
+    mem_levels = np.unique(inst_mem)
+    feasible = ((inst_cpu[None, None, :] >= cpu_levels[:, None, None]) &
+                (inst_mem[None, None, :] >= mem_levels[None, :, None]))
+    frontier = np.where(feasible.any(axis=2), feasible.argmax(axis=2), -1)
+
+    # Fallback when nothing fits: largest by (vCPU, memory), first in catalogue order
+    largest = max(range(len(types)), key=lambda i: (specs[i, 0], specs[i, 1]))
+
+    return {
+        'type': types[order],
+        'cpu': inst_cpu,
+        'mem': inst_mem,
+        'rate': rate[order],
+        'cpu_levels': cpu_levels,
+        'mem_levels': mem_levels,
+        'frontier': frontier,
+        'largest': (types[largest], int(specs[largest, 0]), specs[largest, 2]),
+        'memo': {},
+    }
+
+def region_label(region):
+    """Region code with its location, e.g. 'us-east-1 (N. Virginia)'"""
+    return f"{region} ({REGION_NAMES[region]})" if region in REGION_NAMES else region
+
+def describe_families(ec2):
+    """One description line per instance family of a catalogue, in catalogue order"""
+    families = dict.fromkeys(t.split('.')[0] for t in ec2)
+    return [FAMILY_NOTES.get(family, family) for family in families]
+
+def _price_files(pricing_dir, prefix):
+    return sorted(p for p in pricing_dir.glob(f"{prefix}_*") if p.suffix in ('.csv', '.json'))
+
+def _read_price_file(path):
+    if path.suffix == '.json':
+        with open(path, encoding='utf-8') as f:
+            return pd.DataFrame(json.load(f))
+    return pd.read_csv(path, encoding='utf-8')
+
+def load_scenarios(pricing_dir=PRICING_DIR):
+    """Scenario definitions from scenarios.json, in file order"""
+    with open(pricing_dir / "scenarios.json", encoding='utf-8') as f:
+        return json.load(f)
+
+def _compile_scenario(name, spec, pricing_dir):
+    """Price table and EBS rate of one scenario, from the price files"""
+    instances = pd.concat([_read_price_file(p) for p in _price_files(pricing_dir, 'ec2')], ignore_index=True)
+    volumes = pd.concat([_read_price_file(p) for p in _price_files(pricing_dir, 'ebs')], ignore_index=True)
+
+    instances = instances[instances['region'] == spec['region']]
+    family = instances['instance_type'].str.split('.').str[0]
+    instances = instances[family.isin(spec['families'])]
+    if instances.empty:
+        raise ValueError(f"Pricing scenario {name}: no instances for {spec['families']} in {spec['region']}")
+
+    # Spot: a discount per family (or one for all) off the On-Demand rate
+    rate = instances['hourly_usd'].to_numpy(dtype=float)
+    discount = spec.get('spot_discount', 0.0)
+    if isinstance(discount, dict):
+        discount = instances['instance_type'].str.split('.').str[0].map(discount).fillna(0.0).to_numpy()
+    rate = rate * (1 - np.asarray(discount, dtype=float)) if np.any(discount) else rate
+
+    ec2 = {t: (int(c), int(m), float(r))
+           for t, c, m, r in zip(instances['instance_type'], instances['vcpu'], instances['memory_gb'], rate)}
+
+    ebs = volumes[(volumes['region'] == spec['region']) & (volumes['volume_type'] == spec.get('ebs', 'gp3'))]
+    if ebs.empty:
+        raise ValueError(f"Pricing scenario {name}: no {spec.get('ebs', 'gp3')} EBS price in {spec['region']}")
+
+    return {
+        'name': name,
+        'description': spec.get('description', name),
+        'region': spec['region'],
+        'ec2': ec2,
+        # $ per GB-month → $ per GB-hour (30-day month)
+        'ebs_price_per_gb_hour': float(ebs['usd_per_gb_month'].iloc[0]) / (30 * 24),
+        'table': build_pricing_table(ec2),
+    }
+
+def load_pricing(name=DEFAULT_SCENARIO, pricing_dir=PRICING_DIR, use_cache=True):
+    """
+    Compiled pricing scenario: name, description, region, ec2 ({type: (vCPU,
+    memory GB, hourly rate)}), ebs_price_per_gb_hour and table (selection index).
+
+    The compiled scenario is cached on disk under CACHE_DIR; the cache key
+    covers the scenario definition and the content of every price file, so
+    editing a file recompiles it. A cache that cannot be written is skipped.
+    """
+    scenarios = load_scenarios(pricing_dir)
+    if name not in scenarios:
+        raise ValueError(f"Unknown pricing scenario: {name} (expected one of {', '.join(scenarios)})")
+    spec = scenarios[name]
+
+    digest = hashlib.sha1(json.dumps([CACHE_VERSION, spec], sort_keys=True).encode('utf-8'))
+    for path in _price_files(pricing_dir, 'ec2') + _price_files(pricing_dir, 'ebs'):
+        digest.update(path.name.encode('utf-8'))
+        digest.update(path.read_bytes())
+    cache_file = CACHE_DIR / f"{name}-{digest.hexdigest()[:16]}.pkl"
+
+    if use_cache and cache_file.exists():
+        with open(cache_file, 'rb') as f:
+            compiled = pickle.load(f)
+    else:
+        compiled = _compile_scenario(name, spec, pricing_dir)
+        if use_cache:
+            # Other checkouts share the directory, so files of other price sets are kept
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(cache_file, 'wb') as f:
+                    pickle.dump(compiled, f)
+            except OSError:
+                pass
+
+    compiled['table']['memo'] = {}
+    return compiled
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Cross-team query store over costed steps and pipeline summaries
+- Stage 2 (--query-store) loads each team's costed steps and stage 3 its
+  pipeline summaries into one SQLite file (data/query_store.sqlite by default)
+- A team's rows are replaced on every load (only the changed pipelines in
+  incremental runs), so the store always holds the latest run of every team
+- Columns get plain SQL names (job for 직무(업무명), group_name for Group, ...;
+  see STEP_COLUMNS and PIPELINE_COLUMNS) and are indexed on job,
+  analysis_name, group_name and tools
+- Queries read only the store, never the CSV files:
+    query_store.py --by tools --where "tools LIKE '%gatk%'"
+    query_store.py "SELECT team, job, SUM(total_cost_usd) FROM steps GROUP BY 1, 2"
+"""
+
+import argparse
+import csv
+import sqlite3
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DATA_DIR = PROJECT_ROOT / "data"
+DEFAULT_QUERY_STORE = DATA_DIR / "query_store.sqlite"
+
+# DataFrame column → store column
+STEP_COLUMNS = {
+    '직무(업무명)': 'job',
+    '업무세부내역': 'task_detail',
+    'Analysis_name': 'analysis_name',
+    'Platfom': 'platform',
+    'Pipeline Name': 'pipeline_name',
+    'Pipeline Version': 'pipeline_version',
+    'Group': 'group_name',
+    'Step': 'step',
+    'tools': 'tools',
+    'version': 'version',
+    'CPUs': 'cpus',
+    'MEM(G)': 'mem_gb',
+    'TIME(hr)': 'time_hr',
+    'nTask(병렬)': 'n_task',
+    'SIZE(MB)': 'size_mb',
+    'USER': 'user',
+    'instance_type': 'instance_type',
+    'instance_vcpu': 'instance_vcpu',
+    'instance_hourly_rate': 'instance_hourly_rate',
+    'compute_cost_usd': 'compute_cost_usd',
+    'storage_cost_usd': 'storage_cost_usd',
+    'total_cost_usd': 'total_cost_usd',
+}
+
+PIPELINE_COLUMNS = {
+    '직무(업무명)': 'job',
+    'Analysis_name': 'analysis_name',
+    'Platform': 'platform',
+    'Pipeline Name': 'pipeline_name',
+    'Pipeline Version': 'pipeline_version',
+    'n_groups': 'n_groups',
+    'n_steps': 'n_steps',
+    'n_tools': 'n_tools',
+    'tools_list': 'tools_list',
+    'total_cpu': 'total_cpu',
+    'total_mem_gb': 'total_mem_gb',
+    'total_time_hr': 'total_time_hr',
+    'total_storage_gb': 'total_storage_gb',
+    'total_cost_usd': 'total_cost_usd',
+    'compute_cost_usd': 'compute_cost_usd',
+    'storage_cost_usd': 'storage_cost_usd',
+    'cost_per_hour': 'cost_per_hour',
+    'critical_path_hr': 'critical_path_hr',
+    'makespan_hr': 'makespan_hr',
+    'peak_tasks': 'peak_tasks',
+    'peak_vcpus': 'peak_vcpus',
+    'utilization': 'utilization',
+    'max_vcpus': 'max_vcpus',
+}
+
+TEXT_COLUMNS = {'job', 'task_detail', 'analysis_name', 'platform', 'pipeline_name', 'pipeline_version',
+                'group_name', 'step', 'tools', 'version', 'user', 'instance_type', 'tools_list'}
+
+def _column_defs(columns):
+    return ',\n    '.join(f"{name} {'TEXT' if name in TEXT_COLUMNS else 'REAL'}" for name in columns.values())
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS steps (
+    team INTEGER NOT NULL,
+    pricing TEXT,
+    {_column_defs(STEP_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS steps_team ON steps (team, job, analysis_name);
+CREATE INDEX IF NOT EXISTS steps_job ON steps (job);
+CREATE INDEX IF NOT EXISTS steps_analysis_name ON steps (analysis_name);
+CREATE INDEX IF NOT EXISTS steps_group_name ON steps (group_name);
+CREATE INDEX IF NOT EXISTS steps_tools ON steps (tools);
+CREATE TABLE IF NOT EXISTS pipelines (
+    team INTEGER NOT NULL,
+    {_column_defs(PIPELINE_COLUMNS)}
+);
+CREATE INDEX IF NOT EXISTS pipelines_team ON pipelines (team, job, analysis_name);
+CREATE INDEX IF NOT EXISTS pipelines_job ON pipelines (job);
+CREATE INDEX IF NOT EXISTS pipelines_analysis_name ON pipelines (analysis_name);
+CREATE TABLE IF NOT EXISTS loads (
+    team INTEGER NOT NULL,
+    table_name TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    loaded_at REAL NOT NULL,
+    PRIMARY KEY (team, table_name)
+);
+"""
+
+# Cost columns summed by rollup()
+ROLLUP_SUMS = ['total_cost_usd', 'compute_cost_usd', 'storage_cost_usd']
+
+def _records(team, df, columns, extra=()):
+    """Rows of df as tuples of plain Python values (NULL for missing cells and columns)"""
+    values = []
+    for col in columns:
+        if col in df.columns:
+            series = df[col].astype(object)
+            values.append(series.where(series.notna(), None).tolist())
+        else:
+            values.append([None] * len(df))
+    return [(team, *extra, *row) for row in zip(*values)]
+
+class QueryStore:
+    """SQLite store of every team's latest costed steps and pipeline summaries"""
+
+    def __init__(self, path=DEFAULT_QUERY_STORE):
+        self.path = Path(path)
+        # Teams running in parallel share the file; wait for their writes
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.executescript(SCHEMA)
+
+    def has_team(self, team):
+        """Whether steps of team were loaded before"""
+        return self.conn.execute("SELECT 1 FROM loads WHERE team = ? AND table_name = 'steps'",
+                                 (team,)).fetchone() is not None
+
+    def _replace(self, table, team, records, columns, pipelines=None):
+        """Replace the rows of team (or only of the given (job, analysis_name) pipelines)"""
+        with self.conn:
+            if pipelines is None:
+                self.conn.execute(f"DELETE FROM {table} WHERE team = ?", (team,))
+            else:
+                self.conn.executemany(f"DELETE FROM {table} WHERE team = ? AND job IS ? AND analysis_name IS ?",
+                                      [(team, job, name) for job, name in pipelines])
+            self.conn.executemany(f"INSERT INTO {table} ({', '.join(columns)}) "
+                                  f"VALUES ({', '.join('?' * len(columns))})", records)
+            rows = self.conn.execute(f"SELECT COUNT(*) FROM {table} WHERE team = ?", (team,)).fetchone()[0]
+            self.conn.execute("INSERT OR REPLACE INTO loads (team, table_name, rows, loaded_at) VALUES (?, ?, ?, ?)",
+                              (team, table, rows, time.time()))
+        return len(records)
+
+    def load_steps(self, team, df, pricing=None, pipelines=None):
+        """
+        Store the costed steps of a team; returns the number of rows written.
+
+        pricing names the scenario of the cost columns. With pipelines (a set
+        of (job, analysis_name) keys) only those pipelines are replaced, and
+        df holds just their rows.
+        """
+        records = _records(team, df, STEP_COLUMNS, extra=(pricing,))
+        return self._replace('steps', team, records, ['team', 'pricing'] + list(STEP_COLUMNS.values()), pipelines)
+
+    def load_pipelines(self, team, pipeline_df):
+        """Store the pipeline summaries of a team, replacing the previous ones"""
+        records = _records(team, pipeline_df, PIPELINE_COLUMNS)
+        return self._replace('pipelines', team, records, ['team'] + list(PIPELINE_COLUMNS.values()))
+
+    def query(self, sql, params=()):
+        """Run a query; returns (column names, rows)"""
+        cursor = self.conn.execute(sql, params)
+        return [d[0] for d in cursor.description or []], cursor.fetchall()
+
+    def rollup(self, by, where=None, table='steps', limit=None):
+        """Count and cost sums of table grouped by the given store columns, most expensive first"""
+        allowed = {'team', 'pricing'} | set((STEP_COLUMNS if table == 'steps' else PIPELINE_COLUMNS).values())
+        unknown = [col for col in by if col not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown {table} column(s): {', '.join(unknown)} (expected one of {', '.join(sorted(allowed))})")
+        keys = ', '.join(by)
+        sql = (f"SELECT {keys}, COUNT(*) AS {table}, "
+               f"{', '.join(f'ROUND(SUM({col}), 4) AS {col}' for col in ROLLUP_SUMS)} FROM {table}"
+               f"{f' WHERE {where}' if where else ''} GROUP BY {keys} ORDER BY total_cost_usd DESC"
+               f"{f' LIMIT {int(limit)}' if limit else ''}")
+        return self.query(sql)
+
+    def close(self):
+        self.conn.close()
+
+def _display_width(text):
+    """Terminal columns of text; Hangul and other wide characters take two"""
+    return sum(2 if unicodedata.east_asian_width(c) in 'WF' else 1 for c in text)
+
+def format_table(columns, rows):
+    """Plain text table; numbers right-aligned, floats with two decimals, multi-line cells joined with ' / '"""
+    def cell(value):
+        if value is None:
+            return ''
+        return f"{value:.2f}" if isinstance(value, float) else str(value).replace('\n', ' / ')
+
+    cells = [[cell(value) for value in row] for row in rows]
+    widths = [max([_display_width(name)] + [_display_width(row[i]) for row in cells]) for i, name in enumerate(columns)]
+    numeric = [bool(rows) and all(isinstance(row[i], (int, float)) or row[i] is None for row in rows)
+               for i in range(len(columns))]
+
+    def line(values):
+        padded = []
+        for value, width, right in zip(values, widths, numeric):
+            padding = ' ' * (width - _display_width(value))
+            padded.append(padding + value if right else value + padding)
+        return '  '.join(padded).rstrip()
+
+    return '\n'.join([line(columns)] + [line(row) for row in cells])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Query the cross-team store of costed steps and pipelines')
+    parser.add_argument('sql', nargs='?', default=None, help='SQL query over the steps, pipelines and loads tables')
+    parser.add_argument('--by', nargs='+', default=None, metavar='COLUMN',
+                        help='Cost rollup grouped by these columns (e.g. team job, tools, group_name)')
+    parser.add_argument('--where', default=None, help="SQL filter of the rollup (e.g. \"tools LIKE '%%gatk%%'\")")
+    parser.add_argument('--table', choices=['steps', 'pipelines'], default='steps', help='Table of the rollup (default: steps)')
+    parser.add_argument('--limit', type=int, default=None, help='Only show the first N rows of the rollup')
+    parser.add_argument('--csv', action='store_true', help='Print CSV instead of a text table')
+    parser.add_argument('--db', default=DEFAULT_QUERY_STORE,
+                        help=f'Query store path (default: {DEFAULT_QUERY_STORE.relative_to(PROJECT_ROOT)})')
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        sys.exit(f"No query store at {args.db}; run stage 2/3 or run_pipeline.py with --query-store first")
+
+    store = QueryStore(args.db)
+    try:
+        if args.sql:
+            columns, rows = store.query(args.sql)
+        elif args.by:
+            columns, rows = store.rollup(args.by, where=args.where, table=args.table, limit=args.limit)
+        else:
+            columns, rows = store.query("SELECT team, table_name, rows, datetime(loaded_at, 'unixepoch', 'localtime') "
+                                        "AS loaded_at FROM loads ORDER BY team, table_name")
+    except (sqlite3.Error, ValueError) as e:
+        sys.exit(f"Query failed: {e}")
+    finally:
+        store.close()
+
+    if args.csv:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(columns)
+        writer.writerows(rows)
+    else:
+        print(format_table(columns, rows))
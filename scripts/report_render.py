@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Rendering of the stage 3 reports
+- The data of a report is collected once (pipeline_report_data, summary_report_data)
+  and rendered as txt (the classic layout), md (Markdown) or json
+- Sections are formatted from column arrays and joined into one string
+- Files are written with a single write, by default through a temporary file
+  that is renamed over the target so readers never see a partial report; the
+  file gets the mode of the report it replaces (new files: 0666 minus umask)
+"""
+
+import json
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+REPORT_FORMATS = ('txt', 'md', 'json')
+
+# Label of a blank 직무(업무명) or Analysis_name cell
+BLANK_KEY = '(blank)'
+
+# Per-step columns shown in the detailed breakdown of a pipeline report
+STEP_COLUMNS = ['Group', 'Step', 'tools', 'version', 'CPUs', 'MEM(G)', 'SIZE(MB)', 'TIME(hr)',
+                'nTask(병렬)', 'instance_type', 'instance_hourly_rate', 'total_cost_usd',
+                'compute_cost_usd', 'storage_cost_usd']
+
+def key_label(value):
+    """Display text of a pipeline key cell: BLANK_KEY for a blank (NaN or None) cell"""
+    return BLANK_KEY if pd.isna(value) else value
+
+def _file_mode(path):
+    """Mode for a rewritten report: the existing file's, else what open() would create"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+def write_report(path, text, atomic=True):
+    """Write a rendered report with one write call; atomic replaces the file via rename"""
+    data = text.encode('utf-8')
+    if not atomic:
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        # mkstemp creates the file as 0600
+        os.chmod(tmp_path, _file_mode(path))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+def _native(value):
+    """Convert numpy values (also nested) to JSON-ready Python values; NaN becomes null"""
+    if isinstance(value, dict):
+        return {str(k): _native(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_native(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+def _percent(part, total):
+    """Share of total in percent; 0 for pipelines without cost (e.g. every runtime missing)"""
+    return part / total * 100 if total else 0.0
+
+def _md_table(headers, rows):
+    """Markdown table lines; | inside cells is escaped and line breaks become <br>"""
+    def cell(value):
+        return str(value).replace('|', '\\|').replace('\r\n', '<br>').replace('\n', '<br>')
+    lines = ['| ' + ' | '.join(headers) + ' |', '|' + '---|' * len(headers)]
+    lines.extend('| ' + ' | '.join(cell(v) for v in row) + ' |' for row in rows)
+    return lines
+
+# ---------------------------------------------------------------------------
+# Pipeline reports
+# ---------------------------------------------------------------------------
+
+def pipeline_report_data(pipeline, pipeline_data):
+    """
+    Collect everything a pipeline report shows.
+
+    pipeline is a pipeline_df row (with groups_breakdown), pipeline_data the
+    costed rows of the pipeline. Groups are ordered by cost, highest first.
+    """
+    groups_info = pipeline['groups_breakdown']
+    group_costs = pd.Series({group: info['total_cost_usd'] for group, info in groups_info.items()},
+                            dtype=np.float64)
+    groups = [{'group': group,
+               'steps': groups_info[group]['Step'],
+               'time_hr': groups_info[group]['TIME(hr)'],
+               'cost_usd': groups_info[group]['total_cost_usd'],
+               'tools': groups_info[group]['tools']}
+              for group in group_costs.sort_values(ascending=False).index]
+
+    return {
+        'job': key_label(pipeline['직무(업무명)']),
+        'analysis_name': key_label(pipeline['Analysis_name']),
+        'platform': pipeline['Platform'],
+        'pipeline_name': pipeline['Pipeline Name'],
+        'pipeline_version': pipeline['Pipeline Version'],
+        'n_groups': pipeline['n_groups'],
+        'n_steps': pipeline['n_steps'],
+        'n_tools': pipeline['n_tools'],
+        'total_cpu': pipeline['total_cpu'],
+        'total_mem_gb': pipeline['total_mem_gb'],
+        'total_time_hr': pipeline['total_time_hr'],
+        'total_storage_gb': pipeline['total_storage_gb'],
+        'total_cost_usd': pipeline['total_cost_usd'],
+        'compute_cost_usd': pipeline['compute_cost_usd'],
+        'storage_cost_usd': pipeline['storage_cost_usd'],
+        'cost_per_hour': pipeline['cost_per_hour'],
+        'critical_path_hr': pipeline['critical_path_hr'],
+        'makespan_hr': pipeline['makespan_hr'],
+        'peak_tasks': pipeline['peak_tasks'],
+        'peak_vcpus': pipeline['peak_vcpus'],
+        'utilization': pipeline['utilization'],
+        'max_vcpus': pipeline['max_vcpus'],
+        'groups': groups,
+        'steps': {col: pipeline_data[col].to_numpy(dtype=object) for col in STEP_COLUMNS},
+    }
+
+def _pipeline_txt(d):
+    lines = [
+        "=" * 80,
+        "PIPELINE COST ANALYSIS REPORT",
+        "=" * 80,
+        "",
+        f"직무 (Job): {d['job']}",
+        f"Analysis Name: {d['analysis_name']}",
+        f"Platform: {d['platform']}",
+        f"Pipeline: {d['pipeline_name']} v{d['pipeline_version']}",
+        "",
+        "-" * 80,
+        "OVERVIEW",
+        "-" * 80,
+        f"Number of Groups: {d['n_groups']}",
+        f"Number of Steps: {d['n_steps']}",
+        f"Number of Tools: {d['n_tools']}",
+        "",
+        "-" * 80,
+        "RESOURCE REQUIREMENTS",
+        "-" * 80,
+        f"Total CPUs: {d['total_cpu']:.0f}",
+        f"Total Memory: {d['total_mem_gb']:.0f} GB",
+        f"Total Compute Time: {d['total_time_hr']:.2f} hours",
+        f"Total Storage: {d['total_storage_gb']:.2f} GB",
+        "",
+        "-" * 80,
+        "COST SUMMARY",
+        "-" * 80,
+        f"Total Cost: ${d['total_cost_usd']:.2f}",
+        f"  - Compute Cost: ${d['compute_cost_usd']:.2f} ({_percent(d['compute_cost_usd'], d['total_cost_usd']):.1f}%)",
+        f"  - Storage Cost: ${d['storage_cost_usd']:.2f} ({_percent(d['storage_cost_usd'], d['total_cost_usd']):.1f}%)",
+        f"Cost per Hour: ${d['cost_per_hour']:.2f}",
+        "",
+        "-" * 80,
+        "WALL-CLOCK ESTIMATE (AWS Batch)",
+        "-" * 80,
+        f"Sum of Step Times: {d['total_time_hr']:.2f} hours",
+        f"Critical Path (unlimited capacity): {d['critical_path_hr']:.2f} hours",
+        f"Makespan (max {d['max_vcpus']} vCPUs): {d['makespan_hr']:.2f} hours",
+        f"Peak Concurrency: {d['peak_tasks']} tasks, {d['peak_vcpus']} vCPUs",
+        f"Utilization: {d['utilization']*100:.1f}%",
+        "",
+        "-" * 80,
+        "COST BREAKDOWN BY GROUP",
+        "-" * 80,
+    ]
+
+    for g in d['groups']:
+        lines += ["", f"{g['group']}:", f"  Steps: {g['steps']}", f"  Time: {g['time_hr']:.2f} hours",
+                  f"  Cost: ${g['cost_usd']:.2f}", f"  Tools: {g['tools']}"]
+
+    lines += ["", "-" * 80, "DETAILED STEP-BY-STEP BREAKDOWN", "-" * 80, ""]
+
+    s = d['steps']
+    lines += [
+        f"Group: {group}\n"
+        f"Step: {step}\n"
+        f"Tool: {tool} v{version}\n"
+        f"Resources: {cpus:.0f} CPUs, {mem:.0f} GB RAM, {size:.0f} MB storage\n"
+        f"Runtime: {time_hr:.2f} hours × {ntask:.0f} parallel tasks\n"
+        f"Instance: {instance} @ ${rate:.4f}/hr\n"
+        f"Cost: ${total:.4f} (compute: ${compute:.4f}, storage: ${storage:.4f})\n"
+        for group, step, tool, version, cpus, mem, size, time_hr, ntask, instance, rate, total, compute, storage
+        in zip(*(s[col] for col in STEP_COLUMNS))
+    ]
+
+    lines += ["=" * 80, "END OF REPORT", "=" * 80]
+    return "\n".join(lines) + "\n"
+
+def _pipeline_md(d):
+    lines = [
+        f"# {d['job']} / {d['analysis_name']}",
+        "",
+        f"- **Platform**: {d['platform']}",
+        f"- **Pipeline**: {d['pipeline_name']} v{d['pipeline_version']}",
+        "",
+        "## Overview",
+        "",
+    ]
+    lines += _md_table(['Metric', 'Value'], [
+        ('Groups', d['n_groups']),
+        ('Steps', d['n_steps']),
+        ('Tools', d['n_tools']),
+        ('Total CPUs', f"{d['total_cpu']:.0f}"),
+        ('Total Memory (GB)', f"{d['total_mem_gb']:.0f}"),
+        ('Total Compute Time (hr)', f"{d['total_time_hr']:.2f}"),
+        ('Total Storage (GB)', f"{d['total_storage_gb']:.2f}"),
+        ('Total Cost (USD)', f"{d['total_cost_usd']:.2f}"),
+        ('Compute Cost (USD)', f"{d['compute_cost_usd']:.2f}"),
+        ('Storage Cost (USD)', f"{d['storage_cost_usd']:.2f}"),
+        ('Cost per Hour (USD)', f"{d['cost_per_hour']:.2f}"),
+        ('Critical Path (hr)', f"{d['critical_path_hr']:.2f}"),
+        (f"Makespan, max {d['max_vcpus']} vCPUs (hr)", f"{d['makespan_hr']:.2f}"),
+        ('Peak Concurrency', f"{d['peak_tasks']} tasks, {d['peak_vcpus']} vCPUs"),
+        ('Utilization', f"{d['utilization']*100:.1f}%"),
+    ])
+    lines += ["", "## Cost Breakdown by Group", ""]
+    lines += _md_table(['Group', 'Steps', 'Time (hr)', 'Cost (USD)', 'Tools'], [
+        (g['group'], g['steps'], f"{g['time_hr']:.2f}", f"{g['cost_usd']:.2f}", g['tools'])
+        for g in d['groups']
+    ])
+    lines += ["", "## Steps", ""]
+    s = d['steps']
+    lines += _md_table(['Group', 'Step', 'Tool', 'CPUs', 'MEM (GB)', 'Storage (MB)', 'Time (hr)',
+                        'Tasks', 'Instance', 'Rate ($/hr)', 'Cost (USD)'], [
+        (group, step, f"{tool} v{version}", f"{cpus:.0f}", f"{mem:.0f}", f"{size:.0f}", f"{time_hr:.2f}",
+         f"{ntask:.0f}", instance, f"{rate:.4f}", f"{total:.4f}")
+        for group, step, tool, version, cpus, mem, size, time_hr, ntask, instance, rate, total, _, _
+        in zip(*(s[col] for col in STEP_COLUMNS))
+    ])
+    return "\n".join(lines) + "\n"
+
+def _pipeline_json(d):
+    data = {key: value for key, value in d.items() if key != 'steps'}
+    steps = d['steps']
+    data['steps'] = [dict(zip(STEP_COLUMNS, values)) for values in zip(*(steps[col] for col in STEP_COLUMNS))]
+    return json.dumps(_native(data), ensure_ascii=False, indent=2) + "\n"
+
+def render_pipeline_report(data, report_format='txt'):
+    """Render pipeline_report_data output in the given format"""
+    renderers = {'txt': _pipeline_txt, 'md': _pipeline_md, 'json': _pipeline_json}
+    if report_format not in renderers:
+        raise ValueError(f"Unknown report format: {report_format} (expected one of {', '.join(REPORT_FORMATS)})")
+    return renderers[report_format](data)
+
+# ---------------------------------------------------------------------------
+# Team summary
+# ---------------------------------------------------------------------------
+
+def summary_report_data(pipeline_df, team):
+    """Collect the team-wide totals, per-job totals and the cost ranking of pipelines"""
+    pipeline_df = pipeline_df.fillna({'직무(업무명)': BLANK_KEY, 'Analysis_name': BLANK_KEY})
+    job_summary = pipeline_df.groupby('직무(업무명)').agg({
+        'total_cost_usd': 'sum',
+        'compute_cost_usd': 'sum',
+        'storage_cost_usd': 'sum',
+        'n_groups': 'sum',
+        'n_steps': 'sum',
+        'total_time_hr': 'sum',
+        'total_storage_gb': 'sum',
+    }).round(2)
+
+    return {
+        'team': team,
+        'n_pipelines': len(pipeline_df),
+        'n_groups': pipeline_df['n_groups'].sum(),
+        'n_steps': pipeline_df['n_steps'].sum(),
+        'total_cost_usd': pipeline_df['total_cost_usd'].sum(),
+        'compute_cost_usd': pipeline_df['compute_cost_usd'].sum(),
+        'storage_cost_usd': pipeline_df['storage_cost_usd'].sum(),
+        'total_time_hr': pipeline_df['total_time_hr'].sum(),
+        'total_storage_gb': pipeline_df['total_storage_gb'].sum(),
+        'total_cpu': pipeline_df['total_cpu'].sum(),
+        'total_mem_gb': pipeline_df['total_mem_gb'].sum(),
+        'by_job': job_summary,
+        'ranked': pipeline_df.sort_values('total_cost_usd', ascending=False).reset_index(drop=True),
+    }
+
+def _sorted_breakdown(groups_breakdown):
+    return sorted(groups_breakdown.items(), key=lambda x: x[1]['total_cost_usd'], reverse=True)
+
+def _summary_txt(d):
+    lines = [
+        "=" * 80,
+        "BIOINFORMATICS PIPELINE COST SUMMARY",
+        f"Team {d['team']} Analysis - AWS Batch Cost Analysis",
+        "=" * 80,
+        "",
+        "OVERVIEW",
+        "-" * 80,
+        f"Total Pipelines: {d['n_pipelines']}",
+        f"Total Groups: {d['n_groups']}",
+        f"Total Steps: {d['n_steps']}",
+        f"Total Cost: ${d['total_cost_usd']:.2f}",
+        f"  - Compute Cost: ${d['compute_cost_usd']:.2f}",
+        f"  - Storage Cost: ${d['storage_cost_usd']:.2f}",
+        f"Total Compute Time: {d['total_time_hr']:.2f} hours",
+        f"Total Storage: {d['total_storage_gb']:.2f} GB",
+        f"Total CPUs: {int(d['total_cpu'])}",
+        f"Total Memory: {int(d['total_mem_gb'])} GB",
+        "",
+        "COST BY JOB TYPE",
+        "-" * 80,
+        d['by_job'].to_string(),
+        "",
+        "ALL PIPELINES RANKED BY COST",
+        "-" * 80,
+        "Rank | Job | Analysis Name | Cost (USD) | Time (hr) | Groups | Steps | Total CPU | Total Mem (GB) | Storage (GB)",
+        "-" * 80,
+    ]
+
+    ranked = d['ranked']
+    columns = ['직무(업무명)', 'Analysis_name', 'total_cost_usd', 'total_time_hr', 'n_groups', 'n_steps',
+               'total_cpu', 'total_mem_gb', 'total_storage_gb']
+    lines += [
+        f"{rank:4} | {job[:10]:10} | {analysis_name[:25]:25} | ${cost:9.2f} | {time_hr:9.1f} | "
+        f"{int(n_groups):6} | {int(n_steps):5} | {int(total_cpu):9} | {int(total_mem):14} | {storage:11.1f}"
+        for rank, (job, analysis_name, cost, time_hr, n_groups, n_steps, total_cpu, total_mem, storage)
+        in enumerate(zip(*(ranked[col].to_numpy(dtype=object) for col in columns)), 1)
+    ]
+    lines += ["", "DETAILED PIPELINE INFORMATION", "=" * 80, ""]
+
+    for rank, row in enumerate(ranked.to_dict('records'), 1):
+        lines += [
+            f"[{rank}] {row['직무(업무명)']} - {row['Analysis_name']}",
+            "-" * 80,
+            f"Pipeline: {row['Pipeline Name']} v{row['Pipeline Version']}",
+            f"Platform: {row['Platform']}",
+            "",
+            "Structure:",
+            f"  Groups: {int(row['n_groups'])}",
+            f"  Steps:  {int(row['n_steps'])}",
+            f"  Tools:  {int(row['n_tools'])}",
+            "",
+            "Resources:",
+            f"  Total CPU:      {int(row['total_cpu'])} cores",
+            f"  Total Memory:   {int(row['total_mem_gb'])} GB",
+            f"  Total Time:     {row['total_time_hr']:.1f} hours",
+            f"  Makespan:       {row['makespan_hr']:.1f} hours (critical path {row['critical_path_hr']:.1f} hours)",
+            f"  Total Storage:  {row['total_storage_gb']:.1f} GB",
+            "",
+            "Cost:",
+            f"  Total:   ${row['total_cost_usd']:.2f}",
+            f"  Compute: ${row['compute_cost_usd']:.2f} ({_percent(row['compute_cost_usd'], row['total_cost_usd']):.1f}%)",
+            f"  Storage: ${row['storage_cost_usd']:.2f} ({_percent(row['storage_cost_usd'], row['total_cost_usd']):.1f}%)",
+            f"  Per Hour: ${row['cost_per_hour']:.2f}/hr",
+            "",
+        ]
+        if row['groups_breakdown']:
+            lines.append("Group Breakdown:")
+            for group_name, group_info in _sorted_breakdown(row['groups_breakdown']):
+                lines += [f"  {group_name}:",
+                          f"    Steps: {group_info['Step']}, Time: {group_info['TIME(hr)']:.1f}h, "
+                          f"Cost: ${group_info['total_cost_usd']:.2f}"]
+        lines.append("")
+
+    lines.append("=" * 80)
+    return "\n".join(lines) + "\n"
+
+def _summary_md(d):
+    lines = [
+        f"# Team {d['team']} Pipeline Cost Summary",
+        "",
+        "## Overview",
+        "",
+    ]
+    lines += _md_table(['Metric', 'Value'], [
+        ('Pipelines', d['n_pipelines']),
+        ('Groups', d['n_groups']),
+        ('Steps', d['n_steps']),
+        ('Total Cost (USD)', f"{d['total_cost_usd']:.2f}"),
+        ('Compute Cost (USD)', f"{d['compute_cost_usd']:.2f}"),
+        ('Storage Cost (USD)', f"{d['storage_cost_usd']:.2f}"),
+        ('Total Compute Time (hr)', f"{d['total_time_hr']:.2f}"),
+        ('Total Storage (GB)', f"{d['total_storage_gb']:.2f}"),
+        ('Total CPUs', int(d['total_cpu'])),
+        ('Total Memory (GB)', int(d['total_mem_gb'])),
+    ])
+
+    by_job = d['by_job']
+    lines += ["", "## Cost by Job Type", ""]
+    lines += _md_table([by_job.index.name] + list(by_job.columns),
+                       [(job, *values) for job, values in zip(by_job.index, by_job.to_numpy(dtype=object))])
+
+    ranked = d['ranked']
+    lines += ["", "## Pipelines Ranked by Cost", ""]
+    lines += _md_table(['Rank', 'Job', 'Analysis Name', 'Cost (USD)', 'Time (hr)', 'Makespan (hr)', 'Groups',
+                        'Steps', 'Total CPU', 'Total Mem (GB)', 'Storage (GB)'], [
+        (rank, row['직무(업무명)'], row['Analysis_name'], f"{row['total_cost_usd']:.2f}",
+         f"{row['total_time_hr']:.1f}", f"{row['makespan_hr']:.1f}", int(row['n_groups']), int(row['n_steps']), int(row['total_cpu']),
+         int(row['total_mem_gb']), f"{row['total_storage_gb']:.1f}")
+        for rank, row in enumerate(ranked.to_dict('records'), 1)
+    ])
+
+    lines += ["", "## Group Breakdown", ""]
+    for rank, row in enumerate(ranked.to_dict('records'), 1):
+        lines += [f"### [{rank}] {row['직무(업무명)']} - {row['Analysis_name']}", "",
+                  f"Pipeline: {row['Pipeline Name']} v{row['Pipeline Version']} ({row['Platform']})", ""]
+        if row['groups_breakdown']:
+            lines += _md_table(['Group', 'Steps', 'Time (hr)', 'Cost (USD)'], [
+                (group_name, info['Step'], f"{info['TIME(hr)']:.1f}", f"{info['total_cost_usd']:.2f}")
+                for group_name, info in _sorted_breakdown(row['groups_breakdown'])
+            ])
+            lines.append("")
+    return "\n".join(lines) + "\n"
+
+def _summary_json(d):
+    data = {key: value for key, value in d.items() if key not in ('by_job', 'ranked')}
+    data['by_job'] = d['by_job'].reset_index().to_dict('records')
+    data['pipelines'] = d['ranked'].to_dict('records')
+    return json.dumps(_native(data), ensure_ascii=False, indent=2) + "\n"
+
+def render_summary_report(data, report_format='txt'):
+    """Render summary_report_data output in the given format"""
+    renderers = {'txt': _summary_txt, 'md': _summary_md, 'json': _summary_json}
+    if report_format not in renderers:
+        raise ValueError(f"Unknown report format: {report_format} (expected one of {', '.join(REPORT_FORMATS)})")
+    return renderers[report_format](data)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Run all three analysis steps for one or more teams in a single process
+- Step 1 (process), Step 2 (costs) and Step 3 (reports) are chained in memory
+- Intermediate files are only written with --write-intermediates, as CSV or
+  in a columnar format chosen with --format
+- Without team arguments, every data/team*/ directory with analysis_raw.csv is processed
+- With --xlsx, step 1 reads each team's sheet of the source workbook instead
+  (see xlsx_ingest.py); without team arguments every team sheet is processed
+- With --jobs N, teams run in parallel worker processes and the remaining
+  workers are shared out to per-pipeline report generation
+- With --incremental, only pipelines whose processed rows changed since the
+  last run are re-costed and get their reports rewritten (see incremental.py)
+- --report-format writes the reports as txt (default), md or json
+- --max-vcpus sets the AWS Batch compute environment size of the wall-clock model
+  and --dependency its step dependency rule (see scheduling.py)
+- --pricing picks the pricing scenario from pricing/scenarios.json
+- --cost-cache reuses costed steps from a persistent SQLite cache (see cost_cache.py),
+  bounded by --cache-max-entries
+- --query-store loads every team's costed steps and pipeline summaries into
+  one SQLite store for cross-team queries (see query_store.py)
+- --validate sets the policy of the validation before costing (see validation.py)
+- --profile writes a JSON run profile per team (see run_profile.py); an explicit
+  path gets a _team{N} suffix when several teams run
+- --quiet / --log-format json change the console output (see console.py)
+"""
+
+import argparse
+import importlib
+import sys
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+
+# Stage scripts have numeric prefixes, so they are loaded through importlib
+SCRIPTS_DIR = Path(__file__).parent
+if str(SCRIPTS_DIR) not in sys.path:
+    sys.path.insert(0, str(SCRIPTS_DIR))
+
+process_data = importlib.import_module('01_process_data')
+calculate_aws_costs = importlib.import_module('02_calculate_aws_costs')
+analyze_pipelines = importlib.import_module('03_analyze_pipelines')
+import console
+import incremental
+from cost_cache import DEFAULT_MAX_ENTRIES, CostCache
+from intermediate_io import FORMATS, intermediate_path, read_intermediate, write_intermediate
+from pricing import DEFAULT_SCENARIO, load_pricing, load_scenarios
+from query_store import DEFAULT_QUERY_STORE, QueryStore
+from report_render import REPORT_FORMATS
+from run_profile import add_profile_arguments, profile_options, profiled, team_profile_path
+from scheduling import DEFAULT_DEPENDENCY, DEFAULT_MAX_VCPUS, DEPENDENCY_RULES
+from validation import DEFAULT_POLICY, VALIDATION_POLICIES, run_validation
+from xlsx_ingest import team_sheets
+
+DATA_DIR = process_data.DATA_DIR
+
+def discover_teams():
+    """Return team numbers that have a raw export under data/"""
+    teams = []
+    for team_dir in DATA_DIR.glob('team*'):
+        suffix = team_dir.name[len('team'):]
+        if suffix.isdigit() and (team_dir / 'analysis_raw.csv').exists():
+            teams.append(int(suffix))
+    return sorted(teams)
+
+def run_team(team, write_intermediates=False, report_jobs=1, fmt='csv', report_format='txt',
+             max_vcpus=DEFAULT_MAX_VCPUS, pricing=DEFAULT_SCENARIO, cost_cache=None, query_store=None,
+             validate=DEFAULT_POLICY, xlsx=None, dependency=DEFAULT_DEPENDENCY, cache_max_entries=DEFAULT_MAX_ENTRIES):
+    """Run steps 1-3 for a team, handing DataFrames from stage to stage in memory"""
+    df = process_data.main(team, save=write_intermediates, fmt=fmt, xlsx=xlsx)
+    df_with_costs = calculate_aws_costs.main(team, df=df, save=write_intermediates, fmt=fmt, pricing=pricing,
+                                             cost_cache=cost_cache, cache_max_entries=cache_max_entries,
+                                             query_store=query_store, validate=validate)
+    df_with_costs, pipeline_df = analyze_pipelines.main(team, df=df_with_costs, jobs=report_jobs,
+                                                        report_format=report_format, max_vcpus=max_vcpus,
+                                                        query_store=query_store, dependency=dependency)
+    return df_with_costs, pipeline_df
+
+def run_team_incremental(team, write_intermediates=False, report_jobs=1, fmt='csv', report_format='txt',
+                         max_vcpus=DEFAULT_MAX_VCPUS, pricing=DEFAULT_SCENARIO, cost_cache=None, query_store=None,
+                         validate=DEFAULT_POLICY, xlsx=None, dependency=DEFAULT_DEPENDENCY,
+                         cache_max_entries=DEFAULT_MAX_ENTRIES):
+    """
+    Run steps 1-3 for a team, re-costing and re-reporting only dirty pipelines.
+
+    The team summary and pipeline_summary.csv are rebuilt from the cached
+    per-pipeline summaries in the manifest plus the re-analyzed pipelines.
+    With query_store, only the dirty and removed pipelines are replaced there.
+    """
+    TEAM_DIR = DATA_DIR / f"team{team}"
+    TEAM_REPORTS_DIR = analyze_pipelines.REPORTS_DIR / f"team{team}"
+    COSTED_FILE = intermediate_path(TEAM_DIR, "analysis_with_costs", fmt)
+
+    df = process_data.main(team, save=write_intermediates, fmt=fmt, xlsx=xlsx)
+
+    manifest = incremental.load_manifest(TEAM_DIR)
+    catalogue = load_pricing(pricing)
+    # The whole table is validated: outliers are judged against every step of a tool
+    if validate != 'off':
+        run_validation(df, team, policy=validate, pricing=catalogue, save=write_intermediates)
+    fingerprint = incremental.pricing_fingerprint(catalogue['ec2'], catalogue['ebs_price_per_gb_hour'])
+    settings = {'report_format': report_format, 'max_vcpus': max_vcpus, 'dependency': dependency}
+    hashes = incremental.hash_pipelines(df)
+    dirty_keys, removed = incremental.diff_manifest(manifest, hashes, fingerprint, settings)
+
+    # Merging clean cost rows needs the previous costed table
+    if write_intermediates and dirty_keys != set(hashes) and not COSTED_FILE.exists():
+        dirty_keys = set(hashes)
+    # So does a query store that has no rows of this team yet
+    if query_store and dirty_keys != set(hashes):
+        store = QueryStore(query_store)
+        try:
+            if not store.has_team(team):
+                dirty_keys = set(hashes)
+        finally:
+            store.close()
+
+    console.banner(f"Incremental run for Team {team}: {len(dirty_keys)} of {len(hashes)} pipelines changed, "
+                   f"{len(removed)} removed", leading_newline=True,
+                   team=team, changed=len(dirty_keys), pipelines=len(hashes), removed=len(removed))
+
+    if not dirty_keys and not removed:
+        console.info("   ✓ Reports are up to date", team=team)
+        return None, pd.DataFrame([entry['summary'] for entry in manifest['pipelines']])
+
+    keys = pd.Series([incremental.pipeline_key(*key) for key in zip(df['직무(업무명)'], df['Analysis_name'])],
+                     index=df.index)
+    dirty_df = df[keys.isin(dirty_keys)].reset_index(drop=True)
+
+    if len(dirty_df):
+        cache = CostCache(Path(cost_cache), max_entries=cache_max_entries) if cost_cache else None
+        try:
+            df_with_costs = calculate_aws_costs.calculate_costs(dirty_df, team, pricing=catalogue, cache=cache)
+        finally:
+            if cache:
+                cache.close()
+        pipeline_df = analyze_pipelines.analyze_pipeline_structure(df_with_costs, max_vcpus=max_vcpus,
+                                                                 dependency=dependency)
+        report_files = analyze_pipelines.generate_pipeline_reports(df_with_costs, pipeline_df, team,
+                                                                   jobs=report_jobs, report_format=report_format)
+    else:
+        df_with_costs = dirty_df
+        pipeline_df = pd.DataFrame()
+        report_files = []
+
+    if write_intermediates:
+        if dirty_keys == set(hashes):
+            full_costed = df_with_costs
+        else:
+            previous = read_intermediate(COSTED_FILE, fmt)
+            full_costed = incremental.merge_costed_rows(df, df_with_costs, previous, dirty_keys)
+        write_intermediate(full_costed, COSTED_FILE, fmt)
+        console.info(f"   ✓ Saved cost analysis: {COSTED_FILE}", path=COSTED_FILE)
+
+    # Drop reports of pipelines that no longer exist
+    current_files = {analyze_pipelines.pipeline_report_filename(*key, report_format) for key in hashes}
+    for entry in removed:
+        if entry['report_file'] not in current_files:
+            (TEAM_REPORTS_DIR / entry['report_file']).unlink(missing_ok=True)
+            console.info(f"   ✓ Removed: {entry['report_file']}", path=entry['report_file'])
+
+    if query_store:
+        # Every pipeline dirty: the team's rows are replaced as a whole
+        replaced = None if dirty_keys == set(hashes) else \
+            dirty_keys | {(entry['job'], entry['analysis_name']) for entry in removed}
+        calculate_aws_costs.load_query_store(query_store, team, df_with_costs, pricing, pipelines=replaced)
+
+    manifest, full_pipeline_df = incremental.update_manifest(manifest, hashes, fingerprint,
+                                                             pipeline_df, report_files, settings)
+    analyze_pipelines.generate_summary_reports(full_pipeline_df, team, report_format=report_format)
+    if query_store:
+        analyze_pipelines.load_query_store(query_store, team, full_pipeline_df)
+    incremental.save_manifest(TEAM_DIR, manifest)
+
+    return df_with_costs, full_pipeline_df
+
+def run_team_profiled(team_runner, profile, team, *args):
+    """Run team_runner for a team, inside a run profile when profile (profiled() options) is given"""
+    with profiled(team, 'pipeline', **profile) if profile else nullcontext():
+        return team_runner(team, *args)
+
+def main(teams=None, write_intermediates=False, jobs=1, incremental_run=False, fmt='csv',
+         report_format='txt', max_vcpus=DEFAULT_MAX_VCPUS, pricing=DEFAULT_SCENARIO, cost_cache=None,
+         profile=None, query_store=None, validate=DEFAULT_POLICY, xlsx=None, dependency=DEFAULT_DEPENDENCY,
+         cache_max_entries=DEFAULT_MAX_ENTRIES):
+    if not teams:
+        teams = sorted(team_sheets(xlsx)) if xlsx else discover_teams()
+
+    team_runner = run_team_incremental if incremental_run else run_team
+
+    # One explicit profile path would be overwritten by every team in turn
+    if profile and profile['path'] and len(teams) > 1:
+        profiles = {team: {**profile, 'path': team_profile_path(profile['path'], team)} for team in teams}
+    else:
+        profiles = dict.fromkeys(teams, profile)
+
+    results = {}
+    if jobs > 1 and len(teams) > 1:
+        # One worker per team (up to jobs); leftover cores go to report rendering
+        team_workers = min(jobs, len(teams))
+        report_jobs = max(1, jobs // team_workers)
+        with ProcessPoolExecutor(max_workers=team_workers, initializer=console.configure,
+                                 initargs=console.settings()) as executor:
+            futures = {team: executor.submit(run_team_profiled, team_runner, profiles[team], team, write_intermediates,
+                                             report_jobs, fmt, report_format, max_vcpus, pricing, cost_cache,
+                                             query_store, validate, xlsx, dependency, cache_max_entries)
+                       for team in teams}
+            for team in teams:
+                results[team] = futures[team].result()
+    else:
+        for team in teams:
+            results[team] = run_team_profiled(team_runner, profiles[team], team, write_intermediates, jobs, fmt,
+                                              report_format, max_vcpus, pricing, cost_cache, query_store,
+                                              validate, xlsx, dependency, cache_max_entries)
+
+    console.banner(f"All steps complete for teams: {', '.join(str(t) for t in teams)}", leading_newline=True,
+                   teams=teams)
+
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run processing, cost calculation and reporting for one or more teams')
+    parser.add_argument('teams', type=int, nargs='*', help='Team numbers (default: all teams under data/)')
+    parser.add_argument('--write-intermediates', action='store_true',
+                        help='Also save analysis_processed.csv and analysis_with_costs.csv')
+    parser.add_argument('--jobs', type=int, default=1,
+                        help='Worker processes shared by teams and report generation (default: 1)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only re-cost and re-report pipelines whose rows changed since the last run')
+    parser.add_argument('--format', choices=FORMATS, default='csv',
+                        help='Format of the intermediate files (default: csv)')
+    parser.add_argument('--report-format', choices=REPORT_FORMATS, default='txt',
+                        help='Format of the report files (default: txt)')
+    parser.add_argument('--max-vcpus', type=int, default=DEFAULT_MAX_VCPUS,
+                        help=f'vCPUs of the AWS Batch compute environment for the wall-clock model (default: {DEFAULT_MAX_VCPUS})')
+    parser.add_argument('--dependency', choices=DEPENDENCY_RULES, default=DEFAULT_DEPENDENCY,
+                        help='Step dependencies of the wall-clock model: chain (steps of a group in sheet order, '
+                             'groups in parallel; default) or layered (steps of a group together, groups in sheet order)')
+    parser.add_argument('--pricing', choices=list(load_scenarios()), default=DEFAULT_SCENARIO,
+                        help=f'Pricing scenario from pricing/scenarios.json (default: {DEFAULT_SCENARIO})')
+    parser.add_argument('--cost-cache', nargs='?', const=calculate_aws_costs.DEFAULT_COST_CACHE, default=None,
+                        metavar='PATH', help='Reuse costs of steps with the same resources from a SQLite cache '
+                                             '(default path: data/cost_cache.sqlite)')
+    parser.add_argument('--cache-max-entries', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help=f'Evict least recently used cache entries beyond this many (default: {DEFAULT_MAX_ENTRIES})')
+    parser.add_argument('--query-store', nargs='?', const=DEFAULT_QUERY_STORE, default=None, metavar='PATH',
+                        help='Also load costed steps and pipeline summaries into the cross-team query store '
+                             '(default path: data/query_store.sqlite)')
+    parser.add_argument('--validate', choices=VALIDATION_POLICIES, default=DEFAULT_POLICY,
+                        help='Validation of the processed data before costing: warn (default), fail on errors, '
+                             'strict (fail on any issue) or off')
+    parser.add_argument('--xlsx', default=None, metavar='WORKBOOK',
+                        help='Read step 1 input from the team sheets of the source workbook instead of analysis_raw.csv')
+    add_profile_arguments(parser)
+    console.add_log_arguments(parser)
+    args = parser.parse_args()
+    console.configure_from_args(args)
+
+    try:
+        results = main(args.teams, write_intermediates=args.write_intermediates, jobs=args.jobs,
+                       incremental_run=args.incremental, fmt=args.format, report_format=args.report_format,
+                       max_vcpus=args.max_vcpus, pricing=args.pricing, cost_cache=args.cost_cache,
+                       cache_max_entries=args.cache_max_entries, profile=profile_options(args),
+                       query_store=args.query_store, validate=args.validate, xlsx=args.xlsx,
+                       dependency=args.dependency)
+    except ValueError as e:
+        # validation.ValidationError, or a team without a sheet in --xlsx
+        sys.exit(str(e))
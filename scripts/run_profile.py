@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Run profile: where time and memory go in a run
+- timed(name) marks a stage or sub-step (context manager or decorator); nested
+  marks are recorded as 'step2/instance_selection', repeated ones accumulate
+- profiled(team, label, path) collects the marks of one team's run and writes
+  them as JSON (default data/team{N}/run_profile_{label}.json); an explicit
+  path shared by several teams gets a _team{N} suffix (team_profile_path)
+- Every mark records wall time, calls and the peak RSS so far; with memory=True
+  also the tracemalloc peak inside the mark; with cprofile=True the whole run
+  is profiled with cProfile (.prof file next to the JSON, top functions in it)
+- Without an active profile, timed() only costs a function call
+"""
+
+import cProfile
+import io
+import json
+import platform
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+import console
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DATA_DIR = PROJECT_ROOT / "data"
+
+# Number of functions (by cumulative time) kept in the JSON with cprofile=True
+TOP_FUNCTIONS = 25
+
+# The profile being collected in this process, if any
+_active = None
+
+def _max_rss_mb():
+    """Peak resident set size of this process so far"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+@contextmanager
+def timed(name):
+    """
+    Record the wall time (and memory) of a block under name.
+
+    Yields the mark's record, so callers can attach counters such as rows.
+    """
+    profile = _active
+    if profile is None:
+        yield {}
+        return
+
+    path = '/'.join(profile['stack'] + [name])
+    record = profile['marks'].setdefault(path, {'seconds': 0.0, 'calls': 0})
+    profile['stack'].append(name)
+    if profile['memory']:
+        # The enclosing mark keeps the peak seen so far; this mark starts fresh
+        profile['peaks'][-1] = max(profile['peaks'][-1], tracemalloc.get_traced_memory()[1])
+        profile['peaks'].append(0)
+        tracemalloc.reset_peak()
+
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['seconds'] += time.perf_counter() - start
+        record['calls'] += 1
+        record['max_rss_mb'] = round(_max_rss_mb(), 1)
+        profile['stack'].pop()
+        if profile['memory']:
+            peak = max(profile['peaks'].pop(), tracemalloc.get_traced_memory()[1])
+            record['tracemalloc_peak_mb'] = round(max(record.get('tracemalloc_peak_mb', 0), peak / (1024 * 1024)), 1)
+            profile['peaks'][-1] = max(profile['peaks'][-1], peak)
+            tracemalloc.reset_peak()
+
+def default_profile_path(team, label):
+    return DATA_DIR / f"team{team}" / f"run_profile_{label}.json"
+
+def team_profile_path(path, team):
+    """Per-team variant of an explicit profile path: run.json → run_team2.json"""
+    path = Path(path)
+    return path.with_name(f"{path.stem}_team{team}{path.suffix}")
+
+@contextmanager
+def profiled(team, label, path=None, memory=False, cprofile=False):
+    """
+    Collect a run profile of the enclosed block and write it as JSON.
+
+    label names the entry point (step1, step2, step3, pipeline). path None
+    disables profiling; '' selects the default path. Nested calls (a stage
+    run by run_pipeline) record into the outer profile.
+    """
+    global _active
+    if path is None or _active is not None:
+        yield
+        return
+
+    path = Path(path) if path else default_profile_path(team, label)
+    _active = {'stack': [], 'marks': {}, 'memory': memory, 'peaks': [0]}
+    if memory:
+        tracemalloc.start()
+    profiler = cProfile.Profile() if cprofile else None
+
+    started = datetime.now()
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        total = time.perf_counter() - start
+        profile, _active = _active, None
+
+        result = {
+            'team': team,
+            'entry_point': label,
+            'command': sys.argv,
+            'started_at': started.isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'total_seconds': round(total, 6),
+            'max_rss_mb': round(_max_rss_mb(), 1),
+            'stages': [{'name': name, **{key: round(value, 6) if key == 'seconds' else value
+                                         for key, value in record.items()}}
+                       for name, record in profile['marks'].items()],
+        }
+        if memory:
+            result['tracemalloc_peak_mb'] = round(max(profile['peaks'][0],
+                                                      tracemalloc.get_traced_memory()[1]) / (1024 * 1024), 1)
+            tracemalloc.stop()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if profiler:
+            prof_file = path.with_suffix('.prof')
+            profiler.dump_stats(prof_file)
+            result['cprofile'] = {'stats_file': str(prof_file), 'top_functions': _top_functions(profiler)}
+
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        console.info(f"\n   ✓ Saved run profile: {path}", path=path)
+
+def _top_functions(profiler):
+    """The TOP_FUNCTIONS functions with the highest cumulative time"""
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, function), (_, calls, own, cumulative, _) in stats.stats.items():
+        rows.append({'function': f"{Path(filename).name}:{line}({function})", 'calls': calls,
+                     'own_seconds': round(own, 6), 'cumulative_seconds': round(cumulative, 6)})
+    rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+def add_profile_arguments(parser):
+    """The --profile, --profile-memory and --cprofile options shared by the scripts"""
+    parser.add_argument('--profile', nargs='?', const='', default=None, metavar='PATH',
+                        help='Write a JSON run profile (default path: data/team{N}/run_profile_<script>.json)')
+    parser.add_argument('--profile-memory', action='store_true',
+                        help='Also record tracemalloc peaks per stage in the run profile (slower)')
+    parser.add_argument('--cprofile', action='store_true',
+                        help='Also capture a cProfile of the run (.prof next to the run profile)')
+
+def profile_options(args):
+    """profiled() keyword arguments from the parsed options; --profile-memory / --cprofile imply --profile"""
+    path = args.profile
+    if path is None and (args.profile_memory or args.cprofile):
+        path = ''
+    return {'path': path, 'memory': args.profile_memory, 'cprofile': args.cprofile}
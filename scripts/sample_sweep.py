@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Sample-count sweep on top of the stage 2 costs
+- Each catalogue row describes one reference run (one sample); a scaling rule
+  per step projects it to N samples:
+  * linear: nTask(병렬) × N tasks of unchanged runtime, storage × N
+  * fixed: unchanged (reference builds, reports)
+  * per_chromosome: one task per chromosome, each running the per-sample work
+    of all N samples for its chromosome (joint calling), storage × N
+- Rules come from a CSV with columns 직무(업무명), Analysis_name, Group, Step
+  (blank = any) and rule; later rows override earlier ones, default is linear
+- The whole (steps × sample counts) grid is computed with broadcast arrays
+"""
+
+import numpy as np
+import pandas as pd
+
+SCALING_RULES = ('linear', 'fixed', 'per_chromosome')
+RULE_MATCH_COLUMNS = ['직무(업무명)', 'Analysis_name', 'Group', 'Step']
+
+DEFAULT_SAMPLE_COUNTS = [10, 100, 1000, 10000]
+DEFAULT_CHROMOSOMES = 24
+
+def load_scaling_rules(path):
+    """Read a scaling rule CSV and check the rule names"""
+    rules = pd.read_csv(path, encoding='utf-8', dtype=str)
+    if 'rule' not in rules.columns:
+        raise ValueError(f"{path}: missing 'rule' column")
+    unknown = set(rules['rule'].dropna()) - set(SCALING_RULES)
+    if unknown:
+        raise ValueError(f"{path}: unknown scaling rules {sorted(unknown)} (expected one of {', '.join(SCALING_RULES)})")
+    return rules
+
+def resolve_rules(df, rules=None):
+    """Scaling rule of every step: the last matching rule row, linear if none matches"""
+    resolved = np.full(len(df), 'linear', dtype=object)
+    if rules is None:
+        return resolved
+    for _, rule in rules.iterrows():
+        match = np.ones(len(df), dtype=bool)
+        for col in RULE_MATCH_COLUMNS:
+            if col in rules.columns and pd.notna(rule[col]) and rule[col] != '':
+                match &= (df[col].astype(str) == rule[col]).to_numpy()
+        resolved[match] = rule['rule']
+    return resolved
+
+def sweep_costs(df, sample_counts, ebs_price_per_gb_hour, rules=None, chromosomes=DEFAULT_CHROMOSOMES):
+    """
+    Project the costed steps in df to every sample count.
+
+    df needs the stage 2 columns (instance_hourly_rate); rules is a DataFrame
+    from load_scaling_rules. Returns a tidy table with one row per
+    (직무, Analysis_name, samples): tasks, task-hours and costs.
+    """
+    if min(sample_counts) < 1:
+        raise ValueError(f"Sample counts must be at least 1 (got {', '.join(map(str, sample_counts))})")
+    if chromosomes < 1:
+        raise ValueError(f"Chromosome fan-out must be at least 1 (got {chromosomes})")
+    samples = np.asarray(sample_counts, dtype=float)[None, :]
+    rule = resolve_rules(df, rules)[:, None]
+    linear, fixed, per_chrom = rule == 'linear', rule == 'fixed', rule == 'per_chromosome'
+
+    rate = df['instance_hourly_rate'].fillna(0.0).to_numpy(dtype=float)[:, None]
+    time_hr = df['TIME(hr)'].fillna(0.0).to_numpy(dtype=float)[:, None]
+    n_task = df['nTask(병렬)'].fillna(1).to_numpy(dtype=float)[:, None]
+    storage_gb = df['SIZE(MB)'].fillna(0.0).to_numpy(dtype=float)[:, None] / 1024
+
+    # (steps × sample counts) grids
+    tasks = np.where(linear, n_task * samples, np.where(per_chrom, float(chromosomes), n_task))
+    task_time = np.where(per_chrom, time_hr * n_task * samples / chromosomes, time_hr)
+    task_time = np.broadcast_to(task_time, tasks.shape)
+    volume = np.where(fixed, storage_gb, storage_gb * samples)
+
+    compute = rate * task_time * tasks
+    storage = np.where(volume > 0, volume * task_time * ebs_price_per_gb_hour, 0.0)
+
+    keys = ['직무(업무명)', 'Analysis_name']
+    grid = pd.DataFrame(
+        np.concatenate([tasks, task_time * tasks, compute, storage], axis=1),
+        columns=pd.MultiIndex.from_product([['n_tasks', 'task_hours', 'compute_cost_usd', 'storage_cost_usd'],
+                                            list(sample_counts)]),
+        index=pd.MultiIndex.from_frame(df[keys]))
+    per_pipeline = grid.groupby(level=keys, observed=True).sum()
+
+    tidy = per_pipeline.stack(level=1, future_stack=True).rename_axis(keys + ['samples']).reset_index()
+    tidy['total_cost_usd'] = tidy['compute_cost_usd'] + tidy['storage_cost_usd']
+    tidy['cost_per_sample_usd'] = tidy['total_cost_usd'] / tidy['samples']
+    return tidy[keys + ['samples', 'n_tasks', 'task_hours', 'compute_cost_usd', 'storage_cost_usd',
+                        'total_cost_usd', 'cost_per_sample_usd']]
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Wall-clock model of a pipeline run on AWS Batch
+- Dependency DAG from the sheet layout, by rule (--dependency):
+  chain (default): the steps of a Group run one after another in Step (sheet)
+  order, and different Groups are independent branches that run in parallel;
+  layered: the steps of a Group run concurrently, and a Group starts once the
+  previous Group (in sheet order) has finished
+- Critical-path makespan with unlimited capacity
+- Event simulation of the nTask(병렬) tasks of every step on a compute
+  environment capped at max_vcpus: makespan, peak concurrency and utilization
+"""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+# maxvCpus of the AWS Batch compute environment
+DEFAULT_MAX_VCPUS = 256
+
+DEPENDENCY_RULES = ['chain', 'layered']
+DEFAULT_DEPENDENCY = 'chain'
+
+SCHEDULE_COLUMNS = ['critical_path_hr', 'makespan_hr', 'peak_tasks', 'peak_vcpus', 'utilization']
+
+def build_dag(groups, dependency=DEFAULT_DEPENDENCY):
+    """
+    Dependency DAG of the steps of a pipeline.
+
+    groups is the Group value of every step in sheet order. Returns
+    (blocks, after): blocks are position arrays of steps that become ready
+    together, after[b] the blocks that must finish before block b starts.
+    Predecessors always come earlier in blocks.
+    """
+    codes, _ = pd.factorize(pd.Series(groups), use_na_sentinel=False)
+    if dependency == 'layered':
+        order = np.argsort(codes, kind='stable')
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        blocks = np.split(order, bounds) if len(order) else []
+        return blocks, [[b - 1] if b else [] for b in range(len(blocks))]
+
+    # chain: every step waits for the previous step of its Group
+    blocks = [np.array([i]) for i in range(len(codes))]
+    after = []
+    last = {}
+    for i, code in enumerate(codes):
+        after.append([last[code]] if code in last else [])
+        last[code] = i
+    return blocks, after
+
+def earliest_starts(blocks, after, duration):
+    """(start, finish) of every block with unlimited capacity"""
+    start = np.zeros(len(blocks))
+    finish = np.zeros(len(blocks))
+    for b, steps in enumerate(blocks):
+        start[b] = max((finish[p] for p in after[b]), default=0.0)
+        finish[b] = start[b] + duration[steps].max()
+    return start, finish
+
+def simulate_dag(blocks, after, duration, vcpus, n_tasks, max_vcpus):
+    """
+    Run the tasks of a pipeline on max_vcpus vCPUs, respecting the DAG.
+
+    A block is released when all its predecessors have finished. Ready steps
+    are started longest first; all tasks of a step are identical, so as many
+    of them as fit are started together. Smaller steps backfill free vCPUs.
+    Returns (makespan, peak running tasks, peak vCPUs in use).
+    """
+    waiting = [len(preds) for preds in after]
+    successors = [[] for _ in blocks]
+    for b, preds in enumerate(after):
+        for p in preds:
+            successors[p].append(b)
+    # Per block: steps not finished yet; per step: tasks not started / running
+    open_steps = [len(steps) for steps in blocks]
+    block_of = {int(i): b for b, steps in enumerate(blocks) for i in steps}
+    to_start = {int(i): int(n_tasks[i]) for steps in blocks for i in steps}
+    running_tasks = dict.fromkeys(to_start, 0)
+
+    ready = []
+    released = [b for b in range(len(blocks)) if not waiting[b]]
+    running = []
+    now = 0.0
+    free = max_vcpus
+    tasks = 0
+    peak_tasks = 0
+    peak_vcpus = 0
+
+    while released or ready or running:
+        # Release blocks; steps without tasks finish on release
+        while released:
+            b = released.pop()
+            for i in blocks[b]:
+                i = int(i)
+                if to_start[i] > 0:
+                    ready.append(i)
+                    continue
+                open_steps[b] -= 1
+            if not open_steps[b]:
+                for s in successors[b]:
+                    waiting[s] -= 1
+                    if not waiting[s]:
+                        released.append(s)
+        if not ready and not running:
+            continue
+
+        ready.sort(key=lambda i: -duration[i])
+        for i in ready:
+            k = min(to_start[i], free // vcpus[i])
+            if k > 0:
+                heapq.heappush(running, (now + duration[i], i, k))
+                free -= vcpus[i] * k
+                tasks += k
+                to_start[i] -= k
+                running_tasks[i] += k
+        ready = [i for i in ready if to_start[i] > 0]
+        peak_tasks = max(peak_tasks, tasks)
+        peak_vcpus = max(peak_vcpus, max_vcpus - free)
+
+        # Advance to the next completion and release everything finishing then
+        now = running[0][0]
+        while running and running[0][0] == now:
+            _, i, k = heapq.heappop(running)
+            free += vcpus[i] * k
+            tasks -= k
+            running_tasks[i] -= k
+            if not to_start[i] and not running_tasks[i]:
+                b = block_of[i]
+                open_steps[b] -= 1
+                if not open_steps[b]:
+                    for s in successors[b]:
+                        waiting[s] -= 1
+                        if not waiting[s]:
+                            released.append(s)
+
+    return now, peak_tasks, peak_vcpus
+
+def schedule_pipeline(groups, duration, vcpus, n_tasks, max_vcpus=DEFAULT_MAX_VCPUS, dependency=DEFAULT_DEPENDENCY):
+    """
+    Critical path and capacity-limited schedule of one pipeline.
+
+    duration is the per-task runtime in hours, vcpus the vCPUs of one task
+    and n_tasks the number of parallel tasks of each step.
+    """
+    blocks, after = build_dag(groups, dependency)
+    _, finish = earliest_starts(blocks, after, duration)
+    critical_path = finish.max() if len(finish) else 0.0
+    makespan, peak_tasks, peak_vcpus = simulate_dag(blocks, after, duration, vcpus, n_tasks, max_vcpus)
+
+    busy = float((duration * vcpus * n_tasks).sum())
+    return {
+        'critical_path_hr': float(critical_path),
+        'makespan_hr': float(makespan),
+        'peak_tasks': int(peak_tasks),
+        'peak_vcpus': int(peak_vcpus),
+        'utilization': busy / (max_vcpus * makespan) if makespan > 0 else 0.0,
+    }
+
+def step_start_times(df, keys, dependency=DEFAULT_DEPENDENCY):
+    """Earliest start (hours, unlimited capacity) of every row of df within its pipeline"""
+    duration = df['TIME(hr)'].fillna(0.0).to_numpy(dtype=float)
+    groups = df['Group'].to_numpy(dtype=object)
+    starts = np.zeros(len(df))
+    for rows in df.groupby(keys, observed=True, dropna=False).indices.values():
+        blocks, after = build_dag(groups[rows], dependency)
+        block_start, _ = earliest_starts(blocks, after, duration[rows])
+        for b, steps in enumerate(blocks):
+            starts[rows[steps]] = block_start[b]
+    return starts
+
+def schedule_pipelines(df, keys, max_vcpus=DEFAULT_MAX_VCPUS, dependency=DEFAULT_DEPENDENCY):
+    """
+    Schedule every pipeline of a costed/processed table.
+
+    Missing TIME(hr) counts as 0 hours and missing nTask(병렬) as one task,
+    as in the cost calculation; a task needs ceil(CPUs) vCPUs (at least 1,
+    at most max_vcpus). Returns {pipeline key: schedule_pipeline result}.
+    """
+    duration = df['TIME(hr)'].fillna(0.0).to_numpy(dtype=float)
+    vcpus = np.clip(np.ceil(df['CPUs'].fillna(1).to_numpy(dtype=float)), 1, max_vcpus).astype(np.int64)
+    n_tasks = np.ceil(df['nTask(병렬)'].fillna(1).to_numpy(dtype=float)).astype(np.int64)
+    groups = df['Group'].to_numpy(dtype=object)
+
+    positions = df.groupby(keys, observed=True, dropna=False).indices
+    return {key: schedule_pipeline(groups[rows], duration[rows], vcpus[rows], n_tasks[rows], max_vcpus, dependency)
+            for key, rows in positions.items()}
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Synthetic analysis_raw.csv generator for benchmarks
+- Same columns as the Google Sheets export, including the Korean headers
+- Merged cells: job/pipeline columns are only filled on the first row of a
+  pipeline and Group on the first row of a group, as in the sheet export
+- SIZE(MB) uses thousands separators ("59,463"), a few cells are '-' or blank,
+  and some tools/version cells span several lines
+- Pipelines have about 18 steps in runs of 1-3 steps per Group, like the team
+  catalogues; CPU, memory, runtime and fan-out follow their distributions
+- Rows are generated in chunks of whole pipelines, so 10M-row files are
+  written with bounded memory
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+RAW_COLUMNS = ['idx', '직무(업무명)', '업무세부내역', 'Analysis_name', 'Platfom', 'Pipeline Name',
+               'Pipeline Version', 'Group', 'Step', 'tools', 'version', 'CPUs', 'MEM(G)', 'TIME(hr)',
+               'nTask(병렬)', 'SIZE(MB)', 'USER', '비고']
+
+# (직무, 업무세부내역, Platfom, Pipeline Name, Pipeline Version, weight)
+JOBS = [
+    ('Whole Genome Sequencing', 'Human 기본 분석', 'Illumina NovaSeq X', 'gatk-germline-wgs', '4.5.0', 0.30),
+    ('Whole Genome Sequencing', 'Human 기본 분석', 'PacBio Revio', 'Hifi-human-WGS-WDL', '3.1.0', 0.10),
+    ('Whole Exome Sequencing', 'Human 기본 분석', 'Illumina NovaSeq 6000', 'gatk-germline-wes', '4.4.0', 0.20),
+    ('Pangenome', 'Graph 구축', 'PacBio Revio', 'minigraph-cactus', '2.8.1', 0.05),
+    ('DNA Chip', 'Genotyping', 'Axiom PMRA', 'apt-genotype-axiom', '2.11.6', 0.10),
+    ('커스텀 분석', 'GWAS', 'Multi-platform', 'custom-gwas', '1.2.0', 0.20),
+    ('단백질 데이터 통계 분석', 'Proteomics QC', 'Olink Explore', 'olink-stats', '0.9.1', 0.05),
+]
+
+GROUPS = ['upstream', 'preprocess', 'alignment', 'variant_calling', 'joint_genotyping', 'annotation',
+          'downstream', 'qc', 'tertiary', 'consolidate', 'report']
+
+# (Step, tools, version)
+STEPS = [
+    ('fastqc', 'fastqc', '0.12.1'),
+    ('bwa_align', 'picard SamToFastq\nbwa mem\npicard MergeBamAlignment', '3.1.0\n0.7.17\n3.1.0'),
+    ('mark_duplicates', 'gatk MarkDuplicates', '4.5.0'),
+    ('base_recalibrator', 'gatk BaseRecalibrator', '4.5.0'),
+    ('haplotype_caller', 'gatk HaplotypeCaller', '4.5.0'),
+    ('genotype_gvcfs', 'gatk GenotypeGVCFs', '4.5.0'),
+    ('variant_recalibrator', 'gatk VariantRecalibrator', '4.5.0'),
+    ('gather_vcfs', 'gatk GatherVcfsCloud', '4.5.0'),
+    ('bam_stats', 'samtools', '1.20'),
+    ('bam_to_fastq', 'samtools', '1.21'),
+    ('collect_metrics', 'picard CollectMultipleMetrics', '3.1.0'),
+    ('bcftools_stats', 'bcftools', '1.20'),
+    ('filter_vcf', 'bcftools\nmosdepth', '1.20\n0.3.9'),
+    ('pbmm2_align', 'pbmm2', '1.17.0'),
+    ('deepvariant', 'deepvariant', '1.9.0'),
+    ('plink_qc', 'plink', '1.9'),
+    ('association', 'R', '4.3.2'),
+    ('summary_stats', 'python', '3.9'),
+    ('merge_tables', 'bash', '5.1'),
+    ('multiqc', 'multiqc', '1.21'),
+]
+
+USERS = ['김연구', '이분석', '박윤기', '최유전', '정단백']
+
+CPU_CHOICES = [1, 2, 4, 8, 16, 32, 64]
+CPU_WEIGHTS = [0.21, 0.39, 0.17, 0.05, 0.12, 0.03, 0.03]
+
+DEFAULT_STEPS_PER_PIPELINE = 18
+DEFAULT_CHUNK_ROWS = 500_000
+
+def _pipeline_lengths(rng, n_rows, steps_per_pipeline):
+    """Step counts of consecutive pipelines (2-46 steps) adding up to n_rows"""
+    lengths = []
+    total = 0
+    while total < n_rows:
+        batch = np.clip(rng.geometric(1 / steps_per_pipeline, size=max(16, (n_rows - total) // steps_per_pipeline + 1)),
+                        2, 46)
+        lengths.append(batch)
+        total += int(batch.sum())
+    lengths = np.concatenate(lengths)
+    ends = np.cumsum(lengths)
+    keep = int(np.searchsorted(ends, n_rows)) + 1
+    lengths = lengths[:keep]
+    lengths[-1] -= int(ends[keep - 1] - n_rows)
+    return lengths
+
+def generate_chunk(rng, n_rows, first_idx=1, first_pipeline=0, steps_per_pipeline=DEFAULT_STEPS_PER_PIPELINE):
+    """
+    n_rows rows of whole pipelines, as the sheet export writes them (all text).
+
+    first_idx and first_pipeline continue the idx column and pipeline numbering
+    of earlier chunks. Returns (DataFrame, number of pipelines).
+    """
+    lengths = _pipeline_lengths(rng, n_rows, steps_per_pipeline)
+    n_pipelines = len(lengths)
+    pipeline = np.repeat(np.arange(n_pipelines), lengths)
+    pipeline_start = np.zeros(n_rows, dtype=bool)
+    pipeline_start[np.concatenate([[0], np.cumsum(lengths)[:-1]])] = True
+
+    # Groups: runs of 1-3 steps, always restarting with a pipeline
+    group_start = pipeline_start | (rng.random(n_rows) < 0.58)
+    group_no = np.cumsum(group_start)
+    group_no -= np.repeat(group_no[pipeline_start], lengths)
+    group_base = np.repeat(rng.integers(0, len(GROUPS), n_pipelines), lengths)
+    groups = np.array(GROUPS, dtype=object)[(group_base + group_no) % len(GROUPS)]
+
+    # Pipeline-level columns
+    weights = np.array([job[-1] for job in JOBS])
+    job_of = rng.choice(len(JOBS), size=n_pipelines, p=weights / weights.sum())
+    job_cols = {col: np.array([job[i] for job in JOBS], dtype=object)[job_of]
+                for i, col in enumerate(['직무(업무명)', '업무세부내역', 'Platfom', 'Pipeline Name', 'Pipeline Version'])}
+    numbers = np.arange(first_pipeline, first_pipeline + n_pipelines).astype(str)
+    job_cols['Analysis_name'] = job_cols['Platfom'] + ' ' + job_cols['직무(업무명)'] + ' #' + numbers.astype(object)
+
+    steps = rng.integers(0, len(STEPS), n_rows)
+    step_names, tools, versions = (np.array([s[i] for s in STEPS], dtype=object)[steps] for i in range(3))
+
+    cpus = rng.choice(CPU_CHOICES, size=n_rows, p=CPU_WEIGHTS)
+    mem = cpus * rng.choice([1, 2, 4, 8], size=n_rows, p=[0.15, 0.45, 0.25, 0.15]).astype(float)
+    mem = np.where(rng.random(n_rows) < 0.05, mem - 0.5, mem)
+    time_hr = np.maximum(0.1, np.round(rng.lognormal(0.0, 1.2, n_rows), 1))
+    n_task = np.where(rng.random(n_rows) < 0.85, 1, rng.integers(2, 48, n_rows))
+    size_mb = np.maximum(1, rng.lognormal(3.0, 3.0, n_rows)).astype(np.int64)
+
+    def blank_except(values, starts):
+        return np.where(starts, values, '')
+
+    df = pd.DataFrame({
+        'idx': np.arange(first_idx, first_idx + n_rows),
+        **{col: blank_except(np.repeat(values, lengths), pipeline_start)
+           for col, values in [('직무(업무명)', job_cols['직무(업무명)']), ('업무세부내역', job_cols['업무세부내역']),
+                               ('Analysis_name', job_cols['Analysis_name']), ('Platfom', job_cols['Platfom']),
+                               ('Pipeline Name', job_cols['Pipeline Name']),
+                               ('Pipeline Version', job_cols['Pipeline Version'])]},
+        'Group': blank_except(groups, group_start),
+        'Step': step_names,
+        'tools': tools,
+        'version': versions,
+        'CPUs': cpus,
+        'MEM(G)': mem,
+        'TIME(hr)': time_hr,
+        'nTask(병렬)': n_task,
+        'SIZE(MB)': pd.Series(size_mb).map('{:,}'.format).to_numpy(dtype=object),
+        'USER': blank_except(np.array(USERS, dtype=object)[rng.integers(0, len(USERS), n_rows)], pipeline_start),
+        '비고': blank_except(np.where(rng.random(n_rows) < 0.3, 'WGS, 40x 기준', ''), pipeline_start),
+    }, columns=RAW_COLUMNS)
+
+    # A few unparseable or empty resource cells, as in hand-edited sheets
+    for col, marker in [('SIZE(MB)', '-'), ('TIME(hr)', ''), ('MEM(G)', '-')]:
+        holes = rng.random(n_rows) < 0.01
+        df[col] = df[col].astype(object)
+        df.loc[holes, col] = marker
+
+    return df, n_pipelines
+
+def write_catalogue(path, rows, seed=0, chunk_rows=DEFAULT_CHUNK_ROWS, steps_per_pipeline=DEFAULT_STEPS_PER_PIPELINE):
+    """Write a synthetic analysis_raw.csv of rows rows; returns the number of pipelines"""
+    rng = np.random.default_rng(seed)
+    written = 0
+    pipelines = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        while written < rows:
+            n = min(chunk_rows, rows - written)
+            chunk, n_pipelines = generate_chunk(rng, n, first_idx=written + 1, first_pipeline=pipelines,
+                                                steps_per_pipeline=steps_per_pipeline)
+            chunk.to_csv(f, index=False, header=written == 0)
+            written += n
+            pipelines += n_pipelines
+    return pipelines
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate a synthetic analysis_raw.csv')
+    parser.add_argument('output', help='Path of the CSV file to write')
+    parser.add_argument('--rows', type=int, default=10_000, help='Number of step rows (default: 10000)')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed (default: 0)')
+    parser.add_argument('--steps-per-pipeline', type=int, default=DEFAULT_STEPS_PER_PIPELINE,
+                        help=f'Mean steps per pipeline (default: {DEFAULT_STEPS_PER_PIPELINE})')
+    args = parser.parse_args()
+
+    n_pipelines = write_catalogue(args.output, args.rows, seed=args.seed, steps_per_pipeline=args.steps_per_pipeline)
+    print(f"✓ Wrote {args.rows} rows in {n_pipelines} pipelines to {args.output}")
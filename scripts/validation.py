@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Validation of processed steps before costing (between stage 1 and stage 2)
+- Every check runs on whole columns at once: required columns, numeric types,
+  missing values, value ranges, requirements no instance can meet, and
+  runtime / memory outliers per tool (e.g. a samtools step at 100x the median
+  runtime of samtools steps)
+- Result: a compact issue table, one row per (step, check), with severity
+  error (the cost would be wrong: no instance, negative values, no pipeline)
+  or warning (the cost is likely wrong: $0 runtime, defaulted task count,
+  outliers); table- and pipeline-level issues have no row number
+- Policy: warn reports and continues (default), fail stops on errors,
+  strict stops on any issue, off skips validation
+- Run on its own (validation.py 2), from stage 2 and from run_pipeline.py
+  (--validate POLICY); issues are saved to data/team{N}/validation_issues.csv
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import console
+from intermediate_io import FORMATS, intermediate_path, read_intermediate
+from pricing import DEFAULT_SCENARIO, load_pricing
+from run_profile import timed
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DATA_DIR = PROJECT_ROOT / "data"
+
+VALIDATION_POLICIES = ('off', 'warn', 'fail', 'strict')
+DEFAULT_POLICY = 'warn'
+
+KEY_COLUMNS = ['직무(업무명)', 'Analysis_name']
+REQUIRED_COLUMNS = KEY_COLUMNS + ['Group', 'Step', 'tools', 'CPUs', 'MEM(G)', 'TIME(hr)', 'nTask(병렬)', 'SIZE(MB)']
+NUMERIC_COLUMNS = ['CPUs', 'MEM(G)', 'TIME(hr)', 'nTask(병렬)', 'SIZE(MB)']
+
+# (column, check, severity, condition on the numeric column, message)
+RANGE_RULES = [
+    ('CPUs', 'missing', 'error', lambda v: v.isna(), 'no CPU count: no instance is chosen and the step costs $0'),
+    ('CPUs', 'not_positive', 'error', lambda v: v <= 0, 'CPU count must be positive'),
+    ('CPUs', 'not_integer', 'warning', lambda v: v % 1 > 0, 'fractional CPU count is truncated'),
+    ('MEM(G)', 'missing', 'error', lambda v: v.isna(), 'no memory: no instance is chosen and the step costs $0'),
+    ('MEM(G)', 'not_positive', 'error', lambda v: v <= 0, 'memory must be positive'),
+    ('TIME(hr)', 'missing', 'warning', lambda v: v.isna(), 'no runtime: counted as 0 hours, the step costs $0'),
+    ('TIME(hr)', 'negative', 'error', lambda v: v < 0, 'runtime must not be negative'),
+    ('TIME(hr)', 'zero', 'warning', lambda v: v == 0, 'zero runtime: the step costs $0'),
+    ('nTask(병렬)', 'missing', 'warning', lambda v: v.isna(), 'no task count: 1 task assumed'),
+    ('nTask(병렬)', 'not_positive', 'error', lambda v: v <= 0, 'task count must be at least 1'),
+    ('nTask(병렬)', 'not_integer', 'warning', lambda v: v % 1 > 0, 'fractional task count'),
+    ('SIZE(MB)', 'negative', 'error', lambda v: v < 0, 'storage size must not be negative'),
+]
+
+# Per-tool outliers: values this many times above (or below) the tool's median,
+# among tools with at least OUTLIER_MIN_STEPS steps with a positive value
+OUTLIER_COLUMNS = ['TIME(hr)', 'MEM(G)']
+OUTLIER_FACTOR = 100
+OUTLIER_MIN_STEPS = 3
+
+ISSUE_COLUMNS = ['row', '직무(업무명)', 'Analysis_name', 'Step', 'tools', 'column', 'check', 'severity',
+                 'value', 'expected', 'message']
+
+class ValidationError(ValueError):
+    """Raised when the validation policy rejects the data; issues holds the issue table"""
+
+    def __init__(self, message, issues):
+        super().__init__(message)
+        self.issues = issues
+
+    def __reduce__(self):
+        # Keeps the issues when raised in a worker process
+        return type(self), (str(self), self.issues)
+
+def _row_issues(df, mask, column, check, severity, message, expected=np.nan):
+    """Issue rows for the rows of df where mask is true"""
+    positions = np.flatnonzero(np.asarray(mask, dtype=bool))
+    if len(positions) == 0:
+        return None
+    rows = df.iloc[positions]
+    return pd.DataFrame({
+        'row': df.index[positions],
+        **{col: rows[col].to_numpy() if col in df.columns else np.nan
+           for col in ['직무(업무명)', 'Analysis_name', 'Step', 'tools']},
+        'column': column,
+        'check': check,
+        'severity': severity,
+        'value': rows[column].to_numpy() if column in df.columns else np.nan,
+        'expected': expected[positions] if isinstance(expected, np.ndarray) else expected,
+        'message': message,
+    })
+
+def _table_issue(column, check, severity, message, **keys):
+    return pd.DataFrame([{'row': np.nan, 'column': column, 'check': check, 'severity': severity,
+                          'value': np.nan, 'expected': np.nan, 'message': message, **keys}])
+
+def _unfit_requirements(cpus, mems, pricing):
+    """Rows whose CPU and memory no single instance of the catalogue provides"""
+    specs = np.array([(cpu, mem) for cpu, mem, _ in pricing['ec2'].values()], dtype=float)
+    cpu_req = np.maximum(1, np.trunc(np.nan_to_num(cpus, nan=1)))
+    mem_req = np.maximum(1, np.trunc(np.nan_to_num(mems, nan=1)))
+    fits = (cpu_req[:, None] <= specs[:, 0]) & (mem_req[:, None] <= specs[:, 1])
+    return ~fits.any(axis=1)
+
+def _outliers(df, values, column, factor, min_steps):
+    """Rows whose value is factor times above or below the median of their tool"""
+    positive = values.where(values > 0)
+    by_tool = positive.groupby(df['tools'], sort=False, observed=True)
+    median = by_tool.transform('median')
+    counts = by_tool.transform('count')
+    ratio = positive / median
+    mask = (counts >= min_steps) & ((ratio >= factor) | (ratio <= 1 / factor))
+    return mask.fillna(False).to_numpy(dtype=bool), median.to_numpy(dtype=float)
+
+def validate(df, pricing=None, outlier_factor=OUTLIER_FACTOR, outlier_min_steps=OUTLIER_MIN_STEPS):
+    """
+    Issue table of a processed steps DataFrame (ISSUE_COLUMNS, empty when clean).
+
+    pricing (a compiled scenario from pricing.load_pricing) adds the check
+    for requirements larger than every instance of the catalogue.
+    """
+    issues = []
+
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    for col in missing_columns:
+        issues.append(_table_issue(col, 'missing_column', 'error', 'required column is missing'))
+
+    # Numeric columns: unparseable cells are errors, the rules see the parsed values
+    numbers = {}
+    unparsed = {}
+    for col in NUMERIC_COLUMNS:
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if not pd.api.types.is_numeric_dtype(values):
+            parsed = pd.to_numeric(values, errors='coerce')
+            unparsed[col] = parsed.isna() & values.notna()
+            issues.append(_row_issues(df, unparsed[col], col, 'not_numeric', 'error', 'value is not a number'))
+            values = parsed
+        numbers[col] = values.astype(float)
+
+    for col in KEY_COLUMNS:
+        if col in df.columns:
+            issues.append(_row_issues(df, df[col].isna(), col, 'missing', 'error',
+                                      'no pipeline key: the step is reported under a (blank) pipeline'))
+
+    for col, check, severity, condition, message in RANGE_RULES:
+        if col in numbers:
+            mask = condition(numbers[col]).fillna(False)
+            if check == 'missing' and col in unparsed:
+                mask &= ~unparsed[col]
+            issues.append(_row_issues(df, mask, col, check, severity, message))
+
+    if pricing is not None and 'CPUs' in numbers and 'MEM(G)' in numbers:
+        unfit = _unfit_requirements(numbers['CPUs'].to_numpy(), numbers['MEM(G)'].to_numpy(), pricing)
+        issues.append(_row_issues(df, unfit, 'CPUs', 'exceeds_instances', 'warning',
+                                  f"no {pricing['name']} instance has this CPU and memory: "
+                                  f"the largest one is used"))
+
+    if 'tools' in df.columns:
+        for col in OUTLIER_COLUMNS:
+            if col in numbers:
+                mask, median = _outliers(df, numbers[col], col, outlier_factor, outlier_min_steps)
+                issues.append(_row_issues(df, mask, col, 'outlier', 'warning',
+                                          f"at least {outlier_factor:g}x off the median of the tool",
+                                          expected=median))
+
+    # Pipelines whose steps all run 0 hours cost nothing in the reports
+    if 'TIME(hr)' in numbers and not any(col in missing_columns for col in KEY_COLUMNS):
+        runtime = numbers['TIME(hr)'].fillna(0).groupby([df[col] for col in KEY_COLUMNS], sort=False,
+                                                        observed=True, dropna=False).sum()
+        for job, analysis_name in runtime.index[runtime.to_numpy() <= 0]:
+            issues.append(_table_issue('TIME(hr)', 'pipeline_no_runtime', 'warning',
+                                       'no step of the pipeline has a runtime: its report shows $0',
+                                       **{'직무(업무명)': job, 'Analysis_name': analysis_name}))
+
+    # All-NA columns (no value of a missing key, no row of a table issue) are
+    # left out so they do not decide the dtypes of the concatenated table
+    issues = [issue.dropna(axis=1, how='all') for issue in issues if issue is not None]
+    if not issues:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    table = pd.concat(issues, ignore_index=True).reindex(columns=ISSUE_COLUMNS)
+    # Errors first, then table-level issues and rows in order
+    order = table['severity'].map({'error': 0, 'warning': 1}).rename('order')
+    return (table.assign(order=order).sort_values(['order', 'row'], kind='stable', na_position='first')
+            .drop(columns='order').reset_index(drop=True))
+
+def check_policy(issues, policy=DEFAULT_POLICY):
+    """Raise ValidationError when policy rejects the issues (fail: any error, strict: any issue)"""
+    errors = int((issues['severity'] == 'error').sum())
+    if (policy == 'fail' and errors) or (policy == 'strict' and len(issues)):
+        raise ValidationError(f"Validation failed ({policy} policy): {errors} errors, "
+                              f"{len(issues) - errors} warnings", issues)
+
+def issue_counts(issues):
+    """Number of issues per column, check and severity"""
+    return (issues.groupby(['severity', 'column', 'check'], sort=False).size().rename('issues')
+            .reset_index())
+
+@timed('validation')
+def run_validation(df, team, policy=DEFAULT_POLICY, pricing=None, save=True):
+    """
+    Validate the processed steps of a team, print and save the issues and apply the policy.
+
+    Returns the issue table; raises ValidationError when the policy rejects it.
+    """
+    console.banner(f"Validation: Checking Team {team} Processed Data ({policy} policy)", leading_newline=True,
+                   team=team, stage='validation')
+    issues = validate(df, pricing=pricing)
+    errors = int((issues['severity'] == 'error').sum())
+    console.info(f"   - Steps checked: {len(df)}", steps=len(df))
+    console.info(f"   - Issues: {errors} errors, {len(issues) - errors} warnings",
+                 errors=errors, warnings=len(issues) - errors)
+
+    if len(issues):
+        console.summary("\n   Issues by check:", lambda: issue_counts(issues), index=False)
+        console.summary("\n   First issues:", lambda: issues.head(10).drop(columns='message'),
+                        index=False, max_colwidth=30)
+
+    if save:
+        issues_file = DATA_DIR / f"team{team}" / "validation_issues.csv"
+        issues.to_csv(issues_file, index=False, encoding='utf-8')
+        console.info(f"   ✓ Saved issue table: {issues_file}", path=issues_file)
+
+    check_policy(issues, policy)
+    return issues
+
+def main(team, df=None, fmt='csv', policy=DEFAULT_POLICY, pricing=DEFAULT_SCENARIO, save=True):
+    """Validate analysis_processed of a team (or the processed df) under a policy"""
+    if df is None:
+        processed_file = intermediate_path(DATA_DIR / f"team{team}", "analysis_processed", fmt)
+        console.info(f"Loading processed data from: {processed_file}")
+        df = read_intermediate(processed_file, fmt)
+    return run_validation(df, team, policy=policy, pricing=load_pricing(pricing), save=save)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Validate the processed data of a team before costing')
+    parser.add_argument('team', type=int, help='Team number (1, 2, or 3)')
+    parser.add_argument('--policy', choices=VALIDATION_POLICIES[1:], default=DEFAULT_POLICY,
+                        help='warn: report only (default), fail: exit on errors, strict: exit on any issue')
+    parser.add_argument('--format', choices=FORMATS, default='csv',
+                        help='Format of the processed data file (default: csv)')
+    parser.add_argument('--pricing', default=DEFAULT_SCENARIO,
+                        help=f'Pricing scenario for the instance size check (default: {DEFAULT_SCENARIO})')
+    console.add_log_arguments(parser)
+    args = parser.parse_args()
+    console.configure_from_args(args)
+
+    try:
+        main(args.team, fmt=args.format, policy=args.policy, pricing=args.pricing)
+    except ValidationError as e:
+        sys.exit(str(e))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Watch mode: refresh a team's reports whenever its raw export changes
+- Polls data/team*/analysis_raw.csv (size and mtime; no extra dependency),
+  and the price files in pricing/; new teams are picked up as they appear
+- Debounce: a file is handled once it has not changed for --debounce seconds,
+  so a burst of writes from a re-export triggers a single run; a file whose
+  content hash did not change (a re-export of the same sheet) is skipped
+- A changed team is re-run with run_pipeline's incremental runner in this
+  process: pandas, the stage modules and the pricing tables stay loaded,
+  and only pipelines whose rows changed are re-costed and re-reported
+- A price file change re-runs every team (the pricing fingerprint changed)
+- A failed run (half-written CSV, validation policy) is reported and retried
+  on the next change of the file
+"""
+
+import argparse
+import hashlib
+import sys
+import time
+
+import console
+import run_pipeline
+from cost_cache import DEFAULT_MAX_ENTRIES
+from intermediate_io import FORMATS
+from pricing import DEFAULT_SCENARIO, PRICING_DIR, load_scenarios
+from query_store import DEFAULT_QUERY_STORE
+from report_render import REPORT_FORMATS
+from scheduling import DEFAULT_DEPENDENCY, DEFAULT_MAX_VCPUS, DEPENDENCY_RULES
+from validation import DEFAULT_POLICY, VALIDATION_POLICIES
+
+DATA_DIR = run_pipeline.DATA_DIR
+
+DEFAULT_INTERVAL = 1.0
+DEFAULT_DEBOUNCE = 2.0
+
+# Key of the price files in the watch state
+PRICING_KEY = 'pricing'
+
+def raw_file(team):
+    return DATA_DIR / f"team{team}" / "analysis_raw.csv"
+
+def price_files():
+    return sorted(p for p in PRICING_DIR.glob('*') if p.suffix in ('.csv', '.json'))
+
+def file_state(paths):
+    """(name, mtime, size) of every existing path; changes whenever one of them is written"""
+    state = []
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        state.append((path.name, stat.st_mtime_ns, stat.st_size))
+    return tuple(state)
+
+def file_digest(paths):
+    """Content hash of the paths"""
+    digest = hashlib.sha1()
+    for path in paths:
+        digest.update(path.name.encode('utf-8'))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+def watched_paths(teams=None):
+    """{team or PRICING_KEY: paths}; without teams, every team with a raw export right now"""
+    paths = {team: [raw_file(team)] for team in (teams or run_pipeline.discover_teams())}
+    paths[PRICING_KEY] = price_files()
+    return paths
+
+def poll(states, paths, debounce, now):
+    """
+    Update the watch state and return the keys whose content changed.
+
+    A key is only checked once its files have been quiet for debounce
+    seconds; it is returned when their content hash differs from the last
+    one handled.
+    """
+    ready = []
+    for key, key_paths in paths.items():
+        current = file_state(key_paths)
+        state = states.setdefault(key, {'stat': None, 'changed_at': now - debounce, 'digest': None,
+                                        'pending': True})
+        if current != state['stat']:
+            if state['stat'] is not None:
+                state['changed_at'] = now
+            state['stat'] = current
+            state['pending'] = True
+        if state['pending'] and now - state['changed_at'] >= debounce and current:
+            state['pending'] = False
+            digest = file_digest(key_paths)
+            if digest != state['digest']:
+                state['digest'] = digest
+                ready.append(key)
+    return ready
+
+def refresh_team(team, run_options):
+    """Re-run the changed pipelines of a team; returns True when the run succeeded"""
+    start = time.perf_counter()
+    try:
+        run_pipeline.run_team_incremental(team, **run_options)
+    except Exception as e:
+        # The next change of the file retries the run
+        console.warning(f"⚠ Team {team}: refresh failed ({type(e).__name__}: {e})", team=team, error=str(e))
+        return False
+    seconds = time.perf_counter() - start
+    console.info(f"\n✓ Team {team} refreshed in {seconds:.2f}s", team=team, seconds=round(seconds, 3))
+    return True
+
+def watch(teams=None, interval=DEFAULT_INTERVAL, debounce=DEFAULT_DEBOUNCE, once=False, **run_options):
+    """
+    Watch the raw exports (and price files) and refresh the teams that changed.
+
+    Every watched team is brought up to date first. With once=True the
+    function returns after that instead of watching. run_options are passed
+    to run_pipeline.run_team_incremental.
+    """
+    states = {}
+    watched = f"team {', '.join(map(str, teams))}" if teams else "every team"
+    console.info(f"Watching raw exports of {watched} and {PRICING_DIR.name}/ "
+                 f"(poll every {interval:g}s, debounce {debounce:g}s)")
+    while True:
+        paths = watched_paths(teams)
+        ready = poll(states, paths, debounce, time.monotonic())
+        if PRICING_KEY in ready:
+            ready = [key for key in paths if key != PRICING_KEY]
+        for team in ready:
+            refresh_team(team, run_options)
+        if once:
+            return
+        time.sleep(interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-run the pipeline for a team whenever its raw export changes")
+    parser.add_argument('teams', type=int, nargs='*', help='Team numbers to watch (default: every team under data/)')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f'Seconds between polls (default: {DEFAULT_INTERVAL:g})')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                        help=f'Seconds a file must stay unchanged before it is processed (default: {DEFAULT_DEBOUNCE:g})')
+    parser.add_argument('--once', action='store_true', help='Bring every team up to date once and exit')
+    parser.add_argument('--write-intermediates', action='store_true',
+                        help='Also save analysis_processed and analysis_with_costs')
+    parser.add_argument('--jobs', type=int, default=1, help='Worker processes for report generation (default: 1)')
+    parser.add_argument('--format', choices=FORMATS, default='csv',
+                        help='Format of the intermediate files (default: csv)')
+    parser.add_argument('--report-format', choices=REPORT_FORMATS, default='txt',
+                        help='Format of the report files (default: txt)')
+    parser.add_argument('--max-vcpus', type=int, default=DEFAULT_MAX_VCPUS,
+                        help=f'vCPUs of the AWS Batch compute environment for the wall-clock model (default: {DEFAULT_MAX_VCPUS})')
+    parser.add_argument('--dependency', choices=DEPENDENCY_RULES, default=DEFAULT_DEPENDENCY,
+                        help='Step dependencies of the wall-clock model: chain (default) or layered (see scheduling.py)')
+    parser.add_argument('--pricing', choices=list(load_scenarios()), default=DEFAULT_SCENARIO,
+                        help=f'Pricing scenario from pricing/scenarios.json (default: {DEFAULT_SCENARIO})')
+    parser.add_argument('--cost-cache', nargs='?', const=run_pipeline.calculate_aws_costs.DEFAULT_COST_CACHE,
+                        default=None, metavar='PATH', help='Reuse costs of steps with the same resources from a SQLite cache '
+                                                           '(default path: data/cost_cache.sqlite)')
+    parser.add_argument('--cache-max-entries', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help=f'Evict least recently used cache entries beyond this many (default: {DEFAULT_MAX_ENTRIES})')
+    parser.add_argument('--query-store', nargs='?', const=DEFAULT_QUERY_STORE, default=None, metavar='PATH',
+                        help='Also keep the cross-team query store up to date (default path: data/query_store.sqlite)')
+    parser.add_argument('--validate', choices=VALIDATION_POLICIES, default=DEFAULT_POLICY,
+                        help='Validation of the processed data before costing (default: warn)')
+    console.add_log_arguments(parser)
+    args = parser.parse_args()
+    console.configure_from_args(args)
+
+    try:
+        watch(args.teams, interval=args.interval, debounce=args.debounce, once=args.once,
+              write_intermediates=args.write_intermediates, report_jobs=args.jobs, fmt=args.format,
+              report_format=args.report_format, max_vcpus=args.max_vcpus, pricing=args.pricing,
+              cost_cache=args.cost_cache, cache_max_entries=args.cache_max_entries, query_store=args.query_store,
+              validate=args.validate, dependency=args.dependency)
+    except KeyboardInterrupt:
+        console.info("\nStopped watching")
+        sys.exit(0)
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Ingest of the source workbook (.xlsx) instead of the per-team CSV exports
+- The sheet XML is streamed out of the archive in one pass (standard library
+  only); cells are read as stored, e.g. a number cell formatted as 1.20 is 1.2
+- Merged ranges are read from the sheet's <mergeCells> metadata and every cell
+  of a range gets the value of its top-left cell; cells that are blank in the
+  sheet stay blank (the CSV path can only guess merges by forward fill)
+- The team of a sheet is the number in its name ("3팀_분석", "team3")
+- Sheets are processed in parallel (--jobs), each by stage 1 writing
+  data/team{N}/analysis_processed; run_pipeline.py --xlsx runs all stages
+"""
+
+import argparse
+import importlib
+import re
+import sys
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import PurePosixPath
+
+import numpy as np
+import pandas as pd
+
+import console
+from intermediate_io import FORMATS
+
+SHEET_TEAM_PATTERNS = [re.compile(r'(\d+)\s*팀'), re.compile(r'team\s*(\d+)', re.IGNORECASE)]
+
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+PACKAGE_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}Relationship'
+ROW, VALUE, INLINE, TEXT, RUN, STRING_ITEM, MERGE_CELL = (
+    f'{MAIN_NS}{tag}' for tag in ('row', 'v', 'is', 't', 'r', 'si', 'mergeCell'))
+
+# Cell texts that read_csv treats as missing by default; blank here too so both paths give the same data
+NA_TEXTS = frozenset(['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                      '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'])
+
+CELL_REF = re.compile(r'\$?([A-Z]+)\$?(\d+)')
+
+def _member(target):
+    """Archive member of a relationship target of xl/workbook.xml"""
+    return target.lstrip('/') if target.startswith('/') else str(PurePosixPath('xl') / target)
+
+def sheet_members(zf):
+    """{sheet name: worksheet XML member} of an open workbook archive, in workbook order"""
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target') for rel in rels.iter(PACKAGE_REL)}
+    return {sheet.get('name'): _member(targets[sheet.get(REL_ID)]) for sheet in workbook.iter(f'{MAIN_NS}sheet')}
+
+def shared_strings(zf):
+    """Shared string table of an open workbook archive (text cells refer to it by index)"""
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    members = [_member(rel.get('Target')) for rel in rels.iter(PACKAGE_REL) if rel.get('Type').endswith('/sharedStrings')]
+    strings = []
+    if not members:
+        return strings
+    with zf.open(members[0]) as f:
+        for _, element in ET.iterparse(f):
+            if element.tag == STRING_ITEM:
+                # Plain text or rich text runs; phonetic hints (rPh) are not part of the value
+                strings.append(''.join(t.text or '' for child in element if child.tag in (TEXT, RUN)
+                                       for t in child.iter(TEXT)))
+                element.clear()
+    return strings
+
+def _column_number(letters):
+    """1-based column number of column letters ('A' is 1, 'AA' is 27)"""
+    column = 0
+    for letter in letters:
+        column = column * 26 + ord(letter) - ord('A') + 1
+    return column
+
+def _cell_index(ref):
+    """(column, row) of a cell reference such as 'C12', 1-based"""
+    letters, row = CELL_REF.fullmatch(ref).groups()
+    return _column_number(letters), int(row)
+
+def _cell_value(cell, strings):
+    """Value of a <c> element (str, int or float), None when it has none"""
+    kind = cell.get('t')
+    for child in cell:
+        if child.tag == VALUE:
+            text = child.text or ''
+            if kind == 's':
+                return strings[int(text)]
+            if kind in ('str', 'e', 'd'):
+                return text
+            if kind == 'b':
+                return 'TRUE' if text == '1' else 'FALSE'
+            try:
+                return int(text)
+            except ValueError:
+                return float(text)
+        if child.tag == INLINE:
+            return ''.join(t.text or '' for t in child.iter(TEXT))
+    return None
+
+def parse_sheet(zf, member, strings):
+    """
+    Cells and merged ranges of a worksheet, streamed in one pass.
+
+    Returns (rows, ranges): rows maps the 1-based row number of every row
+    with a value to {column number: value}; ranges lists the merged ranges
+    as (min_col, min_row, max_col, max_row).
+    """
+    rows = {}
+    ranges = []
+    columns = {}
+    row_number = 0
+    with zf.open(member) as f:
+        for _, element in ET.iterparse(f):
+            if element.tag == ROW:
+                row_number = int(element.get('r', row_number + 1))
+                values = {}
+                column = 0
+                for cell in element:
+                    ref = cell.get('r')
+                    if ref:
+                        letters = ref.rstrip('0123456789')
+                        column = columns.get(letters) or columns.setdefault(letters, _column_number(letters))
+                    else:
+                        column += 1
+                    value = _cell_value(cell, strings)
+                    if value is not None:
+                        values[column] = value
+                if values:
+                    rows[row_number] = values
+                element.clear()
+            elif element.tag == MERGE_CELL:
+                first, _, last = element.get('ref').partition(':')
+                ranges.append(_cell_index(first) + _cell_index(last or first))
+    return rows, ranges
+
+def sheet_team(name):
+    """Team number in a sheet name, or None"""
+    for pattern in SHEET_TEAM_PATTERNS:
+        match = pattern.search(name)
+        if match:
+            return int(match.group(1))
+    return None
+
+def team_sheets(path):
+    """{team: sheet name} of the sheets of a workbook whose name carries a team number"""
+    with zipfile.ZipFile(path) as zf:
+        names = list(sheet_members(zf))
+    sheets = {}
+    for name in names:
+        team = sheet_team(name)
+        if team is None:
+            continue
+        if team in sheets:
+            raise ValueError(f"Sheets '{sheets[team]}' and '{name}' of {path} are both team {team}")
+        sheets[team] = name
+    return sheets
+
+def _column(values):
+    """Sheet cells as a column typed like read_csv would: numeric, or text with NaN for blanks"""
+    column = pd.Series([None if isinstance(v, str) and v in NA_TEXTS else v for v in values], dtype=object)
+    # Numbers stored as text cells ('8') are numbers in the CSV export too
+    try:
+        return pd.to_numeric(column)
+    except (ValueError, TypeError):
+        pass
+    return column.map(lambda v: np.nan if v is None else v if isinstance(v, str) else str(v))
+
+def read_sheet(path, sheet):
+    """
+    Raw DataFrame of a sheet with its merged ranges expanded.
+
+    The first row with a value is the header (columns up to its last
+    value); rows without any value are dropped. Returns (df, merged) where
+    merged is the number of merged ranges that were expanded into the data rows.
+    """
+    with zipfile.ZipFile(path) as zf:
+        members = sheet_members(zf)
+        if sheet not in members:
+            raise ValueError(f"No sheet '{sheet}' in {path} (sheets: {', '.join(members)})")
+        rows, ranges = parse_sheet(zf, members[sheet], shared_strings(zf))
+
+    if not rows:
+        return pd.DataFrame(), 0
+    header_row = min(rows)
+    width = max(rows[header_row])
+    header = [rows[header_row].get(column) for column in range(1, width + 1)]
+    first_row = header_row + 1
+    last_row = max(rows)
+
+    # One array row per sheet row, so merged ranges index it by row number
+    values = np.full((last_row - header_row, width), None, dtype=object)
+    for row_number, cells in rows.items():
+        if row_number > header_row:
+            for column, value in cells.items():
+                if column <= width:
+                    values[row_number - first_row, column - 1] = value
+
+    merged = 0
+    for min_col, min_row, max_col, max_row in ranges:
+        if min_row < first_row or min_row > last_row or min_col > width:
+            continue
+        values[min_row - first_row:max_row - first_row + 1, min_col - 1:max_col] = values[min_row - first_row, min_col - 1]
+        merged += 1
+
+    values = values[~np.all(pd.isna(values), axis=1)]
+    df = pd.DataFrame({name: _column(values[:, i]) for i, name in enumerate(header)})
+    return df, merged
+
+def ingest_sheet(path, sheet, team, fmt='csv'):
+    """Run stage 1 on one sheet (in a worker process); returns the number of processed rows"""
+    process_data = importlib.import_module('01_process_data')
+    return len(process_data.main(team, fmt=fmt, xlsx=path, sheet=sheet))
+
+def main(path, teams=None, jobs=1, fmt='csv'):
+    """Process the team sheets of a workbook (all of them without teams); returns {team: rows}"""
+    sheets = team_sheets(path)
+    teams = teams or sorted(sheets)
+    missing = [team for team in teams if team not in sheets]
+    if missing:
+        raise ValueError(f"No sheet for team(s) {', '.join(map(str, missing))} in {path} "
+                         f"(sheets with a team number: {', '.join(sheets.values()) or 'none'})")
+
+    if jobs > 1 and len(teams) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(teams)), initializer=console.configure,
+                                 initargs=console.settings()) as executor:
+            futures = {team: executor.submit(ingest_sheet, path, sheets[team], team, fmt) for team in teams}
+            rows = {team: futures[team].result() for team in teams}
+    else:
+        rows = {team: ingest_sheet(path, sheets[team], team, fmt) for team in teams}
+
+    console.banner(f"Workbook ingested for teams: {', '.join(str(t) for t in teams)}", leading_newline=True,
+                   teams=teams, rows=rows)
+    return rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Process the team sheets of the source workbook (stage 1 from .xlsx)')
+    parser.add_argument('workbook', help='Path of the .xlsx workbook')
+    parser.add_argument('teams', type=int, nargs='*', help='Team numbers (default: every sheet with a team number)')
+    parser.add_argument('--jobs', type=int, default=1, help='Sheets processed in parallel (default: 1)')
+    parser.add_argument('--format', choices=FORMATS, default='csv',
+                        help='Format of the processed data files (default: csv)')
+    console.add_log_arguments(parser)
+    args = parser.parse_args()
+    console.configure_from_args(args)
+
+    try:
+        main(args.workbook, args.teams, jobs=args.jobs, fmt=args.format)
+    except ValueError as e:
+        sys.exit(str(e))